@@ -0,0 +1,82 @@
+"""
+Agregados por ano (e por UF): simples e ponderados pelo número de alunos.
+
+A média simples trata todos os municípios com o mesmo peso (Abaiara conta
+tanto quanto Fortaleza); a ponderada usa Total_Alunos como peso e, para as
+taxas, coincide com a taxa do estado inteiro. Todas as métricas e grupos são
+calculados numa única passada: as linhas são ordenadas por grupo e cada soma
+é um np.add.reduceat sobre a matriz de valores (linhas x métricas).
+"""
+import numpy as np
+import pandas as pd
+
+
+PESO = 'Total_Alunos'
+
+
+def valores_do_nivel(painel, nome):
+    """Valores de um nível do índice ou de uma coluna do painel, linha a linha."""
+    if nome in painel.index.names:
+        return painel.index.get_level_values(nome)
+    return painel[nome]
+
+
+def agregados_por(painel, metricas, niveis=('ANO',), peso=PESO):
+    """
+    Tabela longa indexada por (METRICA, *niveis) com:
+    n, soma, media, variancia (amostral), media_ponderada e
+    variancia_ponderada (populacional, pesos = alunos). `niveis` são níveis
+    do índice ou colunas do painel (ex.: ('ANO', 'UF')).
+    """
+    metricas = [m for m in metricas if m in painel.columns]
+    niveis = list(niveis)
+    codigos, grupos = pd.MultiIndex.from_arrays(
+        [valores_do_nivel(painel, nome) for nome in niveis], names=niveis
+    ).factorize(sort=True)
+
+    ordem = np.argsort(codigos, kind='stable')
+    inicios = np.flatnonzero(np.r_[True, np.diff(codigos[ordem]) != 0])
+
+    valores = painel[metricas].to_numpy(dtype='float64')[ordem]
+    presente = ~np.isnan(valores)
+    v = np.where(presente, valores, 0.0)
+    w = painel[peso].to_numpy(dtype='float64')[ordem][:, None] * presente
+
+    def somar(matriz):
+        return np.add.reduceat(matriz, inicios, axis=0)
+
+    n = somar(presente.astype('float64'))
+    soma = somar(v)
+    soma_quad = somar(v * v)
+    soma_w = somar(w)
+    soma_wx = somar(w * v)
+    soma_wx2 = somar(w * v * v)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = soma / n
+        variancia = (soma_quad - n * media ** 2) / (n - 1)
+        media_w = soma_wx / soma_w
+        variancia_w = soma_wx2 / soma_w - media_w ** 2
+
+    colunas = {
+        'n': n, 'soma': soma, 'media': media, 'variancia': variancia,
+        'media_ponderada': media_w, 'variancia_ponderada': variancia_w,
+    }
+    # matrizes (grupos x métricas) -> ordem (métrica, grupo)
+    indice = pd.MultiIndex.from_tuples(
+        [(m, *g) for m in metricas for g in grupos], names=['METRICA'] + niveis
+    )
+    dados = {nome: matriz.T.ravel() for nome, matriz in colunas.items()}
+    tabela = pd.DataFrame(dados, index=indice)
+    tabela.loc[tabela['n'] == 0, ['media', 'media_ponderada']] = np.nan
+    return tabela
+
+
+def agregados_estaduais(painel, metricas, peso=PESO):
+    """Agregados por (METRICA, ANO) do painel inteiro (ver `agregados_por`)."""
+    return agregados_por(painel, metricas, ('ANO',), peso)
+
+
+def agregados_por_uf(painel, metricas, peso=PESO):
+    """Agregados por (METRICA, ANO, UF): o comparativo entre estados."""
+    return agregados_por(painel, metricas, ('ANO', 'UF'), peso)
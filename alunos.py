@@ -0,0 +1,215 @@
+"""
+Microdados por aluno em Parquet, consultados sem passar pelo pandas.
+
+Os indicadores municipais escondem os padrões individuais (seção de
+limitações do dashboard); carregar alunos19.csv / alunos23.csv inteiros no
+pandas não cabia no dashboard. Aqui o microdado do ENEM de cada ano é
+compilado uma vez num dataset Parquet particionado por ano
+(dados/alunos/ANO=2023/alunos.parquet), só com as colunas usadas e tipos
+compactos (categorias em dicionário, notas em float32), e as linhas ficam
+ordenadas por UF e município em row groups pequenos.
+
+As consultas usam o pyarrow.dataset: o filtro de ano descarta partições
+inteiras e o de município (CD_MUN) é empurrado até os row groups, que são
+descartados pelas estatísticas min/max sem serem lidos. A agregação
+(quantis por t-digest, média e contagem por grupo) é feita no Arrow
+compute e só o resumo, algumas linhas por grupo, vira DataFrame; as
+amostras de linhas são limitadas (LIMITE_LINHAS).
+
+Uso:
+    python alunos.py MICRODADOS_ENEM_2023.csv --ano 2023            # Ceará
+    python alunos.py MICRODADOS_ENEM_2023.csv --ano 2023 --uf BR    # todas as UFs
+"""
+import argparse
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import armazem
+import ingestao
+import municipios
+
+
+PASTA_ALUNOS = os.path.join('dados', 'alunos')
+NOME_ARQUIVO = 'alunos.parquet'
+META_ORIGEM = b'origem'
+# Incrementar ao mudar _converter: partições gravadas antes são recompiladas
+VERSAO_FORMATO = 2
+LINHAS_POR_GRUPO = 32_768       # row group pequeno: um município médio ocupa poucos
+LIMITE_LINHAS = 5_000
+QUANTIS = (0.25, 0.5, 0.75)
+
+# Questionário socioeconômico (Q003/Q004: ocupação do pai/mãe, Q006: renda)
+QUESTOES = {'Q003': 'OCUPACAO_PAI', 'Q004': 'OCUPACAO_MAE', 'Q006': 'RENDA'}
+
+# Agrupamentos oferecidos no detalhamento: coluna -> {código: rótulo}
+GRUPOS = {
+    'DEPENDENCIA': {1: 'Federal', 2: 'Estadual', 3: 'Municipal', 4: 'Privada'},
+    'OCUPACAO_PAI': ingestao.OCUPACOES,
+}
+GRUPOS['OCUPACAO_MAE'] = GRUPOS['OCUPACAO_PAI']
+SEM_RESPOSTA = 'Não informado'
+
+
+def _caminho_ano(ano, pasta=PASTA_ALUNOS):
+    return armazem.caminho_particao(pasta, ano, NOME_ARQUIVO)
+
+
+def _origem(caminho, uf):
+    # tamanho e data bastam para o microdado (GBs): hash completo custaria uma leitura a mais
+    estado = os.stat(caminho)
+    return f'{VERSAO_FORMATO}:{estado.st_size}:{estado.st_mtime_ns}:{uf}'
+
+
+# --- COMPILAÇÃO ---
+def _converter(lote, layout):
+    """Lote do CSV bruto -> colunas do dataset de alunos."""
+    colunas = {
+        'UF': pc.cast(lote[layout['uf']], pa.string()),
+        'CD_MUN': pc.cast(lote[layout['codigo']], pa.int32()),
+    }
+    if layout['dependencia'] and layout['dependencia'] in lote.schema.names:
+        colunas['DEPENDENCIA'] = pc.cast(lote[layout['dependencia']], pa.int8())
+    for questao, nome in QUESTOES.items():
+        if questao in lote.schema.names:
+            colunas[nome] = lote[questao]
+    # resposta em branco conta como sem acesso, como na ingestão
+    colunas['COMPUTADOR'] = pc.fill_null(pc.not_equal(lote[layout['computador']], 'A'), False)
+    colunas['INTERNET'] = pc.fill_null(pc.equal(lote[layout['internet']], 'B'), False)
+
+    notas = [pc.cast(lote[coluna], pa.float32()) for coluna in ingestao.NOTAS]
+    for nota, nome in zip(notas, ingestao.NOTAS.values()):
+        colunas[nome] = nota
+    soma = notas[0]
+    for nota in notas[1:]:
+        soma = pc.add(soma, nota)     # nula se faltar alguma prova
+    colunas['NOTA_MEDIA'] = pc.divide(soma, pa.scalar(len(notas), pa.float32()))
+    return pa.table(colunas)
+
+
+def compilar_microdado(caminho, ano, uf=municipios.UF_PADRAO, pasta=PASTA_ALUNOS):
+    """Converte o MICRODADOS_ENEM do ano na partição Parquet de alunos."""
+    layout = ingestao.layout_do_ano(ano)
+    nomes, _ = ingestao.ler_cabecalho(caminho)
+    usadas = [layout['uf'], layout['codigo'], layout['computador'], layout['internet'], layout['dependencia']]
+    usadas = [c for c in usadas + list(QUESTOES) + list(ingestao.NOTAS) if c and c in nomes]
+
+    leitor = pv.open_csv(
+        caminho,
+        read_options=pv.ReadOptions(encoding='latin-1', block_size=1 << 24),
+        parse_options=pv.ParseOptions(delimiter=';'),
+        convert_options=pv.ConvertOptions(
+            include_columns=usadas,
+            column_types={c: pa.string() for c in [layout['uf'], layout['computador'], layout['internet']] + list(QUESTOES)},
+        ),
+    )
+    partes = []
+    for lote in leitor:
+        lote = pa.Table.from_batches([lote])
+        if uf != municipios.BRASIL:
+            lote = lote.filter(pc.equal(lote[layout['uf']], uf))
+        partes.append(_converter(lote, layout))
+
+    tabela = pa.concat_tables(partes).sort_by([('UF', 'ascending'), ('CD_MUN', 'ascending')])
+    # categorias repetidas em dicionário (UF e respostas do questionário)
+    for nome in ['UF'] + [n for n in QUESTOES.values() if n in tabela.schema.names]:
+        indice = tabela.schema.get_field_index(nome)
+        tabela = tabela.set_column(indice, nome, pc.dictionary_encode(tabela[nome]))
+    tabela = tabela.replace_schema_metadata({META_ORIGEM: _origem(caminho, uf).encode()})
+
+    destino = _caminho_ano(ano, pasta)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    pq.write_table(tabela, destino, row_group_size=LINHAS_POR_GRUPO, compression='zstd')
+    return destino
+
+
+def impressao(ano, pasta=PASTA_ALUNOS):
+    """Origem (versão:tamanho:data:UF) do microdado que gerou a partição, ou None."""
+    caminho = _caminho_ano(ano, pasta)
+    if not os.path.exists(caminho):
+        return None
+    valor = (pq.read_schema(caminho).metadata or {}).get(META_ORIGEM)
+    return valor.decode() if valor else None
+
+
+def anos_disponiveis(pasta=PASTA_ALUNOS):
+    return armazem.anos_particionados(pasta, NOME_ARQUIVO)
+
+
+def existe(pasta=PASTA_ALUNOS):
+    return bool(anos_disponiveis(pasta))
+
+
+# --- CONSULTAS ---
+def _dataset(pasta=PASTA_ALUNOS):
+    return ds.dataset(pasta, format='parquet', partitioning='hive')
+
+
+def _filtro(ano, cd_mun):
+    return (ds.field('ANO') == ano) & (ds.field('CD_MUN') == int(cd_mun))
+
+
+def colunas_do_ano(ano, pasta=PASTA_ALUNOS):
+    return pq.read_schema(_caminho_ano(ano, pasta)).names
+
+
+def distribuicao(ano, cd_mun, por='DEPENDENCIA', metrica='NOTA_MEDIA', pasta=PASTA_ALUNOS):
+    """
+    Resumo da `metrica` dos alunos do município no ano, por grupo `por`:
+    DataFrame com GRUPO (rótulo), n, media, min, q1, mediana, q3, max.
+    Só as duas colunas são lidas, e só dos row groups do município.
+    """
+    tabela = _dataset(pasta).to_table(columns=[por, metrica], filter=_filtro(ano, cd_mun))
+    tabela = tabela.filter(pc.is_valid(tabela[metrica]))
+    if por in tabela.schema.names and pa.types.is_dictionary(tabela.schema.field(por).type):
+        tabela = tabela.set_column(0, por, pc.cast(tabela[por], pa.string()))
+    resumo = tabela.group_by(por).aggregate([
+        (metrica, 'count'), (metrica, 'mean'), (metrica, 'min'), (metrica, 'max'),
+        (metrica, 'tdigest', pc.TDigestOptions(q=list(QUANTIS))),
+    ]).to_pandas()
+
+    quantis = resumo.pop(f'{metrica}_tdigest')
+    resumo = resumo.rename(columns={
+        por: 'CODIGO', f'{metrica}_count': 'n', f'{metrica}_mean': 'media',
+        f'{metrica}_min': 'min', f'{metrica}_max': 'max',
+    })
+    for posicao, nome in enumerate(('q1', 'mediana', 'q3')):
+        resumo[nome] = [q[posicao] for q in quantis]
+
+    rotulos = GRUPOS.get(por, {})
+    resumo['GRUPO'] = [SEM_RESPOSTA if codigo is None or codigo != codigo else rotulos.get(codigo, str(codigo))
+                       for codigo in resumo['CODIGO']]
+    ordem = {rotulo: i for i, rotulo in enumerate(list(rotulos.values()) + [SEM_RESPOSTA])}
+    resumo = resumo.sort_values('GRUPO', key=lambda s: s.map(ordem).fillna(len(ordem)), ignore_index=True)
+    return resumo[['GRUPO', 'n', 'media', 'min', 'q1', 'mediana', 'q3', 'max']]
+
+
+def amostra(ano, cd_mun, colunas=None, limite=LIMITE_LINHAS, pasta=PASTA_ALUNOS):
+    """Até `limite` alunos do município no ano (para exibição), lidos só até o limite."""
+    scanner = _dataset(pasta).scanner(columns=colunas, filter=_filtro(ano, cd_mun))
+    return scanner.head(limite).to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compila o microdado do ENEM por aluno em Parquet.")
+    parser.add_argument('microdado')
+    parser.add_argument('--ano', type=int, required=True)
+    parser.add_argument('--uf', default=municipios.UF_PADRAO, help=f"Sigla da UF ou {municipios.BRASIL} para todas")
+    parser.add_argument('--pasta', default=PASTA_ALUNOS)
+    parser.add_argument('--forcar', action='store_true', help="regrava mesmo sem mudança no microdado")
+    args = parser.parse_args()
+
+    if not args.forcar and impressao(args.ano, args.pasta) == _origem(args.microdado, args.uf):
+        print(f"{args.ano}: microdado sem mudanças, partição mantida")
+        return
+    destino = compilar_microdado(args.microdado, args.ano, args.uf, args.pasta)
+    metadados = pq.ParquetFile(destino).metadata
+    print(f"{destino}: {metadados.num_rows:,} alunos em {metadados.num_row_groups} row groups")
+
+
+if __name__ == '__main__':
+    main()
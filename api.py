@@ -0,0 +1,451 @@
+"""
+API HTTP somente leitura sobre a camada de dados do dashboard.
+
+Expõe os mesmos números do dashboard sem carregar a interface do Streamlit:
+indicadores por município, variações entre anos (tabelas do cubo),
+recortes abaixo do p25 / acima do p75, correlações com IC, o resumo por
+métrica e ano e os agregados por estado. As respostas saem em JSON ou em
+Arrow (stream IPC), com ?formato=arrow ou Accept: application/vnd.apache.arrow.stream.
+
+Cada resposta é função só da consulta e da versão dos dados (hash dos
+indicadores de cada ano), então o ETag é calculado antes de montar a
+resposta: um If-None-Match igual devolve 304 sem tocar nos dados, e as
+respostas montadas ficam num cache LRU do processo. Consultas em lote vão
+por POST /lote.
+
+Rotas (GET):
+    /anos                                      anos, UFs e versão dos dados
+    /indicadores?ano=2019,2023&municipio=Sobral&colunas=Taxa_Internet
+    /variacao?metrica=Taxa_Internet&de=2019&para=2023
+    /percentis?metrica=Taxa_Internet&ano=2023
+    /correlacoes?ano=2023&metodo=pearson&x=Taxa_Internet&y=Nota_Media_Geral
+    /resumo?metrica=Taxa_Internet
+    /estados?metrica=Taxa_Internet&ano=2023&estado=CE,PE
+    /metricas                                  instrumentação (formato Prometheus)
+Todas aceitam uf=<sigla> (padrão CE; BR para todas as UFs).
+
+Lote (POST /lote, JSON):
+    {"consultas": [{"rota": "variacao", "parametros": {"metrica": "Taxa_Internet", "de": 2019, "para": 2023}}, ...]}
+
+Uso:
+    python api.py --porta 8502
+"""
+import argparse
+import hashlib
+import io
+import json
+import threading
+import time
+import traceback
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import agregados
+import cache_figuras
+import cubo
+import instrumentacao
+import municipios
+import registro
+
+
+PORTA_PADRAO = 8502
+VERIFICAR_DADOS = 5.0       # segundos entre verificações da versão dos dados
+CAPACIDADE_RESPOSTAS = 256
+MAX_AGE = 60                # Cache-Control para clientes e proxies (s)
+ARROW = 'application/vnd.apache.arrow.stream'
+
+
+class ErroConsulta(ValueError):
+    """Parâmetro ausente ou inválido (HTTP 400)."""
+
+
+class NaoEncontrado(KeyError):
+    """Rota inexistente ou recorte sem dados (HTTP 404)."""
+
+
+# --- DADOS ---
+class Dados:
+    """
+    Painéis e cubos por escopo (UF ou BR), carregados sob demanda e
+    descartados quando a versão dos dados muda.
+    """
+
+    def __init__(self, intervalo=VERIFICAR_DADOS):
+        self.intervalo = intervalo
+        self._trava = threading.RLock()    # o cubo carrega o painel dentro da trava
+        self._versao = None
+        self._verificado = 0.0
+        self._carregados = {}
+
+    def versao(self):
+        """Tupla ((ano, hash), ...) dos indicadores; relida no máximo a cada `intervalo` s."""
+        with self._trava:
+            if time.monotonic() - self._verificado > self.intervalo:
+                versao = tuple(sorted(registro.impressoes().items()))
+                if versao != self._versao:
+                    self._versao = versao
+                    self._carregados.clear()
+                self._verificado = time.monotonic()
+            return self._versao
+
+    def _obter(self, chave, carregar):
+        self.versao()
+        with self._trava:
+            if chave not in self._carregados:
+                self._carregados[chave] = carregar()
+            return self._carregados[chave]
+
+    def painel(self, escopo):
+        return self._obter(('painel', escopo), lambda: registro.carregar_painel(
+            ufs=municipios.ufs_do_escopo(escopo)))
+
+    def cubo(self, escopo):
+        return self._obter(('cubo', escopo), lambda: cubo.carregar_cubo(
+            escopo=escopo, painel=self.painel(escopo)))
+
+    def ufs(self):
+        return self._obter(('ufs',), registro.ufs_disponiveis)
+
+    def estados(self):
+        # agregados por UF direto do painel nacional (não exige o cubo do Brasil)
+        return self._obter(('estados',), lambda: agregados.agregados_por_uf(
+            self.painel(municipios.BRASIL), cubo.METRICAS))
+
+
+# --- PARÂMETROS ---
+_OBRIGATORIO = object()
+
+
+def _param(parametros, nome, padrao=_OBRIGATORIO, tipo=str):
+    valor = parametros.get(nome)
+    if valor is None or valor == '':
+        if padrao is _OBRIGATORIO:
+            raise ErroConsulta(f"parâmetro obrigatório: {nome}")
+        return padrao
+    try:
+        return tipo(valor)
+    except (ValueError, TypeError):
+        raise ErroConsulta(f"valor inválido para {nome}: {valor!r}") from None
+
+
+def _lista(parametros, nome, tipo=str):
+    """Lista de valores separados por vírgula (None se ausente)."""
+    valor = parametros.get(nome)
+    if valor is None or valor == '':
+        return None
+    itens = valor if isinstance(valor, list) else str(valor).split(',')
+    try:
+        return [tipo(item) for item in itens]
+    except (ValueError, TypeError):
+        raise ErroConsulta(f"valor inválido para {nome}: {valor!r}") from None
+
+
+def _escopo(dados, parametros):
+    """UF (ou BR) da consulta: 400 se não for uma sigla, 404 se a UF não tem dados."""
+    escopo = parametros.get('uf', municipios.UF_PADRAO)
+    escopo = escopo.upper() if isinstance(escopo, str) else escopo
+    if escopo != municipios.BRASIL and escopo not in municipios.UFS:
+        raise ErroConsulta(f"uf inválida: {escopo!r} (sigla da UF ou {municipios.BRASIL})")
+    if escopo != municipios.BRASIL and escopo not in dados.ufs():
+        raise NaoEncontrado(f"UF sem dados: {escopo}")
+    return escopo
+
+
+def _metrica(parametros, cubo_comp, obrigatoria=True):
+    metrica = _param(parametros, 'metrica', _OBRIGATORIO if obrigatoria else None)
+    if metrica is not None and metrica not in cubo_comp['metricas']:
+        raise ErroConsulta(f"métrica desconhecida: {metrica} (disponíveis: {', '.join(cubo_comp['metricas'])})")
+    return metrica
+
+
+def _ano(parametros, cubo_comp, nome='ano'):
+    ano = _param(parametros, nome, tipo=int)
+    if ano not in cubo_comp['anos']:
+        raise ErroConsulta(f"ano sem dados: {ano}")
+    return ano
+
+
+# --- ROTAS ---
+# Cada rota recebe (dados, escopo, parâmetros) e devolve (tabela, meta)
+ROTAS = {}
+
+
+def rota(nome):
+    def registrar(funcao):
+        ROTAS[nome] = funcao
+        return funcao
+    return registrar
+
+
+@rota('anos')
+def _rota_anos(dados, escopo, parametros):
+    versao = dados.versao()
+    tabela = pd.DataFrame(versao, columns=['ANO', 'HASH'])
+    return tabela, {'ufs': registro.ufs_disponiveis([ano for ano, _ in versao])}
+
+
+@rota('indicadores')
+def _rota_indicadores(dados, escopo, parametros):
+    painel = dados.painel(escopo)
+    anos = _lista(parametros, 'ano', int)
+    tabela = painel[painel.index.get_level_values('ANO').isin(anos)] if anos else painel
+    tabela = tabela.reset_index()
+
+    nomes = _lista(parametros, 'municipio')
+    if nomes:
+        chaves = {municipios.chave(nome, uf) for nome in nomes for uf in tabela['UF'].unique()}
+        tabela = tabela[[municipios.chave(n, uf) in chaves for n, uf in zip(tabela['MUNICIPIO'], tabela['UF'])]]
+    codigos = _lista(parametros, 'cd_mun', int)
+    if codigos:
+        tabela = tabela[tabela['CD_MUN'].isin(codigos)]
+
+    colunas = _lista(parametros, 'colunas')
+    if colunas:
+        desconhecidas = sorted(set(colunas) - set(tabela.columns))
+        if desconhecidas:
+            raise ErroConsulta(f"colunas desconhecidas: {', '.join(desconhecidas)}")
+        tabela = tabela[list(dict.fromkeys(['ANO', 'UF', 'MUNICIPIO', 'CD_MUN'] + colunas))]
+    return tabela.dropna(axis=1, how='all'), {}
+
+
+@rota('variacao')
+def _rota_variacao(dados, escopo, parametros):
+    cubo_comp = dados.cubo(escopo)
+    metrica = _metrica(parametros, cubo_comp)
+    de, para = _ano(parametros, cubo_comp, 'de'), _ano(parametros, cubo_comp, 'para')
+    if de >= para:
+        raise ErroConsulta("'de' deve ser anterior a 'para'")
+    comparacao = cubo.par(cubo_comp, metrica, de, para)
+    meta = {
+        'delta': comparacao['delta'], 'delta_pct': comparacao['delta_pct'],
+        'sem_par': {str(ano): nomes for ano, nomes in comparacao['sem_par'].items()},
+    }
+    return comparacao['detalhe'], meta
+
+
+@rota('percentis')
+def _rota_percentis(dados, escopo, parametros):
+    cubo_comp = dados.cubo(escopo)
+    metrica = _metrica(parametros, cubo_comp)
+    ano = _ano(parametros, cubo_comp)
+    if (metrica, ano) not in cubo_comp['percentis']:
+        raise NaoEncontrado(f"sem percentis de {metrica} em {ano}")
+    baixo, alto = cubo.percentis(cubo_comp, metrica, ano)
+    tabela = pd.concat([baixo.assign(FAIXA='abaixo_p25'), alto.assign(FAIXA='acima_p75')], ignore_index=True)
+    meta = {nome: cubo.estatistica(cubo_comp, metrica, ano, nome) for nome in ('p25', 'p75')}
+    return tabela, meta
+
+
+@rota('correlacoes')
+def _rota_correlacoes(dados, escopo, parametros):
+    tabela = dados.cubo(escopo)['correlacoes'].reset_index()
+    filtros = {'ANO': _lista(parametros, 'ano', int), 'METODO': _lista(parametros, 'metodo'),
+               'X': _lista(parametros, 'x'), 'Y': _lista(parametros, 'y')}
+    for coluna, valores in filtros.items():
+        if valores:
+            tabela = tabela[tabela[coluna].isin(valores)]
+    return tabela, {}
+
+
+@rota('resumo')
+def _rota_resumo(dados, escopo, parametros):
+    cubo_comp = dados.cubo(escopo)
+    tabela = cubo_comp['resumo'].reset_index()
+    metrica = _metrica(parametros, cubo_comp, obrigatoria=False)
+    if metrica:
+        tabela = tabela[tabela['METRICA'] == metrica]
+    anos = _lista(parametros, 'ano', int)
+    if anos:
+        tabela = tabela[tabela['ANO'].isin(anos)]
+    return tabela, {}
+
+
+@rota('estados')
+def _rota_estados(dados, escopo, parametros):
+    tabela = dados.estados().reset_index()
+    for coluna, valores in (('METRICA', _lista(parametros, 'metrica')), ('ANO', _lista(parametros, 'ano', int)),
+                            ('UF', _lista(parametros, 'estado'))):
+        if valores:
+            tabela = tabela[tabela[coluna].isin(valores)]
+    return tabela, {}
+
+
+# --- SERIALIZAÇÃO ---
+def _limpar(valor):
+    """Converte escalares numpy e troca NaN/inf por None (não existem em JSON)."""
+    if isinstance(valor, dict):
+        return {chave: _limpar(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_limpar(v) for v in valor]
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not np.isfinite(valor):
+        return None
+    return valor
+
+
+def _meta_json(meta):
+    return json.dumps(_limpar(meta), ensure_ascii=False)
+
+
+def corpo_json(tabela, meta):
+    dados = tabela.to_json(orient='records', force_ascii=False, double_precision=6)
+    return f'{{"meta":{_meta_json(meta)},"dados":{dados}}}'.encode()
+
+
+def corpo_arrow(tabela, meta):
+    """Stream IPC do Arrow; o `meta` vai nos metadados do schema (chave b'meta', JSON)."""
+    tabela = pa.Table.from_pandas(tabela, preserve_index=False)
+    tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), b'meta': _meta_json(meta).encode()})
+    destino = io.BytesIO()
+    with pa.ipc.new_stream(destino, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    return destino.getvalue()
+
+
+# --- CONSULTAS ---
+class Api:
+    """Resolve consultas (rota, parâmetros, formato) com ETag e cache de respostas."""
+
+    def __init__(self, dados=None, capacidade=CAPACIDADE_RESPOSTAS):
+        self.dados = dados or Dados()
+        self.respostas = cache_figuras.CacheFiguras(capacidade)
+
+    def etag(self, *partes):
+        texto = json.dumps([self.dados.versao(), *partes], sort_keys=True, default=str)
+        return '"' + hashlib.blake2b(texto.encode(), digest_size=12).hexdigest() + '"'
+
+    def consultar(self, nome, parametros, formato='json'):
+        """(etag, corpo em bytes) de uma consulta; ErroConsulta/NaoEncontrado para consultas inválidas."""
+        if nome not in ROTAS:
+            raise NaoEncontrado(nome)
+        parametros = {chave: valor for chave, valor in parametros.items() if valor is not None and valor != ''}
+        escopo = _escopo(self.dados, parametros)
+        etag = self.etag(nome, parametros, formato)
+
+        def montar():
+            with instrumentacao.medir(f'api_{nome}'):
+                tabela, meta = ROTAS[nome](self.dados, escopo, parametros)
+                return corpo_arrow(tabela, meta) if formato == 'arrow' else corpo_json(tabela, meta)
+        return etag, self.respostas.obter(etag, montar)
+
+    def lote(self, consultas):
+        """Corpo JSON com o resultado de cada consulta do lote, na mesma ordem."""
+        resultados = []
+        for consulta in consultas:
+            try:
+                if not isinstance(consulta, dict) or not isinstance(consulta.get('rota'), str):
+                    raise ErroConsulta('cada consulta deve ser {"rota": ..., "parametros": {...}}')
+                parametros = consulta.get('parametros') or {}
+                if not isinstance(parametros, dict):
+                    raise ErroConsulta("'parametros' deve ser um objeto")
+                _, corpo = self.consultar(consulta['rota'].strip('/'), parametros)
+                resultados.append(corpo.decode())
+            except Exception as erro:
+                # um item com erro não derruba o lote: vira {"erro": ...} na sua posição
+                if not isinstance(erro, (ErroConsulta, NaoEncontrado)):
+                    traceback.print_exc()
+                resultados.append(json.dumps({'erro': _mensagem(erro)}, ensure_ascii=False))
+        return f'{{"resultados":[{",".join(resultados)}]}}'.encode()
+
+
+def _mensagem(erro):
+    if isinstance(erro, NaoEncontrado):
+        return f"não encontrado: {erro.args[0]}"
+    if isinstance(erro, ErroConsulta):
+        return str(erro)
+    return f"erro interno: {type(erro).__name__}"
+
+
+# --- SERVIDOR ---
+class Manipulador(BaseHTTPRequestHandler):
+    server_version = 'EstudoEducacionalAPI/1.0'
+    api = None      # definido em servir()
+
+    def _responder(self, status, corpo=b'', tipo='application/json; charset=utf-8', etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', f'public, max-age={MAX_AGE}')
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header('Content-Type', tipo)
+            self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        if status != HTTPStatus.NOT_MODIFIED and self.command != 'HEAD':
+            self.wfile.write(corpo)
+
+    def _erro(self, status, mensagem):
+        self._responder(status, json.dumps({'erro': mensagem}, ensure_ascii=False).encode())
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        nome = url.path.strip('/')
+        parametros = {chave: valores[-1] for chave, valores in parse_qs(url.query).items()}
+
+        if nome == 'metricas':
+            corpo = instrumentacao.INSTRUMENTACAO.como_prometheus(prefixo='api').encode()
+            return self._responder(HTTPStatus.OK, corpo, 'text/plain; version=0.0.4')
+
+        formato = parametros.pop('formato', None)
+        if formato is None:
+            formato = 'arrow' if ARROW in self.headers.get('Accept', '') else 'json'
+        if formato not in ('json', 'arrow'):
+            return self._erro(HTTPStatus.BAD_REQUEST, f"formato inválido: {formato}")
+
+        try:
+            # o ETag só depende da consulta e da versão dos dados: 304 sem montar a resposta
+            etag = self.api.etag(nome, parametros, formato) if nome in ROTAS else None
+            if etag and etag in self.headers.get('If-None-Match', ''):
+                return self._responder(HTTPStatus.NOT_MODIFIED, etag=etag)
+            etag, corpo = self.api.consultar(nome, parametros, formato)
+        except NaoEncontrado as erro:
+            return self._erro(HTTPStatus.NOT_FOUND, _mensagem(erro))
+        except ErroConsulta as erro:
+            return self._erro(HTTPStatus.BAD_REQUEST, str(erro))
+        except Exception as erro:
+            self.log_error('%s', traceback.format_exc())
+            return self._erro(HTTPStatus.INTERNAL_SERVER_ERROR, _mensagem(erro))
+        self._responder(HTTPStatus.OK, corpo, ARROW if formato == 'arrow' else 'application/json; charset=utf-8', etag)
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        if urlsplit(self.path).path.strip('/') != 'lote':
+            return self._erro(HTTPStatus.NOT_FOUND, f"não encontrado: {self.path}")
+        try:
+            tamanho = int(self.headers.get('Content-Length', 0))
+            consultas = json.loads(self.rfile.read(tamanho) or b'{}')['consultas']
+            if not isinstance(consultas, list):
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            return self._erro(HTTPStatus.BAD_REQUEST, 'corpo deve ser {"consultas": [{"rota": ..., "parametros": {...}}]}')
+        self._responder(HTTPStatus.OK, self.api.lote(consultas))
+
+
+def servir(host='127.0.0.1', porta=PORTA_PADRAO, api=None):
+    Manipulador.api = api or Api()
+    servidor = ThreadingHTTPServer((host, porta), Manipulador)
+    print(f"API em http://{host}:{porta}/ (Ctrl+C para sair)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP somente leitura dos indicadores.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    args = parser.parse_args()
+    servir(args.host, args.porta)
+
+
+if __name__ == '__main__':
+    main()
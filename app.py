@@ -1,10 +1,25 @@
-import streamlit as st
+import hmac
+import os
+
 import pandas as pd
-import plotly.express as px
-import matplotlib.pyplot as plt
-import numpy as np
+import streamlit as st
+# plotly e matplotlib são importados dentro das funções de figura: só carregam
+# quando a primeira figura é construída, não antes do primeiro envio à página
+# (ver tempo_inicio.py)
 # from img import img_list, img_box, img_ideb, img_ideb_ce, mapa_taxa, box_23, box_19
-from func import grafico_comparativo, gerar_histograma
+from func import grafico_comparativo, gerar_histograma, gerar_dispersao, gerar_boxplot, gerar_boxplot_quantis, gerar_barras_estados
+import registro
+import cubo
+import cache_figuras
+import imagens
+import instrumentacao
+import mapas
+import espacial
+import ingestao
+import alunos
+import quantis
+import municipios
+import textos
 
 
 
@@ -26,41 +41,124 @@ mapa_taxa = r'imgs/mapa_taxa.jpeg'
 box_23 = r'imgs/box_2023.png'
 box_19 = r'imgs/box_2019.png'
 
+# sizes do <picture> para imagens em duas colunas (empilhadas em telas estreitas)
+METADE = '(max-width: 640px) 100vw, 50vw'
+
+# Cores de quem não tem / tem o recurso da métrica selecionada (boxplots por aluno)
+CORES_ACESSO = ('#1f77b4', '#ff7f0e')
+# Ocupação do pai (Q003) na ordem dos grupos do questionário; sem resposta conta como "Sem info"
+ROTULOS_OCUPACAO = {**ingestao.OCUPACOES, quantis.SEM_OCUPACAO: ingestao.OCUPACOES['F']}
+ORDEM_OCUPACAO = tuple(ingestao.OCUPACOES.values())
+
 # --- CARREGAMENTO DE DADOS ---
+# Anos comparados no dashboard
+ANO_PRE, ANO_POS, ANO_RECENTE = 2019, 2023, 2024
+
+# Hash dos indicadores de cada ano: quando um ano muda, só os caches que dependem dele são refeitos
 @st.cache_data
-def load_data():
-    df19 = pd.read_csv('indicadores19.csv')
-    df24 = pd.read_csv('indicadores24.csv')
-    df23 = pd.read_csv('indicadores23.csv')    
-
-    cols_rename = {
-            'NO_MUNICIPIO_PROVA': 'MUNICIPIO', 
-            'Computador': 'Total_Computador', 
-            'Internet': 'Total_Internet'
-        }
-
-    df19 = df19.rename(columns=cols_rename)
-    df23 = df23.rename(columns=cols_rename)
-    df24 = df24.rename(columns=cols_rename)
-    
-    return df19, df23, df24
+def load_impressoes(datas):
+    # refeito só quando a data ou o tamanho de algum arquivo muda (não relê os CSVs a cada rerun)
+    return registro.impressoes()
 
-try:
-    df19, df23, df24 = load_data()
-except FileNotFoundError:
-    st.error("⚠️ Arquivos 'indicadores19.csv' ou 'indicadores24.csv' não encontrados na pasta.")
-    st.stop()
+IMPRESSOES = load_impressoes(registro.datas())
+VERSAO = tuple(sorted(IMPRESSOES.items()))
+
+@st.cache_data
+def load_ufs(versao):
+    # UFs gravadas (no armazém, das estatísticas do Parquet, sem ler os dados)
+    return registro.ufs_disponiveis()
+
+@instrumentacao.cacheada(st.cache_data(max_entries=4))
+def load_data(versao, escopo):
+    # Tabela longa (ANO, MUNICIPIO) com todos os anos, só das UFs do escopo
+    return registro.carregar_painel(cubo.COLUNAS, ufs=municipios.ufs_do_escopo(escopo))
+
+@instrumentacao.cacheada(st.cache_resource(max_entries=4))
+def load_cubo(versao, escopo):
+    # Comparações pré-calculadas (python cubo.py --uf <escopo>); compartilhado entre sessões, sem cópia
+    return cubo.carregar_cubo(escopo=escopo)
+
+@instrumentacao.cacheada(st.cache_resource)
+def load_geometria():
+    # Malha municipal já simplificada (python mapas.py <malha.geojson>); None se não compilada
+    return mapas.carregar_geometria() if mapas.existe() else None
+
+@instrumentacao.cacheada(st.cache_resource)
+def load_vizinhanca():
+    # Vizinhança de contiguidade da malha (gravada em dados/geometria na primeira vez)
+    return espacial.carregar_vizinhanca()
+
+@instrumentacao.cacheada(st.cache_data(max_entries=4))
+def load_quantis(versao, escopo):
+    # Esboços de quantis das notas dos alunos gravados na ingestão, só das UFs do escopo
+    return quantis.carregar(ufs=municipios.ufs_do_escopo(escopo))
+
+@instrumentacao.cacheada(st.cache_resource(max_entries=1))
+def load_manifesto_imagens(versao):
+    # Variantes WebP com hash (python imagens.py); None sem build ou sem serviço estático
+    if versao is None or not st.get_option('server.enableStaticServing'):
+        return None
+    return imagens.carregar_manifesto()
+
+@instrumentacao.cacheada(st.cache_data(max_entries=64))
+def load_distribuicao(impressao, ano, cd_mun, por, metrica):
+    # impressao = alunos.impressao(ano): recompilar o microdado invalida só aquele ano
+    return alunos.distribuicao(ano, cd_mun, por, metrica)
+
+def imagem(caminho, use_container_width=False, sizes='100vw'):
+    # <picture> responsivo quando há variantes; senão o original via st.image
+    html = imagens.html_picture(
+        caminho, load_manifesto_imagens(imagens.versao_manifesto()), sizes, use_container_width
+    )
+    if html is None:
+        st.image(caminho, use_container_width=use_container_width)
+    else:
+        st.markdown(html, unsafe_allow_html=True)
 
 # --- BARRA LATERAL (CONTROLES) ---
 st.sidebar.header("⚙️ Configurações")
+
+# Seletor de estado só aparece com indicadores de mais de uma UF
+UFS_DISPONIVEIS = load_ufs(VERSAO)
+if len(UFS_DISPONIVEIS) > 1:
+    escopos = [municipios.BRASIL] + UFS_DISPONIVEIS
+    ESCOPO = st.sidebar.selectbox(
+        "Estado:", escopos,
+        index=escopos.index(municipios.UF_PADRAO) if municipios.UF_PADRAO in escopos else 0,
+        format_func=lambda uf: f"{uf} · {municipios.UFS.get(uf, 'Brasil (todas as UFs)')}",
+    )
+else:
+    ESCOPO = UFS_DISPONIVEIS[0] if UFS_DISPONIVEIS else municipios.UF_PADRAO
+
+# Nome do escopo com artigo, para o texto corrido ("o Ceará", "a Bahia", "São Paulo")
+SEM_ARTIGO = {'AL', 'GO', 'MG', 'PE', 'RO', 'RR', 'SC', 'SE', 'SP'}
+FEMININOS = {'BA', 'PB'}
+if ESCOPO == municipios.BRASIL:
+    LOCAL = 'o Brasil'
+else:
+    LOCAL = municipios.UFS.get(ESCOPO, ESCOPO)
+    if ESCOPO not in SEM_ARTIGO:
+        LOCAL = ('a ' if ESCOPO in FEMININOS else 'o ') + LOCAL
+
+try:
+    painel = load_data(VERSAO, ESCOPO)
+    cubo_comp = load_cubo(VERSAO, ESCOPO)
+    df19 = registro.fatia_ano(painel, ANO_PRE)
+    df23 = registro.fatia_ano(painel, ANO_POS)
+    df24 = registro.fatia_ano(painel, ANO_RECENTE)
+except (FileNotFoundError, KeyError):
+    st.error("⚠️ Arquivos 'indicadores19.csv', 'indicadores23.csv' ou 'indicadores24.csv' não encontrados na pasta.")
+    st.stop()
+
 st.sidebar.info("Selecione a métrica que deseja comparar entre o período Pré e Pós Pandemia.")
 
-metricas_disponiveis = {
-    'Taxa_Inclusao_Digital': '🌐 Taxa de Suporte Digital ao Estudo (PC + Net)',
-    'Taxa_Computador': '💻 Posse de Computador',
-    'Taxa_Internet': '📡 Acesso à Internet'
-    # 'Nota_Media_Geral': '📝 Nota Média do ENEM'
+ICONES_METRICAS = {
+    'Taxa_Inclusao_Digital': '🌐',
+    'Taxa_Computador': '💻',
+    'Taxa_Internet': '📡',
+    # 'Nota_Media_Geral': '📝'
 }
+metricas_disponiveis = {metrica: f'{icone} {cubo.ROTULOS[metrica]}' for metrica, icone in ICONES_METRICAS.items()}
 
 metrica_selecionada = st.sidebar.radio(
     "Métrica de Análise:", 
@@ -70,267 +168,394 @@ metrica_selecionada = st.sidebar.radio(
 
 nome_metrica = metricas_disponiveis[metrica_selecionada]
 
-# --- CÁLCULOS GERAIS ---
-media_19 = df19[metrica_selecionada].mean()
-media_23 = df23[metrica_selecionada].mean()
-delta_absoluto = media_23 - media_19
-delta_percentual = delta_absoluto * 100
-
-if delta_absoluto > 0:
-    cor_delta = "normal" 
-    cor_texto = "green"
-    icone = "📈"
-    tendencia = "CRESCIMENTO"
-else:
-    cor_delta = "normal" 
-    cor_texto = "red"
-    icone = "📉"
-    tendencia = "RETROCESSO"
-
-# --- INTERFACE PRINCIPAL ---
-st.title("📊 Panorama da Educação Digital no Ceará")
-# --- Seção Explicativa ---
-st.markdown('### 💡 Métrica de Interesse: Taxa de Suporte Digital ao Estudo')
-st.markdown(
-    'O indicador mede a **proporção de estudantes que possuem acesso a um computador** '
-    '***E*** **acesso à internet** em casa, essencial para uma participação digital completa **no contexto educativo, visando o aprendizado e desempenho nas provas**. '
-    'É calculado a partir das seguintes variáveis, dividindo pelo **Total de Alunos**:'
+ponderar = st.sidebar.toggle(
+    "Ponderar pelo número de alunos",
+    help="Médias estaduais ponderadas por Total de Alunos (cada aluno pesa igual) em vez da média simples entre municípios."
 )
+coluna_media = 'media_ponderada' if ponderar else 'media'
+rotulo_media = "Média Nacional" if ESCOPO == municipios.BRASIL else "Média Estadual"
+rotulo_media += " (ponderada)" if ponderar else ""
+
+# --- FIGURAS (cache por entrada real) ---
+# Servidas pelo cache LRU compartilhado entre sessões (cache_figuras.CACHE),
+# chaveado por (tipo, métrica, ano, estilo); trocar a métrica só constrói as
+# figuras que dependem dela. O ano entra na chave junto com o escopo (UF) e o
+# hash dos seus indicadores, então atualizar um ano só invalida as figuras daquele ano.
+def _ano(ano):
+    return (ESCOPO, ano, IMPRESSOES.get(ano))
+
+@instrumentacao.medido
+def figura_histograma(ano, coluna, cor, titulo, x_label, is_nota=False):
+    return cache_figuras.CACHE.plotly(
+        ('histograma', coluna, _ano(ano), (cor, titulo, x_label, is_nota)),
+        lambda: gerar_histograma(registro.fatia_ano(painel, ano), coluna, cor, titulo, x_label, is_nota)
+    )
 
-# Fórmula em latex
-with st.container(border=True):
-    st.latex(
-        r'''
-        \text{Taxa de Suporte Digital ao Estudo} = \frac{\text{Alunos com Computador } \cap \text{ Alunos com Internet}}{\text{Total de Alunos}}
-        '''
+@instrumentacao.medido
+def figura_dispersao(ano, x, y, title, labels, color_discrete_sequence):
+    estilo = (title, tuple(labels.items()), tuple(color_discrete_sequence))
+    return cache_figuras.CACHE.plotly(
+        ('dispersao', (x, y), _ano(ano), estilo),
+        lambda: gerar_dispersao(registro.fatia_ano(painel, ano), x, y, title, labels, color_discrete_sequence)
     )
 
-    st.markdown('---')
+@instrumentacao.medido
+def figura_boxplot(coluna, anos, rotulos, titulo, y_label):
+    def construir():
+        grupos = [painel.xs(ano, level='ANO')[coluna].dropna() for ano in anos]
+        return gerar_boxplot(grupos, rotulos, titulo, y_label)
+    return cache_figuras.CACHE.png(('boxplot', coluna, tuple(_ano(a) for a in anos), (tuple(rotulos), titulo, y_label)), construir)
+
+@instrumentacao.medido
+def figura_mapa(coluna, ano, rotulo, is_nota=False):
+    _, geojson = load_geometria()
+    return cache_figuras.CACHE.plotly(
+        ('mapa', coluna, _ano(ano), (rotulo, is_nota)),
+        lambda: mapas.figura_mapa(registro.fatia_ano(painel, ano), coluna, geojson, rotulo=rotulo, is_nota=is_nota)
+    )
 
-    st.markdown('#### Detalhes das Variáveis')
-    st.markdown(
-        '* **Alunos com Computador $\cap$ Alunos com Internet:** '
-        'O número de alunos que responderam **sim** para **AMBOS** os requisitos. '
-        'Representa a **Inclusão Plena**.'
+@instrumentacao.cacheada(st.cache_data(max_entries=16))
+def load_moran(chave_ano, coluna):
+    # chave_ano = _ano(ano): recalcula só quando o escopo ou os dados do ano mudam
+    return espacial.moran(painel, coluna, chave_ano[1], load_vizinhanca())
+
+@instrumentacao.medido
+def figura_lisa(coluna, ano, rotulo):
+    _, geojson = load_geometria()
+    return cache_figuras.CACHE.plotly(
+        ('lisa', coluna, _ano(ano), rotulo),
+        lambda: mapas.figura_clusters(load_moran(_ano(ano), coluna)[1], geojson, f'Agrupamentos (LISA): {rotulo}')
     )
-    st.markdown(
-        '* **Total de Alunos:** O número total de estudantes por município (ou total, caso agreguemos para o estado)'
+
+@instrumentacao.medido
+def figura_quantis(por, ano, metrica, nome_metrica, titulo, rotulos=None, ordem=None):
+    # Nota dos alunos por `por` x acesso ao recurso da métrica, com os quartis dos esboços (quantis.py)
+    versao = quantis.versao()
+    def construir():
+        esboco = load_quantis(versao, ESCOPO)
+        esboco = quantis.com_acesso(esboco[esboco['ANO'] == ano], metrica)
+        if rotulos is not None:
+            esboco[por] = esboco[por].map(rotulos)
+        if ordem is not None:
+            esboco = esboco[esboco[por].isin(ordem)]
+        resumo = quantis.resumo(esboco, [por, 'ACESSO'])
+        resumo['ACESSO'] = resumo['ACESSO'].map({False: 'Sem acesso', True: 'Com acesso'})
+        return gerar_boxplot_quantis(resumo, titulo, 'Nota Média', x=por, serie='ACESSO', cores=CORES_ACESSO,
+                                     ordem=ordem, titulo_serie=nome_metrica)
+    return cache_figuras.CACHE.plotly(
+        ('quantis', por, (ESCOPO, ano, dict(versao).get(ano)), (metrica, nome_metrica, titulo, ordem)), construir
     )
 
-with st.container(border=True):
-    st.markdown(f'### Mapa de calor da Taxa de Suporte Digital ao Estudo no Ceará (2023)')
-    col1, col2, col3 = st.columns([1, 6, 1])
-    with col2:
-        st.image(mapa_taxa, use_container_width=True)
+def anos_com_grupo(coluna, vazio):
+    # Anos cujos esboços trazem a informação da `coluna` (ex.: 2024 não tem a dependência da escola)
+    esboco = load_quantis(quantis.versao(), ESCOPO)
+    return sorted(esboco.loc[esboco[coluna] != vazio, 'ANO'].unique())
+
+@instrumentacao.medido
+def figura_estados(coluna, anos, coluna_media, rotulo):
+    def construir():
+        medias = pd.DataFrame({ano: cubo.estados(cubo_comp, coluna, ano, coluna_media) for ano in anos})
+        return gerar_barras_estados(medias, coluna, rotulo)
+    return cache_figuras.CACHE.plotly(
+        ('estados', coluna, tuple(_ano(a) for a in anos), (coluna_media, rotulo)), construir
+    )
 
-# st.markdown("---")
-# --- Comparativo ---
-with st.container(border=True):
-    st.markdown(f"### Comparativo: **{nome_metrica}**")
-    # st.markdown("---")
 
-    col1, col2 = st.columns(2)
+def legenda_correlacao(x, y, ano):
+    """Legenda com IC 95% (bootstrap) de Pearson e o Spearman correspondente."""
+    pearson = cubo.correlacao_ic(cubo_comp, x, y, ano, 'pearson')
+    spearman = cubo.correlacao_ic(cubo_comp, x, y, ano, 'spearman')
+    st.caption(
+        f"IC 95% (bootstrap): [{pearson['ic_inf']:.2f}; {pearson['ic_sup']:.2f}] · "
+        f"Spearman: {spearman['r']:.2f} [{spearman['ic_inf']:.2f}; {spearman['ic_sup']:.2f}] · "
+        f"n = {int(pearson['n'])}"
+    )
 
+def ideb_disponivel():
+    """
+    Se há IDEB no escopo nos dois anos comparados: os indicadores gerados pela
+    ingestão não o têm, e nos CSVs do notebook ele só existe para o Ceará.
+    """
+    return 'IDEB' in painel.columns and all(
+        cubo.tem_correlacao(cubo_comp, 'IDEB', 'Nota_Media_Geral', ano) for ano in (ANO_PRE, ANO_POS)
+    )
+
+def aviso_sem_par(comparacao):
+    """Lista os municípios que ficaram fora da tabela por faltarem em um dos anos."""
+    for ano, nomes in comparacao['sem_par'].items():
+        if nomes:
+            st.caption(f"Sem dados no outro ano ({ano}): {', '.join(nomes)}")
+
+
+# --- SEÇÕES ---
+# Cada seção recebe só as entradas de que depende, lê os números do cubo e
+# as figuras do cache. Ao trocar a métrica (barra lateral, que sempre roda o
+# script inteiro), as seções que não dependem dela são servidas do cache.
+# Só as seções com widgets próprios (mapa, alunos) são fragmentos: mexer
+# neles roda apenas a seção.
+def tendencia_correlacao(metrica_selecionada):
+    """Correlações com a nota (2019/2023) e a tendência exibida no texto."""
+    # Preparar dados (remover NA)
+    df19_corr = df19[["Nota_Media_Geral", metrica_selecionada]].dropna()
+    df23_corr = df23[["Nota_Media_Geral", metrica_selecionada]].dropna()
+    # Correlação de Pearson (pré-calculada no cubo)
+    corr19 = round(cubo.estatistica(cubo_comp, metrica_selecionada, ANO_PRE, 'corr_nota'), 2) if not df19_corr.empty else None
+    corr24 = round(cubo.estatistica(cubo_comp, metrica_selecionada, ANO_POS, 'corr_nota'), 2) if not df23_corr.empty else None
+    delta_absoluto_corr = corr24 - corr19
+    delta_percentual = delta_absoluto_corr * 100
+
+    if delta_absoluto_corr > 0:
+        cor_delta = "normal" 
+        cor_texto = "green"
+        icone = "📈"
+        tendencia = "AUMENTO"
+    else:
+        cor_delta = "normal" 
+        cor_texto = "red"
+        icone = "📉"
+        tendencia = "QUEDA"
+    return corr19, corr24, cor_texto, icone, tendencia
+
+
+@st.fragment
+@instrumentacao.medido
+def secao_mapa(metrica_selecionada, nome_metrica):
+    st.markdown(f'### Mapa de calor: {nome_metrica}')
+    if load_geometria() is None:
+        # sem malha compilada: mantém o mapa estático de 2023
+        col1, col2, col3 = st.columns([1, 6, 1])
+        with col2:
+            imagem(mapa_taxa, use_container_width=True)
+        return
+
+    opcoes = {metrica_selecionada: nome_metrica, 'Nota_Media_Geral': '📝 Nota Média do ENEM'}
+    col1, col2 = st.columns(2)
     with col1:
-        st.subheader("2019 (Pré-Pandemia)")
-        st.metric(label="Média Estadual", value=f"{media_19:.2f}", delta_color="off")    
+        coluna = st.radio("Indicador do mapa:", list(opcoes), format_func=opcoes.get, horizontal=True)
+    with col2:
+        ano = st.select_slider("Ano:", registro.anos_do_painel(painel), value=ANO_POS)
+    st.plotly_chart(
+        figura_mapa(coluna, ano, opcoes[coluna], is_nota=coluna.startswith('Nota')),
+        use_container_width=True
+    )
 
-    # --- COLUNA 2: 2024 ---
+    # autocorrelação espacial: os municípios baixos (ou altos) estão agrupados?
+    globais, _ = load_moran(_ano(ano), coluna)
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.metric("I de Moran", f"{globais['I']:.3f}")
+        st.caption(
+            f"p = {globais['p_sim']:.3f} ({globais['permutacoes']} permutações). Acima de "
+            f"{globais['esperado']:.3f}, municípios vizinhos tendem a ter valores parecidos; "
+            "o mapa destaca os agrupamentos significativos (Alto-Alto, Baixo-Baixo) e os "
+            "municípios que destoam dos vizinhos."
+        )
     with col2:
-        st.subheader("2023 (Pós-Pandemia)")
-        st.metric(label="Média Estadual", value=f"{media_23:.2f}", delta=f"{delta_percentual:.1f} p.p.", delta_color=cor_delta)
-    graf1, graf2 = st.columns(2)
-    with graf1:
-        fig1 = gerar_histograma(
-        df=df19,
-        coluna=metrica_selecionada,
-        cor='#8e44ad', # roxo
-        titulo="Distribuição dos Municípios (2023)",
-        x_label=nome_metrica,
-        is_nota=False
+        st.plotly_chart(figura_lisa(coluna, ano, opcoes[coluna]), use_container_width=True)
+
+
+@instrumentacao.medido
+def secao_estados(metrica_selecionada, nome_metrica, coluna_media):
+    # agregados por UF pré-calculados no cubo (cubo.py --uf BR)
+    st.markdown(f'### Comparativo entre estados: {nome_metrica}')
+    st.plotly_chart(
+        figura_estados(metrica_selecionada, (ANO_PRE, ANO_POS), coluna_media, rotulo_media),
+        use_container_width=True
     )
-        st.plotly_chart(fig1, use_container_width=True)
-    
-    with graf2:
-        fig2 = gerar_histograma(
-            df=df23,
+    tabela = pd.DataFrame({
+        str(ano): cubo.estados(cubo_comp, metrica_selecionada, ano, coluna_media) for ano in (ANO_PRE, ANO_POS)
+    })
+    tabela['Variação (p.p)'] = ((tabela[str(ANO_POS)] - tabela[str(ANO_PRE)]) * 100).round(2)
+    tabela.insert(0, 'Estado', tabela.index.map(municipios.UFS))
+    with st.expander("Ver dados por estado"):
+        st.dataframe(tabela.sort_values('Variação (p.p)', ascending=False))
+
+
+@instrumentacao.medido
+def secao_comparativo(metrica_selecionada, nome_metrica, coluna_media):
+    media_19 = cubo.estatistica(cubo_comp, metrica_selecionada, ANO_PRE, coluna_media)
+    media_23 = cubo.estatistica(cubo_comp, metrica_selecionada, ANO_POS, coluna_media)
+    comparacao = cubo.par(cubo_comp, metrica_selecionada, ANO_PRE, ANO_POS)
+    delta_absoluto = media_23 - media_19
+    delta_percentual = delta_absoluto * 100
+
+    if delta_absoluto > 0:
+        cor_delta = "normal" 
+        cor_texto = "green"
+        icone = "📈"
+        tendencia = "CRESCIMENTO"
+    else:
+        cor_delta = "normal" 
+        cor_texto = "red"
+        icone = "📉"
+        tendencia = "RETROCESSO"
+
+    with st.container(border=True):
+        st.markdown(f"### Comparativo: **{nome_metrica}**")
+        # st.markdown("---")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.subheader("2019 (Pré-Pandemia)")
+            st.metric(label=rotulo_media, value=f"{media_19:.2f}", delta_color="off")    
+
+        # --- COLUNA 2: 2024 ---
+        with col2:
+            st.subheader("2023 (Pós-Pandemia)")
+            st.metric(label=rotulo_media, value=f"{media_23:.2f}", delta=f"{delta_percentual:.1f} p.p.", delta_color=cor_delta)
+        graf1, graf2 = st.columns(2)
+        with graf1:
+            fig1 = figura_histograma(
+            ano=ANO_PRE,
             coluna=metrica_selecionada,
-            cor='#ff9f43', # laranja
+            cor='#8e44ad', # roxo
             titulo="Distribuição dos Municípios (2023)",
             x_label=nome_metrica,
             is_nota=False
         )
-        st.plotly_chart(fig2, use_container_width=True)
-
-
-    # --- Storytelling ---
-    st.subheader("💡 Análise do Cenário")
-
-    insight = ""
-    if metrica_selecionada == 'Taxa_Computador':
-        insight = "Isso evidencia o **'Paradoxo da Conectividade'**. Embora haja mais alunos, o estoque de equipamentos de produtividade (computadores) diminuiu, sugerindo uma migração massiva para o celular."
-    elif metrica_selecionada == 'Taxa_Internet':
-        insight = "O acesso à rede foi **universalizado**. A pandemia acelerou a infraestrutura de telecomunicações, rompendo a barreira do sinal para a maioria dos municípios. A Internet virou uma espécie de commodity e sua rápida proliferação foi suficiente para aumentar os índices do ENEM para a maioria"
-    elif metrica_selecionada == 'Taxa_Inclusao_Digital':
-        insight = "A Inclusão Plena (ter as duas coisas) caiu. Estamos criando uma geração **'Mobile-Only'**, o que pode limitar o desenvolvimento de habilidades técnicas avançadas."
+            st.plotly_chart(fig1, use_container_width=True)
+    
+        with graf2:
+            fig2 = figura_histograma(
+                ano=ANO_POS,
+                coluna=metrica_selecionada,
+                cor='#ff9f43', # laranja
+                titulo="Distribuição dos Municípios (2023)",
+                x_label=nome_metrica,
+                is_nota=False
+            )
+            st.plotly_chart(fig2, use_container_width=True)
 
-    texto_explicativo = f"""
-    Entre 2019 e 2023, o Ceará observou um(a) :{cor_texto}[**{tendencia}**] de **{abs(delta_percentual):.1f} pontos percentuais** neste indicador.
-    {insight}
-    """
 
-    # st.markdown(f"#### {icone} O que isso significa?")
-    st.write(texto_explicativo)
-    # --- EXTRAS: TABELA DE DADOS ---
-    with st.expander("🔍 Ver Mais"):
-        with st.expander("Ver Dados Detalhados por Município"):
-            df_merge = pd.merge(df19[['MUNICIPIO', metrica_selecionada, 'Total_Alunos']], df23[['MUNICIPIO', metrica_selecionada, 'Total_Alunos']], on='MUNICIPIO', suffixes=('_19', '_23'))
-            df_merge[f'{metrica_selecionada}_19'] = round((df_merge[f'{metrica_selecionada}_19']) * 1, 4)
-            df_merge[f'{metrica_selecionada}_23'] = round((df_merge[f'{metrica_selecionada}_23']) * 1, 4)
-            df_merge['Variação (p.p)'] = round((df_merge[f'{metrica_selecionada}_23'] - df_merge[f'{metrica_selecionada}_19']), 4) * 100.000
-            # df_merge[f'{metrica_selecionada}_19'] = ((df_merge[f'{metrica_selecionada}_19'])).map('{:.2f}%'.format)
-            # df_merge[f'{metrica_selecionada}_23'] = ((df_merge[f'{metrica_selecionada}_23'])).map('{:.2f}%'.format)
-            st.dataframe(df_merge.sort_values('Variação (p.p)', ascending=False))
-        with st.expander("Municípios abaixo do percentil 25 em 2023"):
-            p25 = np.percentile(df23[metrica_selecionada], 25)
-            df_baixo = df23[df23[metrica_selecionada] <= p25]
-            df_baixo = df_baixo[['MUNICIPIO', metrica_selecionada, 'Total_Alunos']]
-            df_baixo[metrica_selecionada] = round((df_baixo[metrica_selecionada]) * 1, 4)
-            st.dataframe(df_baixo.sort_values(metrica_selecionada))
-        with st.expander("Municípios acima do percentil 75 em 2023"):
-            p75 = np.percentile(df23[metrica_selecionada], 75)
-            df_alto = df23[df23[metrica_selecionada] >= p75]
-            df_alto = df_alto[['MUNICIPIO', metrica_selecionada, 'Total_Alunos']]
-            df_alto[metrica_selecionada] = round((df_alto[metrica_selecionada]) * 1, 4)
-            st.dataframe(df_alto.sort_values(metrica_selecionada, ascending=False))
+        # --- Storytelling ---
+        st.subheader("💡 Análise do Cenário")
 
-        
+        insight = ""
+        if metrica_selecionada == 'Taxa_Computador':
+            insight = "Isso evidencia o **'Paradoxo da Conectividade'**. Embora haja mais alunos, o estoque de equipamentos de produtividade (computadores) diminuiu, sugerindo uma migração massiva para o celular."
+        elif metrica_selecionada == 'Taxa_Internet':
+            insight = "O acesso à rede foi **universalizado**. A pandemia acelerou a infraestrutura de telecomunicações, rompendo a barreira do sinal para a maioria dos municípios. A Internet virou uma espécie de commodity e sua rápida proliferação foi suficiente para aumentar os índices do ENEM para a maioria"
+        elif metrica_selecionada == 'Taxa_Inclusao_Digital':
+            insight = "A Inclusão Plena (ter as duas coisas) caiu. Estamos criando uma geração **'Mobile-Only'**, o que pode limitar o desenvolvimento de habilidades técnicas avançadas."
 
+        texto_explicativo = f"""
+        Entre 2019 e 2023, {LOCAL} observou um(a) :{cor_texto}[**{tendencia}**] de **{abs(delta_percentual):.1f} pontos percentuais** neste indicador.
+        {insight}
+        """
 
-## COMPARATIVO ENEM 2019 X 2023
-# alunos19 = pd.read_csv('alunos19.csv')
-# alunos23 = pd.read_csv('alunos23.csv')  
+        # st.markdown(f"#### {icone} O que isso significa?")
+        st.write(texto_explicativo)
+        # --- EXTRAS: TABELA DE DADOS ---
+        with st.expander("🔍 Ver Mais"):
+            with st.expander("Ver Dados Detalhados por Município"):
+                st.dataframe(comparacao['detalhe'])
+                aviso_sem_par(comparacao)
+            with st.expander("Municípios abaixo do percentil 25 em 2023"):
+                df_baixo, df_alto = cubo.percentis(cubo_comp, metrica_selecionada, ANO_POS)
+                st.dataframe(df_baixo)
+            with st.expander("Municípios acima do percentil 75 em 2023"):
+                st.dataframe(df_alto)
+            with st.expander("Municípios atípicos em 2023"):
+                atipicos = cubo.atipicos(cubo_comp, metrica_selecionada, ANO_POS)
+                if atipicos.empty:
+                    st.write("Nenhum município foge do padrão neste indicador.")
+                else:
+                    st.caption("Municípios com |z robusto| > 3,5 (mediana e MAD do ano): valores muito acima ou abaixo dos demais.")
+                    st.dataframe(atipicos[['valor', 'z', 'z_robusto']].style.format('{:.2f}'))
+
+
+@instrumentacao.medido
+def secao_enem(coluna_media):
+    ## COMPARATIVO ENEM 2019 X 2023
+    # alunos19 = pd.read_csv('alunos19.csv')
+    # alunos23 = pd.read_csv('alunos23.csv')  
 
-with st.container(border=True):
-    # nota_media19 = alunos19['media'].mean()
-    # nota_media24 = alunos23['media'].mean()
-    nota_media19 = df19['Nota_Media_Geral'].dropna().mean()
-    nota_media24 = df23['Nota_Media_Geral'].dropna().mean()
-    delta_enem = ((nota_media24- nota_media19) / nota_media19) * 100
-    if delta_enem > 0:
-        cor_delta_enem = "normal" 
-        cor_texto_enem = "green"
-        icone_enem = "📈"
-        tendencia_enem = "CRESCIMENTO"
-    else:
-        cor_delta_enem = "inverse" 
-        cor_texto_enem = "red"
-        icone_enem = "📉"
-        tendencia_enem = "RETROCESSO"
-    insight_enem = "Surpreendentemente, **o desempenho subiu** mesmo com a queda dos computadores. Hipótese provável: o uso de **IA Generativa e Celulares** compensou a falta de hardware físico. \n\nA universalização da internet atuou como uma rede de segurança, garantindo um aumento na nota média através da inclusão massiva. No entanto, trocamos um crescimento potencial de alta eficiência (via computadores) por um crescimento de volume (via mobile), o que sugere que estamos operando abaixo do nosso potencial máximo"
-    texto_explicativo_nota= f"""
-    Entre 2019 e 2023, o Ceará observou um(a) :{cor_texto_enem}[**{tendencia_enem}**] de **{abs(delta_enem):.1f} %** neste indicador.
-    {insight_enem}
-    """
+    with st.container(border=True):
+        # nota_media19 = alunos19['media'].mean()
+        # nota_media24 = alunos23['media'].mean()
+        comparacao_enem = cubo.par(cubo_comp, 'Nota_Media_Geral', ANO_PRE, ANO_POS)
+        nota_media19 = cubo.estatistica(cubo_comp, 'Nota_Media_Geral', ANO_PRE, coluna_media)
+        nota_media24 = cubo.estatistica(cubo_comp, 'Nota_Media_Geral', ANO_POS, coluna_media)
+        delta_enem = ((nota_media24 - nota_media19) / nota_media19) * 100
+        if delta_enem > 0:
+            cor_delta_enem = "normal" 
+            cor_texto_enem = "green"
+            icone_enem = "📈"
+            tendencia_enem = "CRESCIMENTO"
+        else:
+            cor_delta_enem = "inverse" 
+            cor_texto_enem = "red"
+            icone_enem = "📉"
+            tendencia_enem = "RETROCESSO"
+        insight_enem = "Surpreendentemente, **o desempenho subiu** mesmo com a queda dos computadores. Hipótese provável: o uso de **IA Generativa e Celulares** compensou a falta de hardware físico. \n\nA universalização da internet atuou como uma rede de segurança, garantindo um aumento na nota média através da inclusão massiva. No entanto, trocamos um crescimento potencial de alta eficiência (via computadores) por um crescimento de volume (via mobile), o que sugere que estamos operando abaixo do nosso potencial máximo"
+        texto_explicativo_nota= f"""
+        Entre 2019 e 2023, {LOCAL} observou um(a) :{cor_texto_enem}[**{tendencia_enem}**] de **{abs(delta_enem):.1f} %** neste indicador.
+        {insight_enem}
+        """
 
 
-    st.subheader("📝 Nota Média do ENEM")
-# Definição de Cores e Ícones baseados na tendência
-    col12, col22 = st.columns(2)
-    with col12:
-        st.subheader("2019 (Pré-Pandemia)")
-        st.metric(label="Média Estadual da Nota do ENEM", value=f"{nota_media19:.2f}")
+        st.subheader("📝 Nota Média do ENEM")
+    # Definição de Cores e Ícones baseados na tendência
+        col12, col22 = st.columns(2)
+        with col12:
+            st.subheader("2019 (Pré-Pandemia)")
+            st.metric(label="Média Estadual da Nota do ENEM", value=f"{nota_media19:.2f}")
 
 
-    with col22:
-        st.subheader("2023 (Pós-Pandemia)")
-        st.metric(label="Média Estadual da Nota do ENEM", value=f"{nota_media24:.2f}", delta=f"{delta_enem:.1f}%", delta_color=cor_delta_enem)
+        with col22:
+            st.subheader("2023 (Pós-Pandemia)")
+            st.metric(label="Média Estadual da Nota do ENEM", value=f"{nota_media24:.2f}", delta=f"{delta_enem:.1f}%", delta_color=cor_delta_enem)
     
-    graf_enem1, graf_enem2 = st.columns(2)
-    with graf_enem1:
-        fig1_enem = gerar_histograma(
-            df=df19,
-            coluna='Nota_Media_Geral',
-            cor='#8e44ad', # roxo
-            titulo="Distribuição dos Municípios (2023)",
-            x_label='📝 Nota Média do ENEM',
-            is_nota=True
-        )
-        st.plotly_chart(fig1_enem, use_container_width=True)
+        graf_enem1, graf_enem2 = st.columns(2)
+        with graf_enem1:
+            fig1_enem = figura_histograma(
+                ano=ANO_PRE,
+                coluna='Nota_Media_Geral',
+                cor='#8e44ad', # roxo
+                titulo="Distribuição dos Municípios (2023)",
+                x_label='📝 Nota Média do ENEM',
+                is_nota=True
+            )
+            st.plotly_chart(fig1_enem, use_container_width=True)
     
-    with graf_enem2:
-        fig2_enem = gerar_histograma(
-            df=df23,
-            coluna='Nota_Media_Geral' ,
-            cor='#ff9f43', # laranja
-            titulo="Distribuição dos Municípios (2019)",
-            x_label='📝 Nota Média do ENEM',
-            is_nota=True
-        )
-        st.plotly_chart(fig2_enem, use_container_width=True)
+        with graf_enem2:
+            fig2_enem = figura_histograma(
+                ano=ANO_POS,
+                coluna='Nota_Media_Geral' ,
+                cor='#ff9f43', # laranja
+                titulo="Distribuição dos Municípios (2019)",
+                x_label='📝 Nota Média do ENEM',
+                is_nota=True
+            )
+            st.plotly_chart(fig2_enem, use_container_width=True)
 
         
-    st.subheader("💡 Análise do Cenário")
-    st.write(texto_explicativo_nota)
-    with st.expander("🔍 Ver Mais"):
-        with st.expander("Ver Dados Detalhados por Município"):
-            df_merge_enem = pd.merge(df19[['MUNICIPIO', 'Nota_Media_Geral', 'Total_Alunos']], df23[['MUNICIPIO', 'Nota_Media_Geral', 'Total_Alunos']], on='MUNICIPIO', suffixes=('_19', '_23'))
-            df_merge_enem['Nota_Media_Geral_19'] = round(df_merge_enem['Nota_Media_Geral_19'], 2)
-            df_merge_enem['Nota_Media_Geral_23'] = round(df_merge_enem['Nota_Media_Geral_23'], 2)
-            df_merge_enem['Variação (p.p)'] = round((df_merge_enem['Nota_Media_Geral_23'] - df_merge_enem['Nota_Media_Geral_19']) / df_merge_enem['Nota_Media_Geral_19'] * 100, 2)
-            # df_merge_enem['Nota_Media_Geral_19'] = df_merge_enem['Nota_Media_Geral_19'].map('{:.2f}'.format)
-            # df_merge_enem['Nota_Media_Geral_23'] = df_merge_enem['Nota_Media_Geral_23'].map('{:.2f}'.format)
-            st.dataframe(df_merge_enem.sort_values('Variação (p.p)', ascending=False))
-        with st.expander("Municípios abaixo do percentil 25 em 2023"):
-            p25_enem = np.percentile(df23['Nota_Media_Geral'], 25)
-            df_baixo_enem = df23[df23['Nota_Media_Geral'] <= p25_enem]
-            df_baixo_enem = df_baixo_enem[['MUNICIPIO', 'Nota_Media_Geral', 'Total_Alunos']]
-            df_baixo_enem['Nota_Media_Geral'] = round(df_baixo_enem['Nota_Media_Geral'], 2)
-            st.dataframe(df_baixo_enem.sort_values('Nota_Media_Geral'))
-        with st.expander("Municípios acima do percentil 75 em 2023"):
-            p75_enem = np.percentile(df23['Nota_Media_Geral'], 75)
-            df_alto_enem = df23[df23['Nota_Media_Geral'] >= p75_enem]
-            df_alto_enem = df_alto_enem[['MUNICIPIO', 'Nota_Media_Geral', 'Total_Alunos']]
-            df_alto_enem['Nota_Media_Geral'] = round(df_alto_enem['Nota_Media_Geral'], 2)
-            st.dataframe(df_alto_enem.sort_values('Nota_Media_Geral', ascending=False))
-
-
-
-
-# Preparar dados (remover NA)
-df19_corr = df19[["Nota_Media_Geral", metrica_selecionada]].dropna()
-df23_corr = df23[["Nota_Media_Geral", metrica_selecionada]].dropna()
-# Calcular correlação de Pearson
-corr19 = round(df19_corr["Nota_Media_Geral"].corr(df19_corr[metrica_selecionada]), 2) if not df19_corr.empty else None
-corr24 = round(df23_corr["Nota_Media_Geral"].corr(df23_corr[metrica_selecionada]),2) if not df23_corr.empty else None
-delta_absoluto_corr = corr24 - corr19
-delta_percentual = delta_absoluto_corr * 100
-
-if delta_absoluto_corr > 0:
-    cor_delta = "normal" 
-    cor_texto = "green"
-    icone = "📈"
-    tendencia = "AUMENTO"
-else:
-    cor_delta = "normal" 
-    cor_texto = "red"
-    icone = "📉"
-    tendencia = "QUEDA"
-
-
-        # --- Seção: Correlação entre Nota Média e Taxa de Suporte Digital ---
-st.markdown("---")
-with st.container(border=True):
-    st.markdown("# 🔗 Análise Bivariada")
-        
+        st.subheader("💡 Análise do Cenário")
+        st.write(texto_explicativo_nota)
+        with st.expander("🔍 Ver Mais"):
+            with st.expander("Ver Dados Detalhados por Município"):
+                st.dataframe(comparacao_enem['detalhe'])
+                aviso_sem_par(comparacao_enem)
+            with st.expander("Municípios abaixo do percentil 25 em 2023"):
+                df_baixo_enem, df_alto_enem = cubo.percentis(cubo_comp, 'Nota_Media_Geral', ANO_POS)
+                st.dataframe(df_baixo_enem)
+            with st.expander("Municípios acima do percentil 75 em 2023"):
+                st.dataframe(df_alto_enem)
+
+
+@instrumentacao.medido
+def secao_correlacao(metrica_selecionada, nome_metrica):
+    corr19, corr24, cor_texto, icone, tendencia = tendencia_correlacao(metrica_selecionada)
     with st.container(border=True):
         st.markdown(f"### Correlação entre Nota Média do ENEM e {nome_metrica}")
         # Plots de dispersão lado a lado
         col_a, col_b = st.columns(2)
         with col_a:
                 st.metric(label="2019", value=corr19)    
-                fig_corr19 = px.scatter(
-                        df19_corr,
+                legenda_correlacao('Nota_Media_Geral', metrica_selecionada, ANO_PRE)
+                fig_corr19 = figura_dispersao(
+                        ANO_PRE,
                         x=metrica_selecionada,
                         y='Nota_Media_Geral',
                         title=f'2019: Nota Média vs {metrica_selecionada}',
@@ -341,8 +566,9 @@ with st.container(border=True):
 
         with col_b:
                 st.metric(label="2023", value=corr24)  
-                fig_corr24 = px.scatter(
-                        df23_corr,
+                legenda_correlacao('Nota_Media_Geral', metrica_selecionada, ANO_POS)
+                fig_corr24 = figura_dispersao(
+                        ANO_POS,
                         x=metrica_selecionada,
                         y='Nota_Media_Geral',
                         title='2023: Nota Média vs Taxa de Suporte Digital',
@@ -366,18 +592,16 @@ with st.container(border=True):
             insight = "A Taxa de Suporte Digital (PC + Internet) subiu. Ela segue praticamente a mesma tendência do computador porque, estatisticamente, ele é o computador. Como quase todos já têm internet, a única coisa que separa quem tem Suporte Digital de quem não tem é a posse da máquina. Com a escassez de equipamentos, ter um suporte digital completo tornou-se um privilégio ainda mais exclusivo. Quem tem essa ferramenta se destaca ainda mais da massa mobile, fortalecendo a relação entre ter o equipamento e ter a nota alta."
 
         texto_explicativo_corr = f"""
-        Entre 2019 e 2023, o Ceará observou um(a) :{cor_texto}[**{tendencia}**] na correlação entre {metrica_selecionada} e a nota média.\n\n
+        Entre 2019 e 2023, {LOCAL} observou um(a) :{cor_texto}[**{tendencia}**] na correlação entre {metrica_selecionada} e a nota média.\n\n
         {insight}
         """
         st.write(texto_explicativo_corr)
         with st.expander("🔍 Ver Dados Detalhados por Município"):
-            df_merge_corr = pd.merge(df19[['MUNICIPIO', metrica_selecionada, 'Nota_Media_Geral']], df23[['MUNICIPIO', metrica_selecionada, 'Nota_Media_Geral']], on='MUNICIPIO', suffixes=('_19', '_23'))
-            df_merge_corr[f'{metrica_selecionada}_19'] = round((df_merge_corr[f'{metrica_selecionada}_19']) * 1, 4)
-            df_merge_corr[f'{metrica_selecionada}_23'] = round((df_merge_corr[f'{metrica_selecionada}_23']) * 1, 4)
-            st.dataframe(df_merge_corr)
+            st.dataframe(cubo.par(cubo_comp, metrica_selecionada, ANO_PRE, ANO_POS)['correlacao_detalhe'])
 
 
-    # st.markdown("---")
+@instrumentacao.medido
+def secao_boxplot(metrica_selecionada):
     with st.container(border=True):
         st.markdown("## 📊 Desigualdade Social ainda reflete na nota em 2023")
         st.markdown("---")
@@ -386,57 +610,76 @@ with st.container(border=True):
         box1, box2 = st.columns(2)
         with box1:
             # 1. Boxplot dinâmico da métrica selecionada
-            fig1, ax1 = plt.subplots(figsize=(6, 4))
-            data_group1_sel = df19[metrica_selecionada].dropna()
-            data_group2_sel = df23[metrica_selecionada].dropna()
-            ax1.boxplot([data_group1_sel, data_group2_sel], positions=[1, 2], labels=['2019', '2023'])
-            ax1.set_title(f'Comparação de {metrica_selecionada}: 2019 vs 2023')
-            ax1.set_ylabel(metrica_selecionada)
-            ax1.grid(True, axis='y', linestyle='--', alpha=0.7)
-            st.pyplot(fig1)
+            fig1 = figura_boxplot(
+                metrica_selecionada, (ANO_PRE, ANO_POS), ('2019', '2023'),
+                titulo=f'Comparação de {metrica_selecionada}: 2019 vs 2023',
+                y_label=metrica_selecionada
+            )
+            st.image(fig1, use_container_width=True)
 
         with box2:
             # 2. Boxplot estático da nota média geral
-            fig2, ax2 = plt.subplots(figsize=(6, 4))
-            data_group1_nota = df19['Nota_Media_Geral'].dropna()
-            data_group2_nota = df24['Nota_Media_Geral'].dropna()
-            ax2.boxplot([data_group1_nota, data_group2_nota], positions=[1, 2], labels=['2019', '2023'])
-            ax2.set_title('Comparação de Nota Média Geral: 2019 vs 2023')
-            ax2.set_ylabel('Nota Média Geral')
-            ax2.grid(True, axis='y', linestyle='--', alpha=0.7)
-            st.pyplot(fig2)
+            fig2 = figura_boxplot(
+                'Nota_Media_Geral', (ANO_PRE, ANO_RECENTE), ('2019', '2023'),
+                titulo='Comparação de Nota Média Geral: 2019 vs 2023',
+                y_label='Nota Média Geral'
+            )
+            st.image(fig2, use_container_width=True)
+
+
+@instrumentacao.medido
+def secao_estrutura(metrica_selecionada, nome_metrica):
     with st.container(border=True):
         st.markdown("### Gráfico Comparativo: Alta Estrutura X Baixa Estrutura")
         st.markdown("#### 🛑 Estagnação na Educação em 2023 foi perceptível")
         img1, img2 = st.columns(2)
         with img1:
-            st.image(img_ideb)
+            imagem(img_ideb, sizes=METADE)
         with img2:
-            st.image(img_ideb_ce)
+            imagem(img_ideb_ce, sizes=METADE)
         st.write("O panorama é preocupante pois a desigualdade entre as escolas estruturadas e as não estruturadas se manteve, mesmo que o acesso à informação tenha se democratizado.")
         st.markdown("### 📦 Associação de Variáveis: Escolas de Alta Estrutura vs Escolas de Baixa Estrutura ")
         st.write("Boxplots comparativos entre escolas com alta estrutura (Federal e Privada) e baixa estrutura (Municipal e Estadual), para visualizar se houve uma mudança no GAP entre esses grupos ao longo do tempo.")
-        st.image(img_box)
+        # boxplots dos esboços de quantis da ingestão; sem eles, a imagem gerada no notebook
+        anos = anos_com_grupo('ESTRUTURA', quantis.SEM_ESTRUTURA) if quantis.existe() else []
+        if not anos:
+            imagem(img_box)
+            return
+        for coluna, ano in zip(st.columns(len(anos)), anos):
+            with coluna:
+                st.plotly_chart(figura_quantis(
+                    'ESTRUTURA', ano, metrica_selecionada, nome_metrica,
+                    f'{ano} - Nota Média por Tipo de Escola', ordem=tuple(quantis.ESTRUTURAS),
+                ), use_container_width=True)
+        st.caption("Nota média dos alunos, separados pelo recurso da métrica selecionada. Quartis estimados por t-digest; bigodes até 1,5 IQR.")
+
+
+@instrumentacao.medido
+def secao_ideb():
     with st.container(border=True):
         st.markdown("### 📦 IDEB")
         st.write("O Índice de Desenvolvimento da Educação Básica (IDEB) é um indicador que mede a qualidade do ensino nas escolas brasileiras. Ele combina dados de desempenho acadêmico (notas em avaliações padronizadas) e taxas de aprovação escolar para fornecer uma visão geral do sistema educacional.")
         # correlacao_ideb = df19['IDEB19'].corr(df19_corr['Nota_Media_Geral'])
+        if not ideb_disponivel():
+            st.info("Sem IDEB para este escopo: o índice não vem no microdado do ENEM e só foi cruzado para os municípios do Ceará.")
+            return
 
         # 2. Exibindo a Métrica Atualizada
-        corr_ideb_19 = df19[['Nota_Media_Geral', 'IDEB19']].corr().iloc[0,1]
-        corr_ideb_23 = df23[['Nota_Media_Geral', 'IDEB23']].corr().iloc[0,1]
-        corr_ideb_taxa_19 = df19[['Taxa_Inclusao_Digital', 'IDEB19']].corr().iloc[0,1]
-        corr_ideb_taxa_23 = df23[['Taxa_Inclusao_Digital', 'IDEB23']].corr().iloc[0,1]
+        corr_ideb_19 = cubo.estatistica(cubo_comp, 'Nota_Media_Geral', ANO_PRE, 'corr_ideb')
+        corr_ideb_23 = cubo.estatistica(cubo_comp, 'Nota_Media_Geral', ANO_POS, 'corr_ideb')
+        corr_ideb_taxa_19 = cubo.estatistica(cubo_comp, 'Taxa_Inclusao_Digital', ANO_PRE, 'corr_ideb')
+        corr_ideb_taxa_23 = cubo.estatistica(cubo_comp, 'Taxa_Inclusao_Digital', ANO_POS, 'corr_ideb')
         ideb19, ideb23 = st.columns(2)
         with ideb19:
             st.metric(label="Correlação (IDEB vs ENEM)", value=f"{corr_ideb_19:.2f}")
+            legenda_correlacao('IDEB', 'Nota_Media_Geral', ANO_PRE)
             # 3. Gerando o Gráfico
-            fig_corr19 = px.scatter(
-                    df19,
-                    x='IDEB19', # <--- AQUI: Mudamos para a coluna do IDEB
+            fig_corr19 = figura_dispersao(
+                    ANO_PRE,
+                    x='IDEB', # <--- AQUI: Mudamos para a coluna do IDEB
                     y='Nota_Media_Geral',
                     title=f'2019: Impacto do IDEB na Nota do ENEM',
-                    labels={'IDEB19': f'Nota do IDEB (2019)', 'Nota_Media_Geral': 'Nota Média ENEM'},
+                    labels={'IDEB': f'Nota do IDEB (2019)', 'Nota_Media_Geral': 'Nota Média ENEM'},
                     color_discrete_sequence=['#8e44ad'],
                     # trendline="ols" # DICA: Adiciona a linha de tendência para provar a correlação visualmente
             )
@@ -447,13 +690,14 @@ with st.container(border=True):
 
     
             st.metric(label="Correlação (IDEB vs Taxa de Suporte Digital)", value=f"{corr_ideb_taxa_19:.2f}")
+            legenda_correlacao('IDEB', 'Taxa_Inclusao_Digital', ANO_PRE)
             # 3. Gerando o Gráfico
-            fig_corr_taxa_19 = px.scatter(
-                    df19,
-                    x='IDEB19', # <--- AQUI: Mudamos para a coluna do IDEB
+            fig_corr_taxa_19 = figura_dispersao(
+                    ANO_PRE,
+                    x='IDEB', # <--- AQUI: Mudamos para a coluna do IDEB
                     y='Taxa_Inclusao_Digital',
                     title=f'2019: Correlação entre IDEB e Taxa de Suporte Digital',
-                    labels={'IDEB19': f'Nota do IDEB (2019)', 'Taxa_Inclusao_Digital': 'Taxa de Suporte Digital'},
+                    labels={'IDEB': f'Nota do IDEB (2019)', 'Taxa_Inclusao_Digital': 'Taxa de Suporte Digital'},
                     color_discrete_sequence=['#8e44ad'],
                     # trendline="ols" # DICA: Adiciona a linha de tendência para provar a correlação visualmente
             )
@@ -461,12 +705,13 @@ with st.container(border=True):
             st.plotly_chart(fig_corr_taxa_19, use_container_width=True)
         with ideb23:
             st.metric(label="Correlação (IDEB vs ENEM)", value=f"{corr_ideb_23:.2f}")
-            fig_corr23 = px.scatter(
-                    df23,
-                    x='IDEB23', # <--- AQUI: Mudamos para a coluna do IDEB
+            legenda_correlacao('IDEB', 'Nota_Media_Geral', ANO_POS)
+            fig_corr23 = figura_dispersao(
+                    ANO_POS,
+                    x='IDEB', # <--- AQUI: Mudamos para a coluna do IDEB
                     y='Nota_Media_Geral',
                     title='2023: Impacto do IDEB na Nota do ENEM',
-                    labels={'IDEB23': f'Nota do IDEB (2023)', 'Nota_Media_Geral': 'Nota Média ENEM'},
+                    labels={'IDEB': f'Nota do IDEB (2023)', 'Nota_Media_Geral': 'Nota Média ENEM'},
                     color_discrete_sequence=['#ff9f43'],
                     # trendline="ols" # DICA: Adiciona a linha de tendência para provar a correlação visualmente
             )
@@ -475,13 +720,14 @@ with st.container(border=True):
             st.markdown("\n\n")
 
             st.metric(label="Correlação (IDEB vs Taxa de Suporte Digital)", value=f"{corr_ideb_taxa_23:.2f}")
+            legenda_correlacao('IDEB', 'Taxa_Inclusao_Digital', ANO_POS)
             # 3. Gerando o Gráfico
-            fig_corr_taxa_23 = px.scatter(
-                    df23,
-                    x='IDEB23', # <--- AQUI: Mudamos para a coluna do IDEB
+            fig_corr_taxa_23 = figura_dispersao(
+                    ANO_POS,
+                    x='IDEB', # <--- AQUI: Mudamos para a coluna do IDEB
                     y='Taxa_Inclusao_Digital',
                     title=f'2023: Correlação entre IDEB e Taxa de Suporte Digital',
-                    labels={'IDEB23': f'Nota do IDEB (2023)', 'Taxa_Inclusao_Digital': 'Taxa de Suporte Digital'},
+                    labels={'IDEB': f'Nota do IDEB (2023)', 'Taxa_Inclusao_Digital': 'Taxa de Suporte Digital'},
                     color_discrete_sequence=['#ff9f43'],
                     # trendline="ols" # DICA: Adiciona a linha de tendência para provar a correlação visualmente
             )
@@ -489,75 +735,205 @@ with st.container(border=True):
             st.plotly_chart(fig_corr_taxa_23, use_container_width=True)
         st.subheader("💡 Análise do Cenário")
         st.write("O IDEB perdeu parte de sua capacidade de representar o aprendizado real no cenário pós-pandemia.\nIsso ocorre, em partes, porque houve um mascaramento dos efeitos reais da pandemia nas avaliações internas.")
- 
+
+
+@instrumentacao.medido
+def secao_ocupacao(metrica_selecionada, nome_metrica):
     with st.container(border=True):
         st.markdown("### 👨‍👦 Ocupação do pai do aluno")
         st.markdown("#### 📦 A Inclusão Digital teve um impacto significativo no desempenho dos alunos")
-        st.write("A análise foi realizada buscando entender de que forma a ocupação dos pais, enquanto indicador socioeconômico, se relaciona com o desempenho médio educacional das cidades. O boxplot foi escolhido não apenas para comparar as medianas, mas também analisar a dispersão dos dados e a presença de outliers (cidades que fujam do padrão).")
-        img1, img2 = st.columns(2)
-        with img1:
-            st.image(box_19)
-        with img2:
-            st.image(box_23)
+        anos = anos_com_grupo('OCUPACAO_PAI', quantis.SEM_OCUPACAO) if quantis.existe() else []
+        if not anos:
+            st.write("A análise foi realizada buscando entender de que forma a ocupação dos pais, enquanto indicador socioeconômico, se relaciona com o desempenho médio educacional das cidades. O boxplot foi escolhido não apenas para comparar as medianas, mas também analisar a dispersão dos dados e a presença de outliers (cidades que fujam do padrão).")
+            img1, img2 = st.columns(2)
+            with img1:
+                imagem(box_19, sizes=METADE)
+            with img2:
+                imagem(box_23, sizes=METADE)
+        else:
+            st.write("A análise foi realizada buscando entender de que forma a ocupação do pai, enquanto indicador socioeconômico, se relaciona com o desempenho dos alunos, separando quem tem e quem não tem o recurso da métrica selecionada. O boxplot foi escolhido não apenas para comparar as medianas, mas também analisar a dispersão das notas dentro de cada grupo.")
+            for coluna, ano in zip(st.columns(len(anos)), anos):
+                with coluna:
+                    st.plotly_chart(figura_quantis(
+                        'OCUPACAO_PAI', ano, metrica_selecionada, nome_metrica,
+                        f'Nota média por ocupação do pai ({ano})', rotulos=ROTULOS_OCUPACAO, ordem=ORDEM_OCUPACAO,
+                    ), use_container_width=True)
+            st.caption("Quartis estimados por t-digest a partir dos esboços gravados na ingestão; bigodes até 1,5 IQR.")
         st.subheader("💡 Análise do Cenário")
         st.write("Ao comparar os cenários pré e pós-pandemia, observa-se que a hierarquia socioeconômica se manteve rígida. Em ambos os anos, municípios com predominância de ocupações de alta qualificação apresentam consistentemente as maiores medianas de nota, distanciando-se dos demais grupos.")
 
-        
 
-    
+# Detalhamento por aluno: agrupamentos e notas oferecidos
+AGRUPAMENTOS_ALUNOS = {
+    'DEPENDENCIA': 'Dependência da escola',
+    'OCUPACAO_PAI': 'Ocupação do pai',
+    'OCUPACAO_MAE': 'Ocupação da mãe',
+}
+NOTAS_ALUNOS = {
+    'NOTA_MEDIA': 'Nota média', 'Nota_Mat': 'Matemática', 'Nota_LC': 'Linguagens',
+    'Nota_CH': 'Ciências Humanas', 'Nota_CN': 'Ciências da Natureza', 'Nota_Redacao': 'Redação',
+}
 
-with st.container(border=True):
-    st.markdown(f"## {icone} Hipótese da IA Generativa (Comparativo 2024)")
+@st.fragment
+@instrumentacao.medido
+def secao_alunos():
+    with st.container(border=True):
+        st.markdown("### 🔎 Detalhamento por Aluno")
+        st.write("Distribuição das notas dos alunos de um município (microdado do ENEM), por tipo de escola ou ocupação dos pais. Só o resumo de cada grupo é carregado.")
+        # o armazém de alunos é indexado pelo código IBGE do microdado: municípios
+        # com código provisório (sem a malha nem indicadores da ingestão) não têm par nele
+        com_codigo = municipios.codigo_ibge(df23['CD_MUN'])
+        if not com_codigo.any():
+            st.warning("Os municípios deste escopo não têm código IBGE, que liga o painel aos dados dos alunos. "
+                       "Compile a malha (python mapas.py) ou gere os indicadores pela ingestão para habilitar esta seção.")
+            return
+        if not com_codigo.all():
+            st.caption(f"{(~com_codigo).sum()} município(s) sem código IBGE ficam fora da lista.")
+        anos = alunos.anos_disponiveis()
+        col_ano, col_mun = st.columns([1, 3])
+        with col_ano:
+            ano = st.selectbox("Ano:", anos, index=len(anos) - 1, key='alunos_ano')
+        # códigos de município são os mesmos em todos os anos; a lista vem do escopo atual
+        municipios_ano = df23[com_codigo].sort_values(['UF', 'MUNICIPIO'])
+        with col_mun:
+            cd_mun = st.selectbox(
+                "Município:", municipios_ano['CD_MUN'].tolist(), key='alunos_municipio',
+                format_func=dict(zip(municipios_ano['CD_MUN'], municipios_ano['MUNICIPIO'] + ' (' + municipios_ano['UF'] + ')')).get,
+            )
+        col_por, col_nota = st.columns(2)
+        with col_por:
+            por = st.radio("Agrupar por:", list(AGRUPAMENTOS_ALUNOS), format_func=AGRUPAMENTOS_ALUNOS.get,
+                           horizontal=True, key='alunos_por')
+        with col_nota:
+            metrica = st.selectbox("Nota:", list(NOTAS_ALUNOS), format_func=NOTAS_ALUNOS.get, key='alunos_nota')
+
+        if por not in alunos.colunas_do_ano(ano):
+            st.info(f"O microdado de {ano} não traz {AGRUPAMENTOS_ALUNOS[por].lower()}.")
+            return
+        resumo = load_distribuicao(alunos.impressao(ano), ano, cd_mun, por, metrica)
+        if resumo.empty:
+            st.info("Nenhum aluno com nota neste município no ano selecionado.")
+            return
+        st.plotly_chart(
+            gerar_boxplot_quantis(resumo, f'{NOTAS_ALUNOS[metrica]} por {AGRUPAMENTOS_ALUNOS[por].lower()} ({ano})',
+                                  NOTAS_ALUNOS[metrica]),
+            use_container_width=True,
+        )
+        st.caption(f"{int(resumo['n'].sum())} alunos com nota · quartis aproximados (t-digest)")
+        with st.expander("🔍 Ver resumo por grupo"):
+            st.dataframe(resumo, hide_index=True)
+
+
+@instrumentacao.medido
+def secao_ia(icone, ponderar):
+    with st.container(border=True):
+        st.markdown(f"## {icone} Hipótese da IA Generativa (Comparativo 2024)")
     
-    col1, col2 = st.columns(2)
-    with col1:
-        st.image(img_list[0], use_container_width=True)
-    with col2:
-        st.image(img_list[1], use_container_width=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            imagem(img_list[0], use_container_width=True, sizes=METADE)
+        with col2:
+            imagem(img_list[1], use_container_width=True, sizes=METADE)
     
-    st.write("Comparando o cenário pré-pandemia (2019) com o cenário mais recente (2024):")
+        st.write("Comparando o cenário pré-pandemia (2019) com o cenário mais recente (2024):")
     
-    # AQUI VOCÊ USA O DF24
-    grafico_comparativo(
-        df_indicadores_mun=df19,    # Base antiga
-        df_indicadores_mun24=df24,  # Base nova (2024)
-        notas=True
+        # AQUI VOCÊ USA O DF24
+        grafico_comparativo(
+            df_indicadores_mun=df19,    # Base antiga
+            df_indicadores_mun24=df24,  # Base nova (2024)
+            notas=True,
+            ponderar=ponderar
+        )
+
+
+# --- INTERFACE PRINCIPAL ---
+st.title(f"📊 Panorama da Educação Digital: {municipios.UFS.get(ESCOPO, 'Brasil')}")
+# --- Seção Explicativa ---
+st.markdown('### 💡 Métrica de Interesse: Taxa de Suporte Digital ao Estudo')
+st.markdown(
+    'O indicador mede a **proporção de estudantes que possuem acesso a um computador** '
+    '***E*** **acesso à internet** em casa, essencial para uma participação digital completa **no contexto educativo, visando o aprendizado e desempenho nas provas**. '
+    'É calculado a partir das seguintes variáveis, dividindo pelo **Total de Alunos**:'
+)
+
+# Fórmula em latex
+with st.container(border=True):
+    st.latex(
+        r'''
+        \text{Taxa de Suporte Digital ao Estudo} = \frac{\text{Alunos com Computador } \cap \text{ Alunos com Internet}}{\text{Total de Alunos}}
+        '''
     )
 
+    st.markdown('---')
+
+    st.markdown('#### Detalhes das Variáveis')
+    st.markdown(
+        '* **Alunos com Computador $\cap$ Alunos com Internet:** '
+        'O número de alunos que responderam **sim** para **AMBOS** os requisitos. '
+        'Representa a **Inclusão Plena**.'
+    )
+    st.markdown(
+        '* **Total de Alunos:** O número total de estudantes por município (ou total, caso agreguemos para o estado)'
+    )
+
+with st.container(border=True):
+    secao_mapa(metrica_selecionada, nome_metrica)
+
+# st.markdown("---")
+
+# --- Comparativo ---
+secao_comparativo(metrica_selecionada, nome_metrica, coluna_media)
+
+if len(cubo_comp['ufs']) > 1:
+    with st.container(border=True):
+        secao_estados(metrica_selecionada, nome_metrica, coluna_media)
+
+## COMPARATIVO ENEM 2019 X 2023
+secao_enem(coluna_media)
+
+# --- Seção: Correlação entre Nota Média e Taxa de Suporte Digital ---
+st.markdown("---")
+with st.container(border=True):
+    st.markdown("# 🔗 Análise Bivariada")
+    secao_correlacao(metrica_selecionada, nome_metrica)
+    secao_boxplot(metrica_selecionada)
+    secao_estrutura(metrica_selecionada, nome_metrica)
+    secao_ideb()
+    secao_ocupacao(metrica_selecionada, nome_metrica)
+    if alunos.existe():
+        secao_alunos()
+
+secao_ia(tendencia_correlacao(metrica_selecionada)[3], ponderar)
+
 st.markdown("---")
 with st.container(border=True):
     st.markdown("## 📋 Conclusão e Relatório Final")
-    st.markdown("""
-    ### Panorama Geral da Educação Digital no Ceará (2019 vs 2023)
-    
-    Este dashboard analisou a evolução da inclusão digital educacional no Ceará, comparando dados agregados por município do ENEM de 2019 (pré-pandemia) e 2024 (pós-pandemia). Os indicadores principais — Taxa de Inclusão Digital Plena (computador + internet), Taxa de Posse de Computador e Taxa de Acesso à Internet — revelam transformações significativas no acesso a tecnologias, com impactos diretos no desempenho acadêmico medido pela Nota Média Geral do ENEM.
-    
-    ### Principais Descobertas
-    
-    #### 1. **Evolução das Taxas de Acesso Tecnológico**
-    - **Taxa de Suporte Digital**: Caiu de aproximadamente ~9 pontos percentuais, indicando uma geração "Mobile-Only" — alunos com acesso à internet via celular, mas sem computadores adequados para estudos avançados.
-    - **Posse de Computador**: Diminuiu drasticamente (queda de ~10 pontos percentuais), evidenciando o "Paradoxo da Conectividade": mais alunos, mas menos equipamentos de produtividade.
-    - **Acesso à Internet**: Universalizou-se, com aumento significativo (~20-30 pontos percentuais), tornando-se uma commodity essencial. A pandemia acelerou a infraestrutura de telecomunicações, rompendo barreiras de sinal em municípios remotos.
-    
-    #### 2. **Impacto no Desempenho Acadêmico (Nota Média do ENEM)**
-    - A nota média estadual subiu (~3%), apesar da queda na inclusão digital plena. Isso sugere que fatores exógenos, além do aumento da conectividade compensaram a falta de hardware tradicional.
-    - Correlação com Suporte Digital: Forte em 2019 (~0.70), com um bom aumento em 2023 (~0.81), indicando que ter computador deixou de ser um diferencial competitivo.
-    - Correlação com Internet: Caiu drasticamente (de ~0.47 para ~0.16), pois o acesso se tornou ubíquo, não diferenciando mais alunos de alto desempenho.
-    - Correlação com Computador: Manteve-se robusta (~0.65-0.70), bem similar a correlação com a taxa de suporte digital, confirmando que equipamentos de produtividade ainda são cruciais para habilidades técnicas avançadas.
-    
-    
-    #### 3. **Hipótese da IA Generativa e Tecnologias Emergentes**
-    - A subida das notas, apesar da queda em computadores, aponta para o papel compensatório de IA generativa, celulares inteligentes e ferramentas online. Alunos de baixa renda podem estar usando esses recursos para nivelar o campo de jogo.
-    - Recomendação: Políticas públicas devem focar em hardware (computadores/notebooks) para alunos de baixa renda, enquanto incentivam o uso ético de IA em redação e estudos.
-    
-    ### Recomendações Estratégicas
-    - **Para Governos e Escolas**: Investir em distribuição de equipamentos, não apenas conectividade. Programas para fornecimento de dispositivos adequados ao estudo devem ser priorizados.
-    - **Para Educadores**: Adaptar currículos para incluir habilidades digitais móveis, mas sem negligenciar o treinamento em ferramentas avançadas (ex.: programação, análise de dados).
-    - **Para Pesquisa Futura**: Investigar o impacto causal de IA generativa via inferência causal (ex.: propensity score matching), considerando confundidores socioeconômicos.
-    
-    ### Limitações da Análise
-    - Dados agregados por município limitam correlações individuais; análises com MICRODADOS revelariam padrões mais granulares.
-    - Fatores externos (ex.: mudanças curriculares, motivação pós-pandemia) não foram controlados.
-    
-    Este relatório destaca a necessidade urgente de equilibrar conectividade universal com acesso a ferramentas produtivas, garantindo que a transformação digital beneficie todos os alunos cearenses de forma equitativa.
-    """)
\ No newline at end of file
+    st.markdown(textos.CONCLUSAO)
+
+
+# --- PAINEL DE DEPURAÇÃO (oculto; abrir com ?debug=1 na URL) ---
+# Ligar o tracemalloc e zerar as medições valem para o processo inteiro (todas
+# as sessões): esses controles só aparecem com ?token= igual à variável de
+# ambiente INSTRUMENTACAO_TOKEN. Sem ela, o painel é só leitura.
+def admin_instrumentacao():
+    token = os.environ.get('INSTRUMENTACAO_TOKEN')
+    return bool(token) and hmac.compare_digest(st.query_params.get('token', '').encode(), token.encode())
+
+
+if st.query_params.get('debug') == '1':
+    registro_medicoes = instrumentacao.INSTRUMENTACAO
+    admin = admin_instrumentacao()
+    with st.sidebar.expander("🛠️ Instrumentação", expanded=True):
+        if admin:
+            medir_memoria = st.toggle("Medir memória (tracemalloc)", value=registro_medicoes.memoria_ativa,
+                                      help="Deixa o app mais lento enquanto ligado.")
+            registro_medicoes.ativar_memoria(medir_memoria)
+
+        tabela = pd.DataFrame.from_dict(registro_medicoes.resumo(), orient='index')
+        st.dataframe(tabela.sort_values('tempo_total', ascending=False) if not tabela.empty else tabela)
+        st.caption(f"Cache de figuras: {cache_figuras.CACHE.estatisticas()}")
+
+        st.download_button("Exportar JSON", registro_medicoes.como_json(), 'instrumentacao.json', 'application/json')
+        st.download_button("Exportar Prometheus", registro_medicoes.como_prometheus(), 'instrumentacao.prom', 'text/plain')
+        if admin and st.button("Zerar medições"):
+            registro_medicoes.limpar()
@@ -0,0 +1,216 @@
+"""
+Armazém colunar (Parquet) dos indicadores.
+
+Compila os indicadoresXX.csv num dataset Parquet particionado por ano
+(dados/indicadores/ANO=2019/indicadores.parquet, ...), com nomes de coluna
+canônicos (iguais em todos os anos) e tipos fixos:
+taxas e notas em float32, contagens em int32 e MUNICIPIO categórico.
+A leitura é feita por partição e só das colunas pedidas, então o custo de
+carregar um ano não cresce com a quantidade de anos armazenados.
+
+Dentro de cada ano as linhas ficam ordenadas por UF, um row group por UF
+(tabelas sem coluna UF são do Ceará). Ler um estado só decodifica o row group
+dele: as estatísticas de UF do Parquet descartam os demais sem lê-los.
+
+Cada partição guarda nos metadados o hash do CSV de origem; recompilar a
+pasta só regrava os anos cujo CSV mudou.
+
+Uso:
+    python armazem.py            # compila os indicadoresXX.csv da pasta atual
+    python armazem.py --forcar   # regrava todos os anos
+"""
+import glob
+import hashlib
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import municipios
+
+
+PASTA_ARMAZEM = os.path.join('dados', 'indicadores')
+NOME_ARQUIVO = 'indicadores.parquet'
+META_ORIGEM = b'hash_origem'
+BLOCO_HASH = 1 << 20
+
+# Nomes que variam entre os anos -> nome canônico
+COLS_RENAME = {
+    'NO_MUNICIPIO_PROVA': 'MUNICIPIO',
+    'NO_MUNICIPIO_RESIDENCIA': 'MUNICIPIO',
+    'Computador': 'Total_Computador',
+    'Internet': 'Total_Internet',
+}
+
+CONTAGENS = (
+    'Total_Alunos', 'Total_Inclusao_Digital', 'Total_Internet', 'Total_Computador',
+    'Baixa_Estrutura', 'Alta_Estrutura',
+)
+
+
+def nome_canonico(coluna):
+    """Nome canônico de uma coluna (ex.: 'Internet' -> 'Total_Internet', 'IDEB19' -> 'IDEB')."""
+    coluna = COLS_RENAME.get(coluna, coluna)
+    return re.sub(r'IDEB\d{2}$', 'IDEB', coluna)
+
+
+# --- PARTIÇÕES POR ANO ---
+# armazém, detalhamento por aluno e esboços de quantis gravam um arquivo por
+# ano em <pasta>/ANO=<ano>/<arquivo> (partição no estilo hive)
+def caminho_particao(pasta, ano, arquivo):
+    return os.path.join(pasta, f'ANO={ano}', arquivo)
+
+
+def anos_particionados(pasta, arquivo):
+    """Anos com partição gravada em `pasta`, em ordem crescente."""
+    anos = []
+    for caminho in glob.glob(caminho_particao(pasta, '*', arquivo)):
+        achado = re.search(r'ANO=(\d{4})', caminho)
+        if achado:
+            anos.append(int(achado.group(1)))
+    return sorted(anos)
+
+
+def _caminho_ano(ano, pasta=PASTA_ARMAZEM):
+    return caminho_particao(pasta, ano, NOME_ARQUIVO)
+
+
+def hash_arquivo(caminho, inicio=0, fim=None):
+    """Hash (blake2b) do conteúdo do arquivo, ou do intervalo de bytes [inicio, fim)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as arquivo:
+        arquivo.seek(inicio)
+        restante = (fim - inicio) if fim is not None else None
+        while restante is None or restante > 0:
+            bloco = arquivo.read(BLOCO_HASH if restante is None else min(BLOCO_HASH, restante))
+            if not bloco:
+                break
+            h.update(bloco)
+            if restante is not None:
+                restante -= len(bloco)
+    return h.hexdigest()
+
+
+def tipar(df):
+    """Aplica os tipos do armazém a uma tabela de indicadores."""
+    df = df.loc[:, ~df.columns.str.startswith('Unnamed')].rename(columns=nome_canonico)
+    for col in df.columns:
+        if col == 'MUNICIPIO':
+            df[col] = df[col].astype('category')
+        elif col in CONTAGENS:
+            df[col] = df[col].astype('int32')
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype('float32')
+    return df
+
+
+def compilar_csv(caminho_csv, ano, pasta=PASTA_ARMAZEM):
+    """Converte um indicadoresXX.csv na partição Parquet do ano (um row group por UF)."""
+    df = tipar(pd.read_csv(caminho_csv))
+    if 'UF' not in df:
+        df.insert(0, 'UF', municipios.UF_PADRAO)
+    df = df.sort_values('UF', kind='stable', ignore_index=True)
+
+    destino = _caminho_ano(ano, pasta)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    metadados = {**(tabela.schema.metadata or {}), META_ORIGEM: hash_arquivo(caminho_csv).encode()}
+    tabela = tabela.replace_schema_metadata(metadados)
+
+    ufs, inicios = np.unique(df['UF'].to_numpy(), return_index=True)
+    limites = list(inicios) + [len(df)]
+    with pq.ParquetWriter(destino, tabela.schema) as escritor:
+        for inicio, fim in zip(limites[:-1], limites[1:]):
+            escritor.write_table(tabela.slice(inicio, fim - inicio))
+    return destino
+
+
+def compilar_pasta(origem='.', pasta=PASTA_ARMAZEM, forcar=False):
+    """
+    Compila os indicadoresXX.csv de `origem` cujo conteúdo mudou desde a
+    última compilação (todos, com forcar=True). Retorna os anos gravados.
+    """
+    anos = []
+    for caminho in sorted(glob.glob(os.path.join(origem, 'indicadores*.csv'))):
+        achado = re.search(r'indicadores(\d{2})\.csv$', caminho)
+        if achado:
+            ano = 2000 + int(achado.group(1))
+            if not forcar and impressao(ano, pasta) == hash_arquivo(caminho):
+                continue
+            compilar_csv(caminho, ano, pasta)
+            anos.append(ano)
+    return anos
+
+
+def anos_disponiveis(pasta=PASTA_ARMAZEM):
+    """Anos presentes no armazém, em ordem crescente."""
+    return anos_particionados(pasta, NOME_ARQUIVO)
+
+
+def existe(pasta=PASTA_ARMAZEM):
+    return bool(anos_disponiveis(pasta))
+
+
+def versao(pasta=PASTA_ARMAZEM):
+    """(ano, data de modificação, tamanho) de cada partição: chave de cache barata."""
+    versoes = []
+    for ano in anos_disponiveis(pasta):
+        info = os.stat(_caminho_ano(ano, pasta))
+        versoes.append((ano, info.st_mtime_ns, info.st_size))
+    return tuple(versoes)
+
+
+def colunas_do_ano(ano, pasta=PASTA_ARMAZEM):
+    """Nomes das colunas gravadas para o ano (lê só o schema)."""
+    return pq.read_schema(_caminho_ano(ano, pasta)).names
+
+
+def impressao(ano, pasta=PASTA_ARMAZEM):
+    """Hash do CSV que originou a partição do ano (None se não houver partição)."""
+    caminho = _caminho_ano(ano, pasta)
+    if not os.path.exists(caminho):
+        return None
+    metadados = pq.read_schema(caminho).metadata or {}
+    valor = metadados.get(META_ORIGEM)
+    return valor.decode() if valor else None
+
+
+def ufs_do_ano(ano, pasta=PASTA_ARMAZEM):
+    """UFs gravadas no ano, lidas das estatísticas dos row groups (sem ler os dados)."""
+    metadados = pq.ParquetFile(_caminho_ano(ano, pasta)).metadata
+    if 'UF' not in metadados.schema.names:
+        return [municipios.UF_PADRAO]    # partição gravada antes da coluna UF
+    coluna = metadados.schema.names.index('UF')
+    ufs = set()
+    for i in range(metadados.num_row_groups):
+        estatisticas = metadados.row_group(i).column(coluna).statistics
+        ufs.update({estatisticas.min, estatisticas.max})
+    return sorted(ufs)
+
+
+def ler_ano(ano, colunas=None, pasta=PASTA_ARMAZEM, ufs=None):
+    """
+    Lê a partição de um ano. Se `colunas` for informado, lê apenas essas
+    (as que não existirem no ano são ignoradas); com `ufs`, só os row groups
+    dessas UFs.
+    """
+    caminho = _caminho_ano(ano, pasta)
+    existentes = colunas_do_ano(ano, pasta)
+    if colunas is not None:
+        colunas = [c for c in colunas if c in existentes]
+    if 'UF' not in existentes:
+        # partição gravada antes da coluna UF: tudo é da UF padrão
+        df = pq.read_table(caminho, columns=colunas).to_pandas()
+        df.insert(0, 'UF', municipios.UF_PADRAO)
+        return df if ufs is None or municipios.UF_PADRAO in ufs else df.iloc[:0]
+    filtro = [('UF', 'in', list(ufs))] if ufs is not None else None
+    return pq.read_table(caminho, columns=colunas, filters=filtro).to_pandas()
+
+
+if __name__ == '__main__':
+    anos = compilar_pasta(forcar='--forcar' in sys.argv)
+    print(f"Armazém compilado em {PASTA_ARMAZEM}; anos regravados: {anos or 'nenhum'}")
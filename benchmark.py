@@ -0,0 +1,219 @@
+"""
+Benchmarks da camada de dados e dos construtores de gráficos.
+
+Mede carregamento do painel, resumo do grafico_comparativo, histograma,
+tabelas de comparação/percentis e correlações, nos CSVs reais e em dados
+sintéticos com 184 (Ceará), 5.570 (Brasil) e 100.000 municípios por ano.
+Para cada caso grava o tempo (mediana e mínimo de várias repetições), a
+vazão em linhas/s e o pico de memória alocada (tracemalloc, numa execução
+à parte para não distorcer o tempo).
+
+Os resultados vão para um JSON; passando --base com um resultado anterior,
+imprime a razão novo/anterior de tempo e memória de cada caso.
+
+Uso:
+    python benchmark.py                                  # todas as escalas
+    python benchmark.py --escalas real 184 --repeticoes 5
+    python benchmark.py --base dados/benchmarks/anterior.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import correlacao
+import cubo
+import func
+import registro
+
+
+ESCALAS = {'real': None, '184': 184, '5570': 5_570, '100k': 100_000}
+ANOS = (2019, 2023, 2024)
+PASTA_RESULTADOS = os.path.join('dados', 'benchmarks')
+# bootstrap reduzido (o custo cresce linearmente com as reamostras); na
+# escala de 100k só o suficiente para medir a vazão por reamostra
+REAMOSTRAS = {'real': 200, '184': 200, '5570': 200, '100k': 20}
+
+METRICAS = cubo.METRICAS_TAXA + cubo.METRICAS_NOTA
+
+
+# --- DADOS SINTÉTICOS ---
+def gerar_ano(n_municipios, ano, semente=0):
+    """Tabela de indicadores sintética de um ano, no formato dos indicadoresXX.csv."""
+    gerador = np.random.default_rng(semente + ano)
+    alunos = np.maximum(gerador.lognormal(6, 1.2, n_municipios).round(), 5).astype(int)
+    computador = gerador.beta(2, 5, n_municipios)
+    internet = np.clip(computador + gerador.beta(5, 2, n_municipios) * (1 - computador), 0, 1)
+    inclusao = computador * gerador.uniform(0.6, 1.0, n_municipios)
+
+    df = pd.DataFrame({
+        'MUNICIPIO': [f'Municipio {i:06d}' for i in range(n_municipios)],
+        'CD_MUN': 1_000_000 + np.arange(n_municipios),
+        'Total_Alunos': alunos,
+        'Total_Inclusao_Digital': (inclusao * alunos).round().astype(int),
+        'Taxa_Inclusao_Digital': inclusao,
+        'Total_Internet': (internet * alunos).round().astype(int),
+        'Taxa_Internet': internet,
+        'Total_Computador': (computador * alunos).round().astype(int),
+        'Taxa_Computador': computador,
+    })
+    base = 480 + 80 * inclusao
+    for nota in ('Nota_Redacao', 'Nota_CH', 'Nota_Mat', 'Nota_LC', 'Nota_CN'):
+        df[nota] = base + gerador.normal(0, 30, n_municipios)
+    df['Nota_Media_Geral'] = df[['Nota_Redacao', 'Nota_CH', 'Nota_Mat', 'Nota_LC', 'Nota_CN']].mean(axis=1)
+    df['IDEB'] = np.clip(3 + 2 * inclusao + gerador.normal(0, 0.4, n_municipios), 0, 10).round(1)
+    df['Taxa_Alunos'] = alunos / alunos.sum()
+    return df
+
+
+def gravar_sinteticos(pasta, n_municipios, semente=0):
+    """Grava indicadoresXX.csv sintéticos para todos os ANOS em `pasta`."""
+    for ano in ANOS:
+        gerar_ano(n_municipios, ano, semente).to_csv(os.path.join(pasta, f'indicadores{ano % 100:02d}.csv'))
+
+
+@contextlib.contextmanager
+def _na_pasta(pasta):
+    # o registro resolve armazém e CSVs a partir da pasta atual
+    anterior = os.getcwd()
+    os.chdir(pasta)
+    try:
+        yield
+    finally:
+        os.chdir(anterior)
+
+
+# --- CASOS ---
+def casos(painel, reamostras=REAMOSTRAS['real']):
+    """Lista de (nome, linhas processadas, função sem argumentos)."""
+    anos = registro.anos_do_painel(painel)
+    a, b = anos[0], anos[-1]
+    df_a, df_b = registro.fatia_ano(painel, a), registro.fatia_ano(painel, b)
+    sub = painel.loc[[a, b]]
+    p25 = registro.percentil_por_ano(painel, 'Taxa_Internet', 25)[b]
+    p75 = registro.percentil_por_ano(painel, 'Taxa_Internet', 75)[b]
+    # funções em cache do Streamlit: mede o corpo, não o acerto de cache
+    resumo = func.resumo_comparativo.__wrapped__
+
+    return [
+        ('resumo_comparativo', len(df_a) + len(df_b), lambda: resumo(df_a, df_b, notas=True)),
+        ('resumo_comparativo_ponderado', len(df_a) + len(df_b), lambda: resumo(df_a, df_b, ponderar=True)),
+        ('gerar_histograma', len(df_b), lambda: func.gerar_histograma(
+            df_b, 'Taxa_Internet', 'blue', 'Histograma', 'Taxa').to_dict()),
+        ('comparar', len(sub), lambda: registro.comparar(painel, ['Taxa_Internet', 'Total_Alunos'], (a, b))),
+        ('tabela_variacao', len(sub), lambda: cubo._tabela_variacao(painel, 'Taxa_Internet', (a, b))),
+        ('tabelas_percentil', len(df_b), lambda: cubo._tabelas_percentil(painel, 'Taxa_Internet', b, p25, p75)),
+        ('correlacao_por_ano', len(painel), lambda: registro.correlacao_por_ano(painel, 'Nota_Media_Geral', 'Taxa_Internet')),
+        ('tabela_correlacoes', len(painel), lambda: correlacao.tabela_correlacoes(
+            painel, METRICAS + ['IDEB'], n_reamostras=reamostras)),
+    ]
+
+
+def medir(funcao, repeticoes):
+    """(tempos em s, pico de memória em bytes)."""
+    funcao()    # aquecimento (imports, caches do pandas)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    try:
+        funcao()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return tempos, pico
+
+
+def _resultado(escala, caso, linhas, tempos, pico):
+    mediana = statistics.median(tempos)
+    return {
+        'escala': escala, 'caso': caso, 'linhas': int(linhas),
+        'tempo_mediano': mediana, 'tempo_min': min(tempos),
+        'linhas_por_s': linhas / mediana if mediana else None,
+        'memoria_pico': pico,
+    }
+
+
+def rodar_escala(escala, repeticoes):
+    """Resultados de todos os casos numa escala ('real' usa os CSVs da pasta atual)."""
+    n = ESCALAS[escala]
+    with tempfile.TemporaryDirectory() as pasta:
+        if n is None:
+            pasta = os.getcwd()
+        else:
+            gravar_sinteticos(pasta, n)
+
+        with _na_pasta(pasta):
+            tempos, pico = medir(registro.carregar_painel, repeticoes)
+            painel = registro.carregar_painel()
+        resultados = [_resultado(escala, 'carregar_painel', len(painel), tempos, pico)]
+
+        for caso, linhas, funcao in casos(painel, REAMOSTRAS[escala]):
+            tempos, pico = medir(funcao, repeticoes)
+            resultados.append(_resultado(escala, caso, linhas, tempos, pico))
+
+    for r in resultados:
+        print(f"{escala:>5} {r['caso']:<30} {r['tempo_mediano'] * 1000:10.1f} ms {r['memoria_pico'] / 2**20:9.1f} MiB")
+    return resultados
+
+
+def comparar_com_base(resultados, caminho_base):
+    """Imprime razão novo/base de tempo e memória para os casos em comum."""
+    with open(caminho_base, encoding='utf-8') as arquivo:
+        base = {(r['escala'], r['caso']): r for r in json.load(arquivo)['resultados']}
+    print(f"\nComparação com {caminho_base} (razão novo/base; < 1 é melhora)")
+    for r in resultados:
+        anterior = base.get((r['escala'], r['caso']))
+        if anterior:
+            tempo = r['tempo_mediano'] / anterior['tempo_mediano']
+            memoria = r['memoria_pico'] / anterior['memoria_pico'] if anterior['memoria_pico'] else float('nan')
+            print(f"{r['escala']:>5} {r['caso']:<30} tempo {tempo:6.2f}x  memória {memoria:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks da camada de dados e dos gráficos.")
+    parser.add_argument('--escalas', nargs='+', choices=list(ESCALAS), default=list(ESCALAS))
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--saida', help="JSON de saída (padrão: dados/benchmarks/<data>.json)")
+    parser.add_argument('--base', help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    # avisos do Streamlit sem servidor rodando não interessam aqui
+    warnings.filterwarnings('ignore')
+
+    resultados = []
+    for escala in args.escalas:
+        resultados.extend(rodar_escala(escala, args.repeticoes))
+
+    saida = args.saida or os.path.join(PASTA_RESULTADOS, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(saida) or '.', exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump({
+            'quando': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'plataforma': platform.platform(),
+            'versoes': {'numpy': np.__version__, 'pandas': pd.__version__},
+            'repeticoes': args.repeticoes,
+            'resultados': resultados,
+        }, arquivo, indent=1)
+    print(f"\nResultados gravados em {saida}")
+
+    if args.base:
+        comparar_com_base(resultados, args.base)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Cache de figuras compartilhado entre sessões, com descarte LRU.
+
+Guarda a figura já serializada (spec Plotly em dict ou PNG do matplotlib), não
+o objeto vivo, então o tamanho de cada entrada é previsível e as figuras do
+matplotlib são fechadas logo após a renderização. A chave segue o formato
+(tipo, métrica, ano, estilo).
+"""
+import io
+import threading
+from collections import OrderedDict
+
+import instrumentacao
+
+
+CAPACIDADE_PADRAO = 64
+
+
+class CacheFiguras:
+    """Cache LRU limitado a `capacidade` figuras, seguro entre threads."""
+
+    def __init__(self, capacidade=CAPACIDADE_PADRAO):
+        self.capacidade = capacidade
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+
+    def obter(self, chave, construir):
+        """Retorna o valor de `chave`, chamando `construir()` se não estiver em cache."""
+        with self._trava:
+            acerto = chave in self._itens
+            if acerto:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                valor = self._itens[chave]
+            else:
+                self.falhas += 1
+        # atribui o acerto/falha à seção em execução (painel de depuração)
+        instrumentacao.registrar_cache(acerto)
+        if acerto:
+            return valor
+
+        # constrói fora da trava; duas sessões podem construir a mesma figura ao mesmo tempo
+        valor = construir()
+
+        with self._trava:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+                self.descartes += 1
+        return valor
+
+    def plotly(self, chave, construir):
+        """Spec (dict) de uma figura Plotly, pronta para st.plotly_chart."""
+        return self.obter(chave, lambda: construir().to_dict())
+
+    def png(self, chave, construir, dpi=100):
+        """PNG (bytes) de uma figura matplotlib; a figura é fechada após salvar."""
+        return self.obter(chave, lambda: figura_para_png(construir(), dpi))
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                'itens': len(self._itens),
+                'capacidade': self.capacidade,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'descartes': self.descartes,
+            }
+
+
+def figura_para_png(fig, dpi=100):
+    """Renderiza uma figura matplotlib em PNG e libera a figura."""
+    import matplotlib.pyplot as plt
+
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+# Instância do processo: o Streamlit importa o módulo uma vez por servidor,
+# então todas as sessões compartilham este cache.
+CACHE = CacheFiguras()
@@ -0,0 +1,235 @@
+"""
+Construção em lote dos indicadores de todos os anos.
+
+Cada ano do microdado é dividido em fatias de bytes de tamanho fixo
+(TAMANHO_FATIA, alinhadas em quebra de linha) e cada (ano, fatia) vira uma
+tarefa num pool de processos. Os parciais (somas e contagens, nunca
+médias) são combinados por ano e finalizados em indicadoresXX.csv. Como as
+somas são inteiras, o resultado é idêntico byte a byte ao de `ingestao.py`
+rodando em um único processo. Os esboços de quantis de cada fatia são
+combinados do mesmo jeito e gravados em dados/quantis (ver `quantis.py`);
+esses dependem um pouco da divisão em fatias (são aproximados), que por ser
+fixa não muda com --workers.
+
+Reconstrução incremental: cada parcial é gravado em dados/parciais com o
+nome igual ao hash do conteúdo da fatia (mais ano, UF e layout). Numa nova
+execução, fatias cujo conteúdo não mudou são lidas do disco em vez de
+reprocessadas, então acrescentar ou corrigir um ano só processa aquele ano,
+e mudar o número de workers não invalida nada.
+Os indicadoresXX.csv só são regravados quando mudam, e em seguida o armazém
+Parquet e o cubo (se existirem) são atualizados apenas para esses anos.
+
+Uso:
+    python construir.py 2019=MICRODADOS_ENEM_2019.csv 2023=MICRODADOS_ENEM_2023.csv --workers 8
+    python construir.py --pasta dados/      # descobre MICRODADOS_ENEM_<ano>.csv
+    python construir.py --pasta dados/ --sem-cache   # ignora os parciais gravados
+    python construir.py --pasta dados/ --uf BR       # todas as UFs (microdado nacional)
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import armazem
+import cubo
+import quantis
+from ingestao import (
+    BRASIL, TAMANHO_CHUNK, UF_PADRAO, agregar_fatia, dividir_arquivo, esboco_do_ano, finalizar_ano,
+    layout_do_ano,
+)
+
+
+PASTA_PARCIAIS = os.path.join('dados', 'parciais')
+MANIFESTO = 'manifesto.json'
+# Incrementar ao mudar agregar_chunk: invalida todos os parciais gravados
+VERSAO_PARCIAL = 4
+# Bytes por fatia: fixo, para que a divisão (e os parciais gravados) não
+# dependa do número de workers
+TAMANHO_FATIA = 64 << 20
+
+
+def descobrir_microdados(pasta):
+    """Mapeia ano -> caminho para os MICRODADOS_ENEM_<ano>.csv de uma pasta."""
+    arquivos = {}
+    for caminho in glob.glob(os.path.join(pasta, 'MICRODADOS_ENEM_*.csv')):
+        achado = re.search(r'MICRODADOS_ENEM_(\d{4})\.csv$', caminho)
+        if achado:
+            arquivos[int(achado.group(1))] = caminho
+    return dict(sorted(arquivos.items()))
+
+
+# --- PARCIAIS EM DISCO ---
+def _ler_manifesto(pasta):
+    caminho = os.path.join(pasta, MANIFESTO)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def _gravar_manifesto(pasta, manifesto):
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, MANIFESTO), 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=1, sort_keys=True)
+
+
+def _hashes_fatias(caminho, fatias, manifesto):
+    """
+    Hash do conteúdo de cada fatia. Reaproveita os hashes do manifesto se o
+    arquivo tem o mesmo tamanho, data de modificação e divisão em fatias.
+    """
+    info = os.stat(caminho)
+    assinatura = {'tamanho': info.st_size, 'mtime': info.st_mtime_ns, 'fatias': [list(f) for f in fatias]}
+    anterior = manifesto.get(os.path.abspath(caminho), {})
+    if all(anterior.get(k) == v for k, v in assinatura.items()):
+        return anterior['hashes']
+    hashes = [armazem.hash_arquivo(caminho, inicio, fim) for inicio, fim in fatias]
+    manifesto[os.path.abspath(caminho)] = {**assinatura, 'hashes': hashes}
+    return hashes
+
+
+def chave_parcial(ano, hash_fatia, uf):
+    """Nome do parcial: muda se mudar o conteúdo da fatia, o ano, a UF ou o layout."""
+    texto = json.dumps([VERSAO_PARCIAL, ano, uf, layout_do_ano(ano), hash_fatia], sort_keys=True)
+    return hashlib.blake2b(texto.encode(), digest_size=16).hexdigest()
+
+
+def _caminho_parcial(pasta, chave):
+    return os.path.join(pasta, f'{chave}.pkl')
+
+
+def _limpar_parciais(pasta, manifesto):
+    """Apaga parciais que nenhum arquivo do manifesto referencia mais."""
+    usados = {chave for info in manifesto.values() for chave in info.get('chaves', [])}
+    for caminho in glob.glob(os.path.join(pasta, '*.pkl')):
+        if os.path.basename(caminho)[:-4] not in usados:
+            os.remove(caminho)
+
+
+def construir_indicadores(arquivos, workers=None, tamanho_fatia=TAMANHO_FATIA,
+                          uf=UF_PADRAO, tamanho_chunk=TAMANHO_CHUNK, pasta_parciais=None):
+    """
+    Gera as tabelas de indicadores de vários anos em paralelo.
+
+    arquivos: dict ano -> caminho do microdado.
+    tamanho_fatia: bytes por fatia de cada arquivo (cortes em posições fixas).
+    pasta_parciais: se informada, reaproveita (e grava) os parciais por fatia.
+    Retorna (dict ano -> DataFrame final, dict ano -> esboço de quantis).
+    """
+    workers = workers or os.cpu_count() or 1
+
+    tarefas = {
+        ano: dividir_arquivo(caminho, tamanho_fatia=tamanho_fatia)
+        for ano, caminho in arquivos.items()
+    }
+
+    chaves = {}
+    manifesto = {}
+    if pasta_parciais:
+        os.makedirs(pasta_parciais, exist_ok=True)
+        manifesto = _ler_manifesto(pasta_parciais)
+        for ano, fatias in tarefas.items():
+            hashes = _hashes_fatias(arquivos[ano], fatias, manifesto)
+            chaves[ano] = [chave_parcial(ano, h, uf) for h in hashes]
+            manifesto[os.path.abspath(arquivos[ano])]['chaves'] = chaves[ano]
+
+    def gravado(ano, i):
+        return ano in chaves and os.path.exists(_caminho_parcial(pasta_parciais, chaves[ano][i]))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = {
+            ano: [
+                None if gravado(ano, i)
+                else pool.submit(agregar_fatia, arquivos[ano], ano, inicio, fim, uf, tamanho_chunk)
+                for i, (inicio, fim) in enumerate(fatias)
+            ]
+            for ano, fatias in tarefas.items()
+        }
+
+        resultados, esbocos = {}, {}
+        for ano, lista in futuros.items():
+            parciais = []
+            for i, futuro in enumerate(lista):
+                if futuro is None:
+                    parciais.append(pd.read_pickle(_caminho_parcial(pasta_parciais, chaves[ano][i])))
+                    continue
+                parcial = futuro.result()
+                if ano in chaves:
+                    pd.to_pickle(parcial, _caminho_parcial(pasta_parciais, chaves[ano][i]))
+                parciais.append(parcial)
+            # combina na ordem das fatias para manter a saída determinística
+            resultados[ano] = finalizar_ano(parciais, ano, origem=arquivos[ano])
+            esbocos[ano] = esboco_do_ano(parciais)
+
+    if pasta_parciais:
+        _gravar_manifesto(pasta_parciais, manifesto)
+        _limpar_parciais(pasta_parciais, manifesto)
+    return resultados, esbocos
+
+
+def gravar_se_mudou(df, saida):
+    """Grava o CSV só se o conteúdo mudou (mantém o hash dos anos intactos). Retorna True se gravou."""
+    conteudo = df.to_csv()
+    if os.path.exists(saida):
+        with open(saida, encoding='utf-8', newline='') as arquivo:
+            if arquivo.read() == conteudo:
+                return False
+    with open(saida, 'w', encoding='utf-8', newline='') as arquivo:
+        arquivo.write(conteudo)
+    return True
+
+
+def _ler_pares(pares):
+    arquivos = {}
+    for par in pares:
+        ano, _, caminho = par.partition('=')
+        if not caminho:
+            raise SystemExit(f"Use ANO=CAMINHO, recebido: '{par}'")
+        arquivos[int(ano)] = caminho
+    return arquivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Constrói os indicadores de todos os anos em paralelo.")
+    parser.add_argument('arquivos', nargs='*', help="Pares ANO=MICRODADOS_ENEM_<ano>.csv")
+    parser.add_argument('--pasta', help="Pasta onde procurar MICRODADOS_ENEM_<ano>.csv")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--mb-fatia', type=int, default=TAMANHO_FATIA >> 20, help="Tamanho de cada fatia, em MB")
+    parser.add_argument('--uf', default=UF_PADRAO, help=f"Sigla da UF ou {BRASIL} para todas")
+    parser.add_argument('--chunk', type=int, default=TAMANHO_CHUNK, help="Linhas por chunk")
+    parser.add_argument('--saida', default='.', help="Pasta de saída dos indicadoresXX.csv")
+    parser.add_argument('--sem-cache', action='store_true', help="Reprocessa todas as fatias")
+    args = parser.parse_args()
+
+    arquivos = _ler_pares(args.arquivos)
+    if args.pasta:
+        arquivos = {**descobrir_microdados(args.pasta), **arquivos}
+    if not arquivos:
+        parser.error("nenhum microdado informado")
+
+    pasta_parciais = None if args.sem_cache else PASTA_PARCIAIS
+    resultados, esbocos = construir_indicadores(arquivos, args.workers, args.mb_fatia << 20, args.uf, args.chunk, pasta_parciais)
+    for ano, df in resultados.items():
+        saida = os.path.join(args.saida, f'indicadores{ano % 100:02d}.csv')
+        if gravar_se_mudou(df, saida):
+            print(f"{ano}: {len(df)} municípios gravados em {saida}")
+        else:
+            print(f"{ano}: sem alterações em {saida}")
+        if esbocos[ano] is not None and quantis.gravar(esbocos[ano], ano):
+            print(f"{ano}: esboço de quantis gravado em {quantis.PASTA_QUANTIS}")
+
+    # caches derivados: só os anos alterados são refeitos
+    if armazem.existe():
+        print(f"Armazém: anos regravados {armazem.compilar_pasta(args.saida) or 'nenhum'}")
+    for escopo in cubo.escopos_gravados():
+        recalculados = cubo.atualizar_cubo(escopo=escopo).get('recalculados')
+        print(f"Cubo {escopo}: anos recalculados {recalculados or 'nenhum'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Motor de correlações entre métricas.
+
+Calcula, para cada ano, a matriz completa métrica x métrica (Pearson e
+Spearman) e intervalos de confiança por bootstrap para todas as células de
+uma vez: as reamostras viram um único array (reamostras x municípios x
+métricas) e as correlações saem de produtos matriciais (einsum), sem laço
+por par de métricas nem por reamostra.
+
+Valores ausentes são tratados par a par, como no DataFrame.corr do pandas:
+no Spearman, os postos de cada par saem só das linhas com os dois valores
+(pares de colunas com ausências diferentes passam por um laço próprio).
+"""
+import numpy as np
+import pandas as pd
+
+
+N_REAMOSTRAS = 2000
+NIVEL = 0.95
+BLOCO = 250     # reamostras processadas por vez (limita a memória)
+MAX_ELEMENTOS = 4_000_000   # teto de valores por bloco (~32 MB em float64)
+
+
+def _postos_medios(x):
+    """
+    Postos (1..n) ao longo do eixo 1, com empates recebendo o posto médio,
+    como no Spearman do pandas. NaN continua NaN. `x` tem forma (B, n, k).
+    """
+    nan = np.isnan(x)
+    valores = np.where(nan, np.inf, x)
+    ordem = np.argsort(valores, axis=1, kind='stable')
+    ordenado = np.take_along_axis(valores, ordem, axis=1)
+
+    n = x.shape[1]
+    posicao = np.arange(n).reshape(1, n, 1)
+    inicio_grupo = np.ones_like(ordenado, dtype=bool)
+    inicio_grupo[:, 1:] = ordenado[:, 1:] != ordenado[:, :-1]
+    fim_grupo = np.ones_like(ordenado, dtype=bool)
+    fim_grupo[:, :-1] = inicio_grupo[:, 1:]
+
+    primeiro = np.maximum.accumulate(np.where(inicio_grupo, posicao, 0), axis=1)
+    ultimo = np.flip(np.minimum.accumulate(np.flip(np.where(fim_grupo, posicao, n), axis=1), axis=1), axis=1)
+    postos_ordenados = (primeiro + ultimo) / 2 + 1
+
+    postos = np.empty_like(postos_ordenados)
+    np.put_along_axis(postos, ordem, postos_ordenados, axis=1)
+    postos[nan] = np.nan
+    return postos
+
+
+def _pearson_lote(x):
+    """
+    Correlação de Pearson par a par para um lote de amostras.
+    `x` tem forma (B, n, k); retorna (B, k, k).
+    """
+    presente = ~np.isnan(x)
+    m = presente.astype('float64')
+    # centraliza para reduzir erro numérico das somas
+    x = np.where(presente, x - np.nanmean(x, axis=1, keepdims=True), 0.0)
+
+    w = np.einsum('bni,bnj->bij', m, m)
+    sx = np.einsum('bni,bnj->bij', x, m)
+    sxx = np.einsum('bni,bnj->bij', x * x, m)
+    sxy = np.einsum('bni,bnj->bij', x, x)
+    sy = np.swapaxes(sx, 1, 2)
+    syy = np.swapaxes(sxx, 1, 2)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / w
+        var_x = sxx - sx * sx / w
+        var_y = syy - sy * sy / w
+        r = cov / np.sqrt(var_x * var_y)
+    r[w < 3] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+def _spearman_lote(x):
+    """
+    Spearman par a par para um lote de amostras, como no pandas: os postos de
+    cada par são calculados só nas linhas com os dois valores presentes.
+    `x` tem forma (B, n, k); retorna (B, k, k).
+    """
+    presente = ~np.isnan(x)
+    # colunas com as mesmas ausências já saem certas dos postos da coluna inteira
+    r = _pearson_lote(_postos_medios(x))
+    for i in range(x.shape[2]):
+        for j in range(i + 1, x.shape[2]):
+            ambos = presente[..., i] & presente[..., j]
+            if (ambos == presente[..., i]).all() and (ambos == presente[..., j]).all():
+                continue
+            par = np.where(ambos[..., None], x[..., [i, j]], np.nan)
+            r[:, i, j] = r[:, j, i] = _pearson_lote(_postos_medios(par))[:, 0, 1]
+    return r
+
+
+def bootstrap(valores, metodo='pearson', n_reamostras=N_REAMOSTRAS, nivel=NIVEL, semente=0):
+    """
+    Intervalo de confiança percentil por bootstrap para todas as células da
+    matriz de correlação. `valores` é (n, k); retorna (ic_inf, ic_sup), (k, k).
+    """
+    valores = np.asarray(valores, dtype='float64')
+    n = valores.shape[0]
+    gerador = np.random.default_rng(semente)
+
+    # com muitos municípios o bloco diminui para caber no teto de memória
+    bloco = max(1, min(BLOCO, MAX_ELEMENTOS // max(1, valores.size)))
+
+    resultados = []
+    for inicio in range(0, n_reamostras, bloco):
+        b = min(bloco, n_reamostras - inicio)
+        indices = gerador.integers(0, n, size=(b, n))
+        amostras = valores[indices]                 # (b, n, k)
+        resultados.append(_spearman_lote(amostras) if metodo == 'spearman' else _pearson_lote(amostras))
+    r = np.concatenate(resultados)
+
+    alfa = (1 - nivel) / 2
+    with np.errstate(invalid='ignore'):
+        ic_inf, ic_sup = np.nanquantile(r, [alfa, 1 - alfa], axis=0)
+    return ic_inf, ic_sup
+
+
+def tabela_correlacoes(painel, metricas, metodos=('pearson', 'spearman'),
+                       n_reamostras=N_REAMOSTRAS, nivel=NIVEL, semente=0):
+    """
+    Tabela longa com r e IC de todos os pares de métricas, por ano e método.
+    Índice: (ANO, METODO, X, Y); colunas: r, ic_inf, ic_sup, n.
+    """
+    metricas = [m for m in metricas if m in painel.columns]
+    partes = []
+    for ano, df in painel[metricas].groupby(level='ANO'):
+        df = df.dropna(axis=1, how='all')
+        colunas = list(df.columns)
+        valores = df.to_numpy(dtype='float64')
+        n_pares = (~np.isnan(valores)).astype(int)
+        n_pares = n_pares.T @ n_pares
+
+        for metodo in metodos:
+            r = df.corr(method=metodo).to_numpy()
+            ic_inf, ic_sup = bootstrap(valores, metodo, n_reamostras, nivel, semente)
+            x, y = np.meshgrid(colunas, colunas, indexing='ij')
+            partes.append(pd.DataFrame({
+                'ANO': ano,
+                'METODO': metodo,
+                'X': x.ravel(),
+                'Y': y.ravel(),
+                'r': r.ravel(),
+                'ic_inf': ic_inf.ravel(),
+                'ic_sup': ic_sup.ravel(),
+                'n': n_pares.ravel(),
+            }))
+
+    return pd.concat(partes, ignore_index=True).set_index(['ANO', 'METODO', 'X', 'Y']).sort_index()
+
+
+def matriz(tabela, ano, metodo='pearson', valor='r'):
+    """Matriz métrica x métrica de um ano a partir da tabela longa."""
+    return tabela.loc[(ano, metodo), valor].unstack('Y')
@@ -0,0 +1,328 @@
+"""
+Cubo de comparações pré-calculado.
+
+Para cada métrica (taxas do sidebar e colunas Nota_*) e cada ano/par de anos,
+guarda as médias estaduais, percentis 25/75, correlações (Pearson e Spearman
+com IC por bootstrap), deltas, as tabelas por município já prontas para
+exibição e os municípios sem par entre os anos. O dashboard só consulta o
+cubo; trocar a métrica no sidebar vira uma busca em dicionário, sem
+recalcular nada.
+
+Cada ano guarda o hash dos indicadores de origem; ao atualizar, só as
+tabelas que envolvem anos alterados são recalculadas.
+
+Há um cubo por escopo: uma UF (dados/cubo.pkl para o Ceará, dados/cubo_SP.pkl
+etc.) ou o Brasil inteiro (dados/cubo_BR.pkl). Cada cubo traz também os
+agregados por UF e ano ('estados'), usados no comparativo entre estados, e
+os escores z / z robusto de cada município ('escores', ver escores.py).
+
+Uso:
+    python cubo.py               # grava/atualiza dados/cubo.pkl a partir do registro
+    python cubo.py --uf BR       # cubo do Brasil inteiro
+"""
+import argparse
+import glob
+import itertools
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+import agregados
+import correlacao
+import escores
+import municipios
+import registro
+
+
+PASTA_CUBOS = 'dados'
+
+METRICAS_TAXA = ['Taxa_Inclusao_Digital', 'Taxa_Computador', 'Taxa_Internet']
+METRICAS_NOTA = ['Nota_Media_Geral', 'Nota_Redacao', 'Nota_CH', 'Nota_Mat', 'Nota_LC', 'Nota_CN']
+METRICAS = METRICAS_TAXA + METRICAS_NOTA
+
+# Colunas (nomes canônicos) lidas pelo dashboard e pelo relatório estático;
+# o armazém Parquet lê só estas
+COLUNAS = [
+    'MUNICIPIO', 'Total_Alunos', 'Taxa_Inclusao_Digital', 'Taxa_Computador', 'Taxa_Internet',
+    'Nota_Media_Geral', 'Nota_Redacao', 'Nota_CH', 'Nota_Mat', 'Nota_LC', 'Nota_CN', 'IDEB',
+]
+
+# Nome de cada métrica nos títulos e eixos (dashboard e relatório)
+ROTULOS = {
+    'Taxa_Inclusao_Digital': 'Taxa de Suporte Digital ao Estudo (PC + Net)',
+    'Taxa_Computador': 'Posse de Computador',
+    'Taxa_Internet': 'Acesso à Internet',
+    'Nota_Media_Geral': 'Nota Média do ENEM',
+    'Nota_Redacao': 'Nota de Redação',
+    'Nota_CH': 'Nota de Ciências Humanas',
+    'Nota_Mat': 'Nota de Matemática',
+    'Nota_LC': 'Nota de Linguagens e Códigos',
+    'Nota_CN': 'Nota de Ciências da Natureza',
+}
+
+
+def caminho_cubo(escopo=municipios.UF_PADRAO):
+    """Arquivo do cubo de um escopo (sigla da UF ou BRASIL)."""
+    nome = 'cubo.pkl' if escopo == municipios.UF_PADRAO else f'cubo_{escopo}.pkl'
+    return os.path.join(PASTA_CUBOS, nome)
+
+
+CAMINHO_CUBO = caminho_cubo()
+
+
+def escopos_gravados():
+    """Escopos com cubo gravado em disco."""
+    escopos = []
+    for caminho in glob.glob(os.path.join(PASTA_CUBOS, 'cubo*.pkl')):
+        achado = re.search(r'cubo(?:_([A-Z]{2}))?\.pkl$', caminho)
+        if achado:
+            escopos.append(achado.group(1) or municipios.UF_PADRAO)
+    return sorted(escopos)
+
+
+def eh_nota(metrica):
+    return metrica.startswith('Nota_')
+
+
+def arredondar(dados, casas):
+    """
+    Série ou tabela (só as colunas de ponto flutuante) arredondada em float64:
+    o armazém guarda float32, e arredondar nele exibiria resíduos.
+    """
+    if isinstance(dados, pd.DataFrame):
+        flutuantes = dados.select_dtypes('floating').columns
+        return dados.astype({c: 'float64' for c in flutuantes}).round(casas)
+    return dados.astype('float64').round(casas)
+
+
+def _resumo(painel, metricas):
+    """
+    Estatísticas por (métrica, ANO): media, p25, p75, corr_nota, corr_ideb,
+    além de variancia, media_ponderada e variancia_ponderada (pesos = alunos).
+    """
+    por_ano = painel[metricas].groupby(level='ANO')
+    estatisticas = {
+        'media': por_ano.mean(),
+        'p25': por_ano.quantile(0.25),
+        'p75': por_ano.quantile(0.75),
+        'corr_nota': pd.DataFrame({
+            m: registro.correlacao_por_ano(painel, 'Nota_Media_Geral', m) for m in metricas
+        }),
+    }
+    if 'IDEB' in painel.columns:
+        estatisticas['corr_ideb'] = pd.DataFrame({
+            m: registro.correlacao_por_ano(painel, m, 'IDEB') for m in metricas
+        })
+    else:
+        # o IDEB não vem no microdado: indicadores gerados pela ingestão não o têm
+        estatisticas['corr_ideb'] = pd.DataFrame(np.nan, index=estatisticas['media'].index, columns=metricas)
+
+    # unstack de (ANO x métrica) gera uma série indexada por (métrica, ANO)
+    resumo = pd.concat({nome: df.unstack() for nome, df in estatisticas.items()}, axis=1)
+    resumo = resumo.rename_axis(['METRICA', 'ANO'])
+    ponderados = agregados.agregados_estaduais(painel, metricas)
+    resumo = resumo.join(ponderados[['variancia', 'media_ponderada', 'variancia_ponderada']])
+    return resumo.sort_index()
+
+
+def _tabela_variacao(painel, metrica, anos):
+    """Tabela 'Ver Dados Detalhados por Município' de um par de anos."""
+    a, b = (f'{metrica}_{ano % 100:02d}' for ano in anos)
+    df = registro.comparar(painel, [metrica, 'Total_Alunos'], anos)
+    if eh_nota(metrica):
+        df[a] = arredondar(df[a], 2)
+        df[b] = arredondar(df[b], 2)
+        df['Variação (p.p)'] = ((df[b] - df[a]) / df[a] * 100).round(2)
+    else:
+        df[a] = arredondar(df[a], 4)
+        df[b] = arredondar(df[b], 4)
+        df['Variação (p.p)'] = (df[b] - df[a]).round(4) * 100.000
+    return df.sort_values('Variação (p.p)', ascending=False)
+
+
+def _tabela_correlacao(painel, metrica, anos):
+    """Tabela métrica x Nota_Media_Geral por município de um par de anos."""
+    colunas = list(dict.fromkeys([metrica, 'Nota_Media_Geral']))
+    df = registro.comparar(painel, colunas, anos)
+    casas = 2 if eh_nota(metrica) else 4
+    for ano in anos:
+        col = f'{metrica}_{ano % 100:02d}'
+        df[col] = arredondar(df[col], casas)
+    return df
+
+
+def _tabelas_percentil(painel, metrica, ano, p25, p75):
+    """Municípios abaixo do p25 e acima do p75 de um ano."""
+    df = registro.fatia_ano(painel, ano)[['UF', 'MUNICIPIO', metrica, 'Total_Alunos']].dropna(subset=[metrica])
+    df[metrica] = arredondar(df[metrica], 2 if eh_nota(metrica) else 4)
+    original = painel.xs(ano, level='ANO')[metrica].dropna().to_numpy()
+    baixo = df[original <= p25].sort_values(metrica)
+    alto = df[original >= p75].sort_values(metrica, ascending=False)
+    return baixo, alto
+
+
+def _impressao_municipios(painel):
+    """Hash do índice de municípios do painel (códigos e grafias canônicas)."""
+    pares = painel.index.get_level_values('MUNICIPIO').astype(str) + '|' + painel['CD_MUN'].astype(str).to_numpy()
+    return int(pd.util.hash_array(np.unique(pares.to_numpy())).sum())
+
+
+def construir_cubo(painel, metricas=METRICAS, impressoes=None, anterior=None):
+    """
+    Materializa o cubo de comparações para todas as métricas e anos do painel.
+
+    Com `impressoes` ({ano: hash}, ver registro.impressoes) e um cubo
+    `anterior`, só recalcula as tabelas e correlações dos anos cujo hash
+    mudou; o resto é reaproveitado. O resumo é sempre recalculado (é barato).
+    """
+    metricas = [m for m in metricas if m in painel.columns]
+    anos = registro.anos_do_painel(painel)
+    resumo = _resumo(painel, metricas)
+    municipios = _impressao_municipios(painel)
+
+    reaproveitar = (
+        anterior is not None and impressoes is not None
+        and anterior.get('metricas') == metricas
+        and anterior.get('municipios') == municipios
+    )
+    antigas = anterior.get('impressoes', {}) if reaproveitar else {}
+    alterados = [ano for ano in anos if impressoes is None or antigas.get(ano) != impressoes.get(ano)]
+
+    pares = {}
+    for metrica in metricas:
+        for a, b in itertools.combinations(anos, 2):
+            chave = (metrica, a, b)
+            if a not in alterados and b not in alterados:
+                pares[chave] = anterior['pares'][chave]
+                continue
+            media_a = resumo.loc[(metrica, a), 'media']
+            media_b = resumo.loc[(metrica, b), 'media']
+            pares[chave] = {
+                'delta': media_b - media_a,
+                'delta_pct': (media_b - media_a) / media_a * 100,
+                'detalhe': _tabela_variacao(painel, metrica, (a, b)),
+                'correlacao_detalhe': _tabela_correlacao(painel, metrica, (a, b)),
+                'sem_par': registro.sem_par(painel, (a, b)),
+            }
+
+    percentis = {}
+    for metrica in metricas:
+        for ano in anos:
+            chave = (metrica, ano)
+            if ano not in alterados:
+                if chave in anterior['percentis']:
+                    percentis[chave] = anterior['percentis'][chave]
+                continue
+            linha = resumo.loc[chave]
+            if pd.notna(linha['p25']):
+                percentis[chave] = _tabelas_percentil(painel, metrica, ano, linha['p25'], linha['p75'])
+
+    # o bootstrap usa a mesma semente por ano, então recalcular só os anos
+    # alterados dá o mesmo resultado que recalcular tudo
+    partes = []
+    if alterados:
+        partes.append(correlacao.tabela_correlacoes(painel.loc[alterados], metricas + ['IDEB']))
+    if reaproveitar:
+        mantidos = [ano for ano in anos if ano not in alterados]
+        antigas_corr = anterior['correlacoes']
+        partes.append(antigas_corr[antigas_corr.index.get_level_values('ANO').isin(mantidos)])
+    correlacoes = pd.concat(partes).sort_index()
+
+    return {'anos': anos, 'metricas': metricas, 'resumo': resumo, 'pares': pares,
+            'percentis': percentis, 'correlacoes': correlacoes,
+            'ufs': sorted(painel['UF'].unique()), 'estados': agregados.agregados_por_uf(painel, metricas),
+            'escores': escores.calcular(painel, metricas + ['IDEB']),
+            'impressoes': impressoes or {}, 'municipios': municipios, 'recalculados': alterados}
+
+
+def gravar_cubo(cubo, caminho=CAMINHO_CUBO):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    pd.to_pickle(cubo, caminho)
+
+
+def carregar_cubo(caminho=None, painel=None, escopo=municipios.UF_PADRAO):
+    """
+    Lê o cubo gravado do escopo; se não existir, monta a partir do registro.
+    Se algum ano mudou desde a gravação, atualiza em memória só os anos alterados.
+    """
+    caminho = caminho or caminho_cubo(escopo)
+    anterior = pd.read_pickle(caminho) if os.path.exists(caminho) else None
+    impressoes = registro.impressoes()
+    # cubos gravados antes do comparativo entre estados, dos escores e da UF
+    # nas tabelas por município são montados de novo
+    if anterior is not None and (not {'estados', 'escores'} <= anterior.keys()
+                                 or any('UF' not in p['detalhe'] for p in anterior['pares'].values())):
+        anterior = None
+    if anterior is not None and anterior.get('impressoes') == impressoes:
+        return {**anterior, 'recalculados': []}
+    if painel is None:
+        painel = registro.carregar_painel(ufs=municipios.ufs_do_escopo(escopo))
+    return construir_cubo(painel, impressoes=impressoes, anterior=anterior)
+
+
+def atualizar_cubo(caminho=None, escopo=municipios.UF_PADRAO):
+    """Regrava o cubo do escopo recalculando só os anos cujos indicadores mudaram."""
+    caminho = caminho or caminho_cubo(escopo)
+    cubo = carregar_cubo(caminho, escopo=escopo)
+    if cubo.get('recalculados') or not os.path.exists(caminho):
+        gravar_cubo(cubo, caminho)
+    return cubo
+
+
+# --- CONSULTAS ---
+def estatistica(cubo, metrica, ano, nome):
+    """
+    Valor de `nome` (media, media_ponderada, variancia, variancia_ponderada,
+    p25, p75, corr_nota, corr_ideb) para métrica e ano.
+    """
+    return cubo['resumo'].at[(metrica, ano), nome]
+
+
+def par(cubo, metrica, ano_a, ano_b):
+    """Delta, delta_pct e tabelas por município do par de anos."""
+    return cubo['pares'][(metrica, ano_a, ano_b)]
+
+
+def percentis(cubo, metrica, ano):
+    """(abaixo do p25, acima do p75) para métrica e ano."""
+    return cubo['percentis'][(metrica, ano)]
+
+
+def correlacao_ic(cubo, x, y, ano, metodo='pearson'):
+    """Linha com r, ic_inf, ic_sup e n da correlação entre x e y no ano."""
+    return cubo['correlacoes'].loc[(ano, metodo, x, y)]
+
+
+def tem_correlacao(cubo, x, y, ano, metodo='pearson'):
+    """Se há correlação entre x e y no ano (colunas sem dados no escopo ficam de fora)."""
+    return (ano, metodo, x, y) in cubo['correlacoes'].index
+
+
+def estados(cubo, metrica, ano, nome='media'):
+    """Série por UF de `nome` (media, media_ponderada, n, ...) para métrica e ano."""
+    return cubo['estados'][nome].xs((metrica, ano), level=['METRICA', 'ANO'])
+
+
+def escores_municipais(cubo, metrica, ano):
+    """UF, CD_MUN, valor, z, z_robusto e atipico por município, para métrica e ano."""
+    return cubo['escores'].xs((metrica, ano), level=['METRICA', 'ANO'])
+
+
+def atipicos(cubo, metrica, ano):
+    """Municípios atípicos da métrica no ano, do mais ao menos extremo (|z robusto|)."""
+    tabela = escores_municipais(cubo, metrica, ano)
+    tabela = tabela[tabela['atipico']]
+    return tabela.iloc[np.argsort(-tabela['z_robusto'].abs().fillna(tabela['z'].abs()).to_numpy(), kind='stable')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Grava/atualiza o cubo de comparações.")
+    parser.add_argument('--uf', default=municipios.UF_PADRAO,
+                        help=f"Sigla da UF ou {municipios.BRASIL} para todas")
+    args = parser.parse_args()
+
+    cubo = atualizar_cubo(escopo=args.uf)
+    print(f"Cubo em {caminho_cubo(args.uf)}: {len(cubo['metricas'])} métricas, anos {cubo['anos']}; "
+          f"recalculados: {cubo.get('recalculados') or 'nenhum'}")
@@ -0,0 +1,93 @@
+"""
+Escores padronizados e municípios atípicos.
+
+Substitui as colunas z_score_nota / z_score_IDEB19 / z_score_IDEB23 gravadas
+nos CSVs pelo notebook (o de 2024 não as tem): para cada métrica e ano
+calcula, sobre o painel empilhado,
+
+- z: (x - média) / desvio padrão amostral, o mesmo critério das colunas
+  antigas (z_score_nota é o z de Nota_Media_Geral; z_score_IDEBxx, o de IDEB);
+- z robusto: 0,6745 (x - mediana) / MAD (Iglewicz e Hoaglin), que não é
+  puxado pelos próprios valores extremos;
+- atípico: |z robusto| > 3,5 (ou |z| > 3 quando o MAD é zero).
+
+As linhas são ordenadas por grupo uma única vez; médias e desvios saem de
+np.add.reduceat (como em agregados.py) e medianas/MAD de um lexsort por
+métrica, com índices calculados para todos os grupos de uma vez. O
+resultado é guardado no cubo (cubo.escores), junto com as demais tabelas.
+"""
+import numpy as np
+import pandas as pd
+
+import agregados
+
+
+LIMITE_Z = 3.0
+LIMITE_ROBUSTO = 3.5
+CONSTANTE_MAD = 0.6745     # quantil 75% da normal: torna o MAD comparável ao desvio
+
+
+def _mediana(valores, grupo, inicios, n):
+    """Mediana de cada coluna por grupo (linhas já ordenadas por grupo; NaN ignorado)."""
+    baixo = inicios[:, None] + np.maximum(n - 1, 0) // 2
+    alto = inicios[:, None] + n // 2
+    medianas = np.full(n.shape, np.nan)
+    for j in range(valores.shape[1]):
+        # dentro de cada grupo, em ordem crescente com os NaN no fim
+        ordenado = valores[np.lexsort((valores[:, j], grupo)), j]
+        medianas[:, j] = (ordenado[baixo[:, j]] + ordenado[alto[:, j]]) / 2
+    medianas[n == 0] = np.nan
+    return medianas
+
+
+def calcular(painel, metricas, niveis=('ANO',)):
+    """
+    Tabela longa indexada por (METRICA, ANO, MUNICIPIO) com UF, CD_MUN,
+    valor, z, z_robusto e atipico. Os escores são relativos ao grupo
+    definido por `niveis` (padrão: o ano; ('ANO', 'UF') compara cada
+    município com o próprio estado). Municípios sem valor ficam de fora.
+    """
+    metricas = [m for m in metricas if m in painel.columns]
+    codigos, _ = pd.MultiIndex.from_arrays([agregados.valores_do_nivel(painel, nome) for nome in niveis]).factorize(sort=True)
+
+    ordem = np.argsort(codigos, kind='stable')
+    grupo = codigos[ordem]
+    inicios = np.flatnonzero(np.r_[True, np.diff(grupo) != 0])
+    # posição de cada linha ordenada no vetor de grupos (0..n_grupos-1)
+    linha_grupo = np.cumsum(np.r_[False, np.diff(grupo) != 0])
+
+    valores = painel[metricas].to_numpy(dtype='float64')[ordem]
+    presente = ~np.isnan(valores)
+    n = np.add.reduceat(presente.astype('int64'), inicios, axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.add.reduceat(np.where(presente, valores, 0.0), inicios, axis=0) / n
+        desvio_linha = valores - media[linha_grupo]
+        desvio = np.sqrt(
+            np.add.reduceat(np.where(presente, desvio_linha ** 2, 0.0), inicios, axis=0) / (n - 1)
+        )
+        z = desvio_linha / desvio[linha_grupo]
+
+        mediana = _mediana(valores, grupo, inicios, n)
+        afastamento = np.abs(valores - mediana[linha_grupo])
+        mad = _mediana(afastamento, grupo, inicios, n)[linha_grupo]
+        z_robusto = np.where(mad > 0, CONSTANTE_MAD * (valores - mediana[linha_grupo]) / mad, np.nan)
+
+    atipico = np.where(np.isnan(z_robusto), np.abs(z) > LIMITE_Z, np.abs(z_robusto) > LIMITE_ROBUSTO)
+
+    # matrizes (linhas x métricas) -> ordem (métrica, linha)
+    base = painel.iloc[ordem]
+    k = len(metricas)
+    tabela = pd.DataFrame({
+        'METRICA': np.repeat(metricas, len(base)),
+        'ANO': np.tile(base.index.get_level_values('ANO').to_numpy(), k),
+        'MUNICIPIO': np.tile(base.index.get_level_values('MUNICIPIO').to_numpy(), k),
+        'UF': np.tile(base['UF'].to_numpy(), k),
+        'CD_MUN': np.tile(base['CD_MUN'].to_numpy(), k),
+        'valor': valores.T.ravel(),
+        'z': z.T.ravel(),
+        'z_robusto': z_robusto.T.ravel(),
+        'atipico': atipico.T.ravel(),
+    })
+    tabela = tabela[presente.T.ravel()]
+    return tabela.set_index(['METRICA', 'ANO', 'MUNICIPIO']).sort_index()
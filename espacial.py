@@ -0,0 +1,298 @@
+"""
+Autocorrelação espacial: I de Moran global e LISA (Anselin) por município.
+
+Os mapas e as tabelas p25/p75 mostram onde o suporte digital é baixo; estas
+estatísticas dizem se os municípios baixos (ou altos) formam agrupamentos.
+
+A vizinhança vem da malha compilada por mapas.py, de dois jeitos:
+- contiguidade (rainha): municípios que compartilham ao menos um vértice de
+  fronteira. A simplificação preserva as fronteiras compartilhadas, então os
+  vértices dos dois lados coincidem exatamente;
+- k vizinhos mais próximos pelo centróide (média dos vértices).
+A matriz é esparsa (CSR em arrays numpy: indptr/indices) e é gravada em
+dados/geometria/vizinhos_<tipo>.npz com o hash da malha: é montada uma vez
+e relida enquanto a malha não mudar. Os pesos são padronizados por linha
+sobre os municípios que têm valor no ano.
+
+Os p-valores vêm de permutações (999 por padrão): trocas completas dos
+valores para o I global e permutações condicionais para o LISA (cada
+município mantém o próprio valor e recebe vizinhos sorteados entre os
+demais, como no PySAL). As permutações são sorteadas em blocos, como
+matrizes (permutações x municípios), sem laço por município; cada bloco tem
+semente própria, então o resultado é o mesmo com qualquer número de
+processos (--workers).
+
+Uso:
+    python espacial.py --metrica Taxa_Internet --ano 2023
+    python espacial.py --metrica Nota_Media_Geral --ano 2023 --uf BR --vizinhanca knn --workers 4
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import armazem
+import mapas
+import municipios
+import registro
+
+
+PASTA_VIZINHOS = os.path.dirname(mapas.CAMINHO_GEOMETRIA)
+TIPOS = ('contiguidade', 'knn')
+K_PADRAO = 6
+PERMUTACOES = 999
+BLOCO = 100             # permutações sorteadas por vez (memória: BLOCO x ligações)
+SEMENTE = 0
+ALFA = 0.05
+
+CLUSTERS = {1: 'Alto-Alto', 2: 'Baixo-Alto', 3: 'Baixo-Baixo', 4: 'Alto-Baixo'}
+NAO_SIGNIFICATIVO = 'Não significativo'
+SEM_VIZINHOS = 'Sem vizinhos'
+
+
+# --- VIZINHANÇA ---
+def _csr(n, origem, destino):
+    """Matriz binária n x n (sem laços nem repetições) como {'indptr', 'indices'}."""
+    chave = np.unique(origem.astype('int64') * n + destino)
+    origem, destino = np.divmod(chave, n)
+    manter = origem != destino
+    origem, destino = origem[manter], destino[manter]
+    indptr = np.r_[0, np.cumsum(np.bincount(origem, minlength=n))]
+    return {'indptr': indptr.astype('int64'), 'indices': destino.astype('int64')}
+
+
+def _coordenadas(geometria):
+    """Vértices (x, y) de um MultiPolygon em GeoJSON compacto."""
+    return np.array([
+        ponto for poligono in json.loads(geometria)['coordinates'] for anel in poligono for ponto in anel
+    ], dtype='float64')
+
+
+def contiguidade(tabela):
+    """Vizinhança de rainha a partir da tabela de geometrias (CD_MUN, geometria)."""
+    escala = 10 ** mapas.CASAS
+    chaves, donos = [], []
+    for i, geometria in enumerate(tabela['geometria']):
+        xy = np.round(_coordenadas(geometria) * escala).astype('int64')
+        chave = np.unique((xy[:, 0] << 32) + (xy[:, 1] & 0xFFFFFFFF))
+        chaves.append(chave)
+        donos.append(np.full(len(chave), i))
+    chaves, donos = np.concatenate(chaves), np.concatenate(donos)
+    ordem = np.lexsort((donos, chaves))
+    chaves, donos = chaves[ordem], donos[ordem]
+
+    # vértices compartilhados: posições vizinhas com a mesma chave
+    origem, destino = [], []
+    passo = 1
+    while passo < len(chaves):
+        mesmo = chaves[passo:] == chaves[:-passo]
+        if not mesmo.any():
+            break
+        origem += [donos[:-passo][mesmo], donos[passo:][mesmo]]
+        destino += [donos[passo:][mesmo], donos[:-passo][mesmo]]
+        passo += 1
+    vazio = np.empty(0, dtype='int64')
+    return _csr(len(tabela), np.concatenate(origem or [vazio]), np.concatenate(destino or [vazio]))
+
+
+def knn(tabela, k=K_PADRAO, bloco=512):
+    """Vizinhança dos k municípios com centróide mais próximo (distância em graus corrigida pela latitude)."""
+    centroides = np.array([_coordenadas(geometria).mean(axis=0) for geometria in tabela['geometria']])
+    centroides[:, 0] *= np.cos(np.radians(centroides[:, 1].mean()))
+    n = len(centroides)
+    k = min(k, n - 1)
+    destino = np.empty((n, k), dtype='int64')
+    for inicio in range(0, n, bloco):
+        parte = centroides[inicio:inicio + bloco]
+        distancias = ((parte[:, None, :] - centroides[None, :, :]) ** 2).sum(axis=-1)
+        distancias[np.arange(len(parte)), np.arange(inicio, inicio + len(parte))] = np.inf
+        destino[inicio:inicio + bloco] = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+    return _csr(n, np.repeat(np.arange(n), k), destino.ravel())
+
+
+def caminho_vizinhos(tipo, k=K_PADRAO):
+    return os.path.join(PASTA_VIZINHOS, f'vizinhos_{tipo}.npz' if tipo == 'contiguidade' else f'vizinhos_knn{k}.npz')
+
+
+def carregar_vizinhanca(tipo='contiguidade', k=K_PADRAO, caminho_malha=mapas.CAMINHO_GEOMETRIA):
+    """
+    Vizinhança {'codigos', 'indptr', 'indices'} da malha compilada. Fica
+    gravada em disco com o hash da malha e só é remontada quando ela muda.
+    """
+    if tipo not in TIPOS:
+        raise ValueError(f"vizinhança desconhecida: {tipo} (use {', '.join(TIPOS)})")
+    malha = armazem.hash_arquivo(caminho_malha)
+    caminho = caminho_vizinhos(tipo, k)
+    if os.path.exists(caminho):
+        with np.load(caminho) as gravada:
+            if str(gravada['malha']) == malha:
+                return {nome: gravada[nome] for nome in ('codigos', 'indptr', 'indices')}
+
+    tabela = pq.read_table(caminho_malha, columns=['CD_MUN', 'geometria']).to_pandas()
+    vizinhanca = contiguidade(tabela) if tipo == 'contiguidade' else knn(tabela, k)
+    vizinhanca['codigos'] = tabela['CD_MUN'].to_numpy(dtype='int64')
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    np.savez(caminho, malha=np.array(malha), **vizinhanca)
+    return vizinhanca
+
+
+def pesos(vizinhanca, codigos):
+    """
+    Pesos padronizados por linha restritos a `codigos` (na ordem dada).
+    Retorna {'indptr', 'indices', 'pesos', 'vizinhos'}; municípios fora da
+    malha ou sem vizinhos com valor ficam com linha vazia.
+    """
+    n = len(codigos)
+    posicao = pd.Index(codigos).get_indexer(vizinhanca['codigos'])
+    linhas = np.repeat(np.arange(len(vizinhanca['codigos'])), np.diff(vizinhanca['indptr']))
+    origem, destino = posicao[linhas], posicao[vizinhanca['indices']]
+    manter = (origem >= 0) & (destino >= 0)
+    matriz = _csr(n, origem[manter], destino[manter])
+    vizinhos = np.diff(matriz['indptr'])
+    with np.errstate(divide='ignore'):
+        matriz['pesos'] = np.repeat(1.0 / vizinhos, vizinhos)
+    matriz['vizinhos'] = vizinhos
+    return matriz
+
+
+def _somar_linhas(w, produto):
+    """
+    Soma de `produto` (um valor por vizinho, na ordem de w['indices']) em cada
+    linha de W. Um zero no fim deixa os inícios das linhas sem vizinhos no
+    fim da matriz dentro do array, sem encurtar a soma da linha anterior.
+    """
+    produto = np.concatenate([produto, np.zeros(produto.shape[:-1] + (1,))], axis=-1)
+    soma = np.add.reduceat(produto, w['indptr'][:-1], axis=-1)
+    soma[..., w['vizinhos'] == 0] = 0.0
+    return soma
+
+
+def defasagem(w, valores):
+    """Média ponderada dos vizinhos (W x) de cada município; aceita matriz (permutações x n)."""
+    return _somar_linhas(w, valores[..., w['indices']] * w['pesos'])
+
+
+# --- PERMUTAÇÕES (executadas nos processos do pool) ---
+_CONTEXTO = {}
+
+
+def _iniciar(z, w):
+    _CONTEXTO.update(z=z, w=w)
+
+
+def _p_valor(maiores, permutacoes):
+    """p-valor por simulação, na cauda do valor observado (como o p_sim do PySAL)."""
+    maiores = np.minimum(maiores, permutacoes - maiores)
+    return (maiores + 1) / (permutacoes + 1)
+
+
+def _bloco(tarefa):
+    """(I global das trocas completas, contagem de LISA permutado >= observado) de um bloco."""
+    indice, tamanho, semente = tarefa
+    z, w = _CONTEXTO['z'], _CONTEXTO['w']
+    n = len(z)
+    gerador = np.random.default_rng([semente, indice])
+    soma_quad = z @ z
+
+    # global: cada linha é uma permutação completa dos valores
+    trocados = gerador.permuted(np.broadcast_to(z, (tamanho, n)), axis=1)
+    globais = (trocados * defasagem(w, trocados)).sum(axis=1) / soma_quad
+
+    # LISA condicional: os k_max primeiros de uma permutação de n-1 posições
+    # servem de vizinhos a todos os municípios, pulando o próprio (idx >= i -> idx + 1)
+    k_max = int(w['vizinhos'].max(initial=0))
+    sorteio = np.argsort(gerador.random((tamanho, n - 1)), axis=1)[:, :k_max]
+    linha = np.repeat(np.arange(n), w['vizinhos'])
+    ordem_na_linha = np.arange(len(linha)) - w['indptr'][linha]
+    indices = sorteio[:, ordem_na_linha]
+    indices += indices >= linha
+    locais = z * _somar_linhas(w, z[indices] * w['pesos'])
+    return globais, (locais >= z * defasagem(w, z)).sum(axis=0)
+
+
+def autocorrelacao(valores, w, permutacoes=PERMUTACOES, workers=1, semente=SEMENTE):
+    """
+    I de Moran global e LISA de `valores` com os pesos `w` (ver `pesos`).
+    Retorna (globais, locais): globais é um dict com I, esperado, z_sim e
+    p_sim; locais é um DataFrame com I_local, defasagem, p_sim e cluster.
+    """
+    valores = np.asarray(valores, dtype='float64')
+    n = len(valores)
+    z = valores - valores.mean()
+    m2 = z @ z / n
+    lag = defasagem(w, z)
+    s0 = (w['vizinhos'] > 0).sum()
+    I = n / s0 * (z @ lag) / (z @ z)
+    local = z * lag / m2
+
+    tarefas = [(b, min(BLOCO, permutacoes - inicio), semente) for b, inicio in enumerate(range(0, permutacoes, BLOCO))]
+    if workers == 1:
+        _iniciar(z, w)
+        resultados = list(map(_bloco, tarefas))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar, initargs=(z, w)) as pool:
+            resultados = list(pool.map(_bloco, tarefas))
+    globais_permutados = n / s0 * np.concatenate([g for g, _ in resultados])
+    maiores_locais = sum(c for _, c in resultados)
+
+    p_local = _p_valor(maiores_locais, permutacoes)
+    quadrante = np.where(z > 0, np.where(lag > 0, 1, 4), np.where(lag > 0, 2, 3))
+    cluster = np.where(p_local <= ALFA, pd.Series(quadrante).map(CLUSTERS).to_numpy(), NAO_SIGNIFICATIVO)
+    cluster = np.where(w['vizinhos'] == 0, SEM_VIZINHOS, cluster)
+
+    globais = {
+        'I': I,
+        'esperado': -1 / (n - 1),
+        'z_sim': (I - globais_permutados.mean()) / globais_permutados.std(),
+        'p_sim': _p_valor((globais_permutados >= I).sum(), permutacoes),
+        'n': n,
+        'permutacoes': permutacoes,
+    }
+    locais = pd.DataFrame({
+        'I_local': local, 'defasagem': lag, 'p_sim': np.where(w['vizinhos'] == 0, np.nan, p_local),
+        'cluster': cluster,
+    })
+    return globais, locais
+
+
+def moran(painel, metrica, ano, vizinhanca, permutacoes=PERMUTACOES, workers=1):
+    """
+    Moran global e LISA da métrica no ano, sobre os municípios do painel
+    com valor e presentes na malha. `locais` traz MUNICIPIO, UF, CD_MUN e o valor.
+    """
+    df = registro.fatia_ano(painel, ano)
+    df = df.loc[df[metrica].notna() & df['CD_MUN'].isin(vizinhanca['codigos']),
+                ['MUNICIPIO', 'UF', 'CD_MUN', metrica]].reset_index(drop=True)
+    w = pesos(vizinhanca, df['CD_MUN'].to_numpy())
+    globais, locais = autocorrelacao(df[metrica].to_numpy(), w, permutacoes, workers)
+    return globais, pd.concat([df, locais], axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="I de Moran global e LISA de uma métrica.")
+    parser.add_argument('--metrica', default='Taxa_Internet')
+    parser.add_argument('--ano', type=int, required=True)
+    parser.add_argument('--uf', default=municipios.UF_PADRAO, help=f"Sigla da UF ou {municipios.BRASIL} para todas")
+    parser.add_argument('--vizinhanca', choices=TIPOS, default='contiguidade')
+    parser.add_argument('--k', type=int, default=K_PADRAO, help="vizinhos por município em --vizinhanca knn")
+    parser.add_argument('--permutacoes', type=int, default=PERMUTACOES)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    if not mapas.existe():
+        raise SystemExit("Malha municipal não compilada (python mapas.py <malha.geojson>).")
+    painel = registro.carregar_painel(ufs=municipios.ufs_do_escopo(args.uf))
+    vizinhanca = carregar_vizinhanca(args.vizinhanca, args.k)
+    globais, locais = moran(painel, args.metrica, args.ano, vizinhanca, args.permutacoes, args.workers)
+
+    print(f"I de Moran = {globais['I']:.4f} (esperado {globais['esperado']:.4f}), "
+          f"z = {globais['z_sim']:.2f}, p = {globais['p_sim']:.4f}, n = {globais['n']}")
+    print(locais['cluster'].value_counts().to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,42 @@
-from matplotlib import pyplot as plt
+import numpy as np
 import pandas as pd
-import seaborn as sns
 import streamlit as st
-import plotly.express as px
+import instrumentacao
+import municipios
+import registro
 
 
 # Carregador de Dados
-@st.cache_data
-def load_data():
-    df19 = pd.read_csv('indicadores19.csv')
-    df24 = pd.read_csv('indicadores24.csv')
-    
+@instrumentacao.cacheada(st.cache_data)
+def load_data(colunas=None):
+    # pelo painel do registro: nomes canônicos e o código CD_MUN usado no pareamento
+    painel = registro.carregar_painel(colunas, anos=[2019, 2024])
+    return registro.fatia_ano(painel, 2019), registro.fatia_ano(painel, 2024)
 
-    df19 = df19.rename(columns={
-        'NO_MUNICIPIO_RESIDENCIA': 'MUNICIPIO', 
-        'Computador': 'Total_Computador', 
-        'Internet': 'Total_Internet'
-    })
-    df24 = df24.rename(columns={
-        'NO_MUNICIPIO_PROVA': 'MUNICIPIO', 
-        'Computador': 'Total_Computador', 
-        'Internet': 'Total_Internet'
-    })
-    
-    return df19, df24
-
-def grafico_comparativo(df_indicadores_mun, df_indicadores_mun24, notas = False):
-  df_final = pd.merge(
-    df_indicadores_mun[['MUNICIPIO', 'Taxa_Inclusao_Digital', 'Taxa_Computador', 'Taxa_Internet', 'Nota_Media_Geral', 'Nota_Redacao','Nota_CH', 'Nota_Mat', 'Nota_CN', 'Nota_LC', 'Total_Alunos']],
-    df_indicadores_mun24[['MUNICIPIO', 'Taxa_Inclusao_Digital', 'Taxa_Computador', 'Taxa_Internet', 'Nota_Media_Geral', 'Nota_Redacao','Nota_CH', 'Nota_Mat', 'Nota_CN', 'Nota_LC','Total_Alunos']],
-    on='MUNICIPIO',
-    suffixes=('_2019', '_2024'))
+def _media_ponderada(valores, pesos):
+    """Média ponderada sem os municípios com valor ou peso ausente (como em agregados.py)."""
+    valores = np.asarray(valores, dtype='float64')
+    pesos = np.asarray(pesos, dtype='float64')
+    presente = ~np.isnan(valores) & ~np.isnan(pesos)
+    w = np.where(presente, pesos, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (w * np.where(presente, valores, 0.0)).sum() / w.sum()
+
+
+@instrumentacao.cacheada(st.cache_data)
+def resumo_comparativo(df_indicadores_mun, df_indicadores_mun24, notas = False, ponderar = False):
+  """
+  Tabela resumo 2019 x 2024 (médias municipais; Total de Alunos somado).
+  Com ponderar=True as médias usam o Total de Alunos de cada ano como peso.
+  Em cache por par de bases, então é calculada uma vez por par de anos.
+  """
+  colunas = ['Taxa_Inclusao_Digital', 'Taxa_Computador', 'Taxa_Internet', 'Nota_Media_Geral', 'Nota_Redacao','Nota_CH', 'Nota_Mat', 'Nota_CN', 'Nota_LC', 'Total_Alunos']
+  # pareamento pelo código IBGE (CD_MUN) em vez de junção por nome
+  pos_19, pos_24 = municipios.parear(df_indicadores_mun['CD_MUN'], df_indicadores_mun24['CD_MUN'])
+  df_final = pd.concat([
+    df_indicadores_mun[colunas].iloc[pos_19].add_suffix('_2019').reset_index(drop=True),
+    df_indicadores_mun24[colunas].iloc[pos_24].add_suffix('_2024').reset_index(drop=True),
+  ], axis=1)
   
   # condicionar flag notas
   if notas:
@@ -55,8 +61,12 @@ def grafico_comparativo(df_indicadores_mun, df_indicadores_mun24, notas = False)
   dados_resumo = []
   # criar tabela de resumo
   for metrica_db, metrica_nome in metricas.items():
-      valor_19 = df_final[f'{metrica_db}_2019'].mean()
-      valor_24 = df_final[f'{metrica_db}_2024'].mean()
+      if ponderar:
+          valor_19 = _media_ponderada(df_final[f'{metrica_db}_2019'], df_final['Total_Alunos_2019'])
+          valor_24 = _media_ponderada(df_final[f'{metrica_db}_2024'], df_final['Total_Alunos_2024'])
+      else:
+          valor_19 = df_final[f'{metrica_db}_2019'].mean()
+          valor_24 = df_final[f'{metrica_db}_2024'].mean()
       
       if metrica_db == 'Total_Alunos':
           valor_19 = df_final[f'{metrica_db}_2019'].sum()
@@ -74,34 +84,95 @@ def grafico_comparativo(df_indicadores_mun, df_indicadores_mun24, notas = False)
           'Variação (%)': var_pct
       })
 
-  df_resumo_executivo = pd.DataFrame(dados_resumo)
+  return pd.DataFrame(dados_resumo)
 
-  # gerar gráfico
-  st.write("### Tabela Resumo")
-  st.dataframe(df_resumo_executivo.sort_values(by=['Variação (%)'], ascending=False)) 
 
-  df_plot = df_resumo_executivo[df_resumo_executivo['Indicador'] != 'Total de Alunos (Soma Estado)'].melt(
+def _dados_grafico(df_resumo_executivo):
+  return df_resumo_executivo[df_resumo_executivo['Indicador'] != 'Total de Alunos (Soma Estado)'].melt(
       id_vars='Indicador', 
       value_vars=['2019', '2024'], 
       var_name='Ano', 
       value_name='Valor'
   )
 
+
+@instrumentacao.cacheada(st.cache_data)
+def spec_comparativo(df_resumo_executivo):
+    """
+    Spec Plotly (dict) do gráfico de barras 2019 x 2024, renderizado no navegador.
+    Serve tanto para as taxas (notas=False) quanto para as notas (notas=True).
+    """
+    import plotly.express as px
+
+    fig = px.bar(
+        _dados_grafico(df_resumo_executivo),
+        x='Indicador',
+        y='Valor',
+        color='Ano',
+        barmode='group',
+        text_auto='.2f',
+        color_discrete_sequence=['gray', 'blue'],
+        title='Comparativo de Indicadores: 2019 vs 2024'
+    )
+    fig.update_layout(
+        yaxis_title='Taxa Média / Nota',
+        legend_title_text='Ano',
+        height=600,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    fig.update_xaxes(tickangle=-15)
+    fig.update_traces(textposition='outside')
+    return fig.to_dict()
+
+
+@instrumentacao.medido
+def grafico_comparativo(df_indicadores_mun, df_indicadores_mun24, notas = False, vetorial = True, ponderar = False):
+  df_resumo_executivo = resumo_comparativo(df_indicadores_mun, df_indicadores_mun24, notas, ponderar)
+
+  # gerar gráfico
+  st.write("### Tabela Resumo")
+  st.dataframe(df_resumo_executivo.sort_values(by=['Variação (%)'], ascending=False)) 
+
+  # municípios sem par em um dos anos ficam fora das médias; avisa quais
+  fora = municipios.sem_par({'2019': df_indicadores_mun, '2024': df_indicadores_mun24})
+  for ano, nomes in fora.items():
+    if nomes:
+      st.caption(f"{len(nomes)} município(s) de {ano} sem dados no outro ano, fora da comparação: {', '.join(nomes)}")
+
+  # gráfico vetorial desenhado no navegador (padrão)
+  if vetorial:
+    st.plotly_chart(spec_comparativo(df_resumo_executivo), use_container_width=True)
+    return
+
+  # versão rasterizada (matplotlib/seaborn), mantida para exportação estática
+  from matplotlib import pyplot as plt
+
+  fig = figura_comparativo_estatica(df_resumo_executivo)
+  st.pyplot(fig)
+  plt.close(fig)
+
+
+def figura_comparativo_estatica(df_resumo_executivo):
+  """Versão matplotlib/seaborn do gráfico 2019 x 2024 (dashboard com vetorial=False e relatório em PDF)."""
+  from matplotlib import pyplot as plt
+  import seaborn as sns
+
+  df_plot = _dados_grafico(df_resumo_executivo)
+
   fig, ax = plt.subplots(figsize=(14, 9))
   
   grafico = sns.barplot(data=df_plot, x='Indicador', y='Valor', hue='Ano', palette=['gray', 'blue'], ax=ax)
 
   ax.set_title('Comparativo de Indicadores: 2019 vs 2024', fontsize=14)
   ax.set_ylabel('Taxa Média / Nota')
-  plt.xticks(rotation=15) 
+  ax.tick_params(axis='x', labelrotation=15)
   ax.legend(title='Ano')
 
   for container in grafico.containers:
       grafico.bar_label(container, fmt='%.2f', padding=3)
 
-  plt.tight_layout()
-  
-  st.pyplot(fig)
+  fig.tight_layout()
+  return fig
 
 
 
@@ -110,6 +181,8 @@ def gerar_histograma(df, coluna, cor, titulo, x_label, is_nota=False):
     """
     Gera um objeto de figura Plotly (histograma) padronizado.
     """
+    import plotly.express as px
+
     fig = px.histogram(
         df, 
         x=coluna, 
@@ -128,4 +201,63 @@ def gerar_histograma(df, coluna, cor, titulo, x_label, is_nota=False):
     if not is_nota:
         fig.update_xaxes(range=[0, 1])
         
-    return fig
\ No newline at end of file
+    return fig
+
+
+def gerar_dispersao(df, x, y, titulo, labels, cores):
+    """Dispersão Plotly entre duas colunas (linhas com NaN são ignoradas)."""
+    import plotly.express as px
+
+    dados = df[[x, y]].dropna()
+    return px.scatter(dados, x=x, y=y, title=titulo, labels=labels, color_discrete_sequence=cores)
+
+
+def gerar_boxplot(grupos, rotulos, titulo, y_label):
+    """Boxplot matplotlib de uma série por grupo (ex.: a mesma métrica em cada ano)."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ax.boxplot(list(grupos), positions=list(range(1, len(rotulos) + 1)), tick_labels=list(rotulos))
+    ax.set_title(titulo)
+    ax.set_ylabel(y_label)
+    ax.grid(True, axis='y', linestyle='--', alpha=0.7)
+    return fig
+
+
+def gerar_boxplot_quantis(resumo, titulo, y_label, x='GRUPO', serie=None, cores=('#2e86de',), ordem=None, titulo_serie=None):
+    """
+    Boxplot Plotly a partir de quantis já calculados (sem os valores brutos):
+    `resumo` tem uma linha por caixa com a coluna `x`, q1, mediana, q3, min,
+    max e media. Os bigodes vão de lim_inf a lim_sup quando o resumo os traz,
+    senão do mínimo ao máximo. Com `serie`, uma cor por valor dessa coluna,
+    com as caixas lado a lado; `ordem` fixa a ordem das categorias em x.
+    """
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    series = [(None, resumo)] if serie is None else resumo.groupby(serie, sort=False)
+    for i, (nome, dados) in enumerate(series):
+        fig.add_trace(go.Box(
+            x=dados[x], q1=dados['q1'], median=dados['mediana'], q3=dados['q3'],
+            lowerfence=dados.get('lim_inf', dados['min']), upperfence=dados.get('lim_sup', dados['max']),
+            mean=dados['media'], name=str(nome), marker_color=cores[i % len(cores)], showlegend=serie is not None,
+        ))
+    fig.update_layout(title=titulo, yaxis_title=y_label, boxmode='group', legend_title_text=titulo_serie,
+                      margin=dict(l=20, r=20, t=40, b=20))
+    if ordem is not None:
+        fig.update_xaxes(categoryorder='array', categoryarray=list(ordem))
+    return fig
+
+
+def gerar_barras_estados(medias, coluna, rotulo):
+    """
+    Barras agrupadas por UF e ano. `medias` é a tabela UF x ano com o
+    agregado de cada estado (ver cubo.estados).
+    """
+    import plotly.express as px
+
+    dados = medias.rename_axis('UF').reset_index().melt(id_vars='UF', var_name='Ano', value_name=coluna)
+    dados['Ano'] = dados['Ano'].astype(str)
+    fig = px.bar(dados, x='UF', y=coluna, color='Ano', barmode='group', labels={coluna: rotulo})
+    fig.update_xaxes(categoryorder='total descending')
+    return fig
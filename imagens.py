@@ -0,0 +1,217 @@
+"""
+Variantes comprimidas e responsivas das imagens de imgs/.
+
+As capturas de tela e gráficos estáticos do dashboard (boxplots, IDEB, mapas)
+eram enviados no tamanho original a cada visita. Este passo de build gera,
+para cada imagem, versões WebP em algumas larguras e um fallback no formato
+original, com o hash do conteúdo no nome do arquivo, em static/imgs/ (servido
+pelo Streamlit em app/static/ com server.enableStaticServing). Como o nome
+muda sempre que o conteúdo muda, os arquivos podem ser cacheados para sempre:
+as URLs levam ?v=<hash>, e com ele o servidor responde com
+Cache-Control: max-age de 10 anos.
+
+O manifesto (static/imgs/manifesto.json) liga cada imagem original às suas
+variantes; o dashboard monta um <picture> com srcset a partir dele e, sem
+manifesto ou sem o serviço estático ligado, volta ao st.image do original.
+Imagens cujo conteúdo não mudou desde o último build não são recodificadas.
+
+AVIF (--avif) é opcional: o servidor estático do Streamlit entrega .avif
+como text/plain, então essas variantes só servem atrás de outro servidor/CDN
+e o dashboard não as referencia.
+
+Uso:
+    python imagens.py             # imgs/ -> static/imgs/
+    python imagens.py --avif
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import unicodedata
+
+
+PASTA_ORIGEM = 'imgs'
+PASTA_SAIDA = os.path.join('static', 'imgs')
+CAMINHO_MANIFESTO = os.path.join(PASTA_SAIDA, 'manifesto.json')
+URL_BASE = 'app/static/imgs'
+
+LARGURAS = (480, 960, 1440)
+EXTENSOES = ('.png', '.jpg', '.jpeg')
+QUALIDADE = {'webp': 80, 'avif': 55, 'jpeg': 85}
+MIME = {'webp': 'image/webp', 'avif': 'image/avif', 'png': 'image/png', 'jpeg': 'image/jpeg'}
+# formatos que o servidor estático do Streamlit entrega com o Content-Type certo
+FORMATOS_SERVIDOS = ('webp', 'png', 'jpeg')
+
+
+def _hash(conteudo, digest_size=5):
+    return hashlib.blake2b(conteudo, digest_size=digest_size).hexdigest()
+
+
+def _slug(nome):
+    """'Captura de tela 2025-12-02 150525' -> 'captura-de-tela-2025-12-02-150525'."""
+    sem_acento = unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode()
+    return '-'.join(''.join(c if c.isalnum() or c == '-' else ' ' for c in sem_acento.lower()).split())
+
+
+def _larguras(largura_original, larguras=LARGURAS):
+    """Larguras menores que a original, mais a própria original (nunca amplia)."""
+    return sorted({l for l in larguras if l < largura_original} | {largura_original})
+
+
+def _codificar(imagem, formato):
+    buffer = io.BytesIO()
+    if formato == 'jpeg' and imagem.mode != 'RGB':
+        imagem = imagem.convert('RGB')
+    if formato == 'png':
+        imagem.save(buffer, 'PNG', optimize=True)
+    elif formato == 'webp':
+        imagem.save(buffer, 'WEBP', quality=QUALIDADE['webp'], method=6)
+    elif formato == 'avif':
+        imagem.save(buffer, 'AVIF', quality=QUALIDADE['avif'])
+    else:
+        imagem.save(buffer, 'JPEG', quality=QUALIDADE['jpeg'], optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _gravar(conteudo, base, largura, formato, pasta):
+    extensao = 'jpg' if formato == 'jpeg' else formato
+    arquivo = f'{base}-{largura}w.{_hash(conteudo)}.{extensao}'
+    caminho = os.path.join(pasta, arquivo)
+    if not os.path.exists(caminho):
+        with open(caminho, 'wb') as saida:
+            saida.write(conteudo)
+    return {'arquivo': arquivo, 'formato': formato, 'largura': largura, 'bytes': len(conteudo)}
+
+
+def construir_variantes(caminho, pasta=PASTA_SAIDA, formatos=('webp',)):
+    """Entrada do manifesto para uma imagem: dimensões, hash da origem e variantes."""
+    from PIL import Image
+
+    with open(caminho, 'rb') as arquivo:
+        original = arquivo.read()
+    imagem = Image.open(io.BytesIO(original))
+    imagem.load()
+    largura, altura = imagem.size
+    base = _slug(os.path.splitext(os.path.basename(caminho))[0])
+    # fallback para navegadores sem WebP: o próprio arquivo original
+    formato_original = 'png' if imagem.format == 'PNG' else 'jpeg'
+
+    variantes = []
+    for l in _larguras(largura):
+        reduzida = imagem if l == largura else imagem.resize((l, round(altura * l / largura)), Image.LANCZOS)
+        for formato in formatos:
+            variantes.append(_gravar(_codificar(reduzida, formato), base, l, formato, pasta))
+
+    return {
+        'origem': _hash(original, 16),
+        'bytes': len(original),
+        'largura': largura,
+        'altura': altura,
+        'variantes': variantes,
+        'fallback': _gravar(original, base, largura, formato_original, pasta),
+    }
+
+
+def construir(origem=PASTA_ORIGEM, pasta=PASTA_SAIDA, formatos=('webp',)):
+    """
+    Gera as variantes de todas as imagens de `origem` e grava o manifesto.
+    Entradas cujo hash de origem e formatos não mudaram são reaproveitadas;
+    arquivos de variantes que deixaram de ser referenciados são apagados.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    anterior = carregar_manifesto(os.path.join(pasta, 'manifesto.json')) or {}
+    manifesto = {}
+    for nome in sorted(os.listdir(origem)):
+        if not nome.lower().endswith(EXTENSOES):
+            continue
+        caminho = f'{origem}/{nome}'
+        with open(caminho, 'rb') as arquivo:
+            origem_hash = _hash(arquivo.read(), 16)
+        entrada = anterior.get(caminho)
+        atual = (
+            entrada is not None and entrada['origem'] == origem_hash
+            and {v['formato'] for v in entrada['variantes']} == set(formatos)
+            and all(os.path.exists(os.path.join(pasta, v['arquivo']))
+                    for v in entrada['variantes'] + [entrada['fallback']])
+        )
+        manifesto[caminho] = entrada if atual else construir_variantes(caminho, pasta, formatos)
+        print(f"{'=' if atual else '+'} {caminho}")
+
+    referenciados = {'manifesto.json'} | {
+        v['arquivo'] for e in manifesto.values() for v in e['variantes'] + [e['fallback']]
+    }
+    for arquivo in os.listdir(pasta):
+        if arquivo not in referenciados:
+            os.remove(os.path.join(pasta, arquivo))
+
+    with open(os.path.join(pasta, 'manifesto.json'), 'w', encoding='utf-8') as saida:
+        json.dump(manifesto, saida, indent=1, ensure_ascii=False)
+    return manifesto
+
+
+def versao_manifesto(caminho=CAMINHO_MANIFESTO):
+    """Data de modificação do manifesto (chave de cache), ou None se não existir."""
+    return os.path.getmtime(caminho) if os.path.exists(caminho) else None
+
+
+def carregar_manifesto(caminho=CAMINHO_MANIFESTO):
+    """Manifesto gravado por `construir`, ou None se o build não foi feito."""
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+# --- HTML ---
+def _url(variante):
+    hash_ = variante['arquivo'].rsplit('.', 2)[1]
+    return f"{URL_BASE}/{variante['arquivo']}?v={hash_}"
+
+
+def html_picture(caminho, manifesto, sizes='100vw', largura_total=False, alt=''):
+    """
+    <picture> com srcset por formato para a imagem `caminho` (como em imgs/),
+    ou None se ela não estiver no manifesto. `largura_total` estica a imagem
+    à largura do contêiner (como use_container_width do st.image); senão ela
+    fica no tamanho natural, limitada ao contêiner.
+    """
+    entrada = (manifesto or {}).get(caminho)
+    if entrada is None:
+        return None
+
+    fontes = []
+    for formato in ('avif', 'webp'):
+        variantes = [v for v in entrada['variantes'] if v['formato'] == formato]
+        if variantes and formato in FORMATOS_SERVIDOS:
+            srcset = ', '.join(f"{_url(v)} {v['largura']}w" for v in variantes)
+            fontes.append(f'<source type="{MIME[formato]}" srcset="{srcset}" sizes="{sizes}">')
+
+    estilo = 'width:100%;height:auto' if largura_total else 'max-width:100%;height:auto'
+    return (
+        '<picture>' + ''.join(fontes)
+        + f'<img src="{_url(entrada["fallback"])}" width="{entrada["largura"]}" height="{entrada["altura"]}"'
+        + f' alt="{alt}" loading="lazy" decoding="async" style="{estilo}"></picture>'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera variantes WebP/AVIF das imagens de imgs/.")
+    parser.add_argument('--origem', default=PASTA_ORIGEM)
+    parser.add_argument('--saida', default=PASTA_SAIDA)
+    parser.add_argument('--avif', action='store_true', help="também gera AVIF (para servir fora do Streamlit)")
+    args = parser.parse_args()
+
+    formatos = ('webp', 'avif') if args.avif else ('webp',)
+    manifesto = construir(args.origem, args.saida, formatos)
+    original = sum(e['bytes'] for e in manifesto.values())
+    # o que um navegador com WebP baixa: a maior variante WebP de cada imagem
+    maiores = sum(
+        max(v['bytes'] for v in e['variantes'] if v['formato'] == 'webp') for e in manifesto.values()
+    )
+    print(f"{len(manifesto)} imagens: {original / 1024:.0f} KiB originais -> "
+          f"{maiores / 1024:.0f} KiB em WebP na maior largura")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,394 @@
+"""
+Ingestão dos MICRODADOS_ENEM do INEP em blocos (chunks).
+
+Lê o arquivo bruto de um ano em pedaços de tamanho fixo, filtra a UF (o
+Ceará por padrão; 'BR' mantém todas) e acumula somas e contagens por município. Só o acumulador (um registro por
+município) fica em memória, então o pico de memória não depende do tamanho
+do arquivo. No final gera a tabela no mesmo formato dos indicadoresXX.csv,
+menos as colunas IDEB e z_score: o IDEB não vem no microdado do ENEM (nos
+CSVs do notebook foi cruzado à parte) e o z-score é só do notebook; o
+dashboard e a API funcionam sem elas e omitem a seção do IDEB.
+Junto com as somas, cada chunk gera um esboço de quantis da nota dos alunos
+por grupo (ver `quantis.py`), combinado entre chunks da mesma forma.
+
+O arquivo também pode ser dividido em fatias de bytes (alinhadas em quebra de
+linha) processadas de forma independente; ver `construir.py`.
+
+Uso:
+    python ingestao.py MICRODADOS_ENEM_2019.csv --ano 2019 --saida indicadores19.csv
+    python ingestao.py MICRODADOS_ENEM_2019.csv --ano 2019 --uf BR   # todas as UFs
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import quantis
+
+
+UF_PADRAO = 'CE'
+BRASIL = 'BR'       # --uf BR: sem filtro, todas as UFs
+TAMANHO_CHUNK = 200_000
+# Chave (UF, MUNICIPIO, CD_MUN) dos alunos sem UF, município ou código: o
+# groupby os descartaria calado; finalizar_ano os tira e informa quantos são
+SEM_MUNICIPIO = ('', '', 0)
+
+# Colunas de nota do microdado -> nome usado nos indicadores
+NOTAS = {
+    'NU_NOTA_REDACAO': 'Nota_Redacao',
+    'NU_NOTA_CH': 'Nota_CH',
+    'NU_NOTA_MT': 'Nota_Mat',
+    'NU_NOTA_LC': 'Nota_LC',
+    'NU_NOTA_CN': 'Nota_CN',
+}
+
+# Layout do microdado por ano. O INEP muda nomes de colunas entre edições
+# (a partir de 2023 o município de residência não vem mais no arquivo).
+# Anos não listados usam o layout mais recente.
+LAYOUTS = {
+    2019: {
+        'municipio': 'NO_MUNICIPIO_RESIDENCIA',
+        'codigo': 'CO_MUNICIPIO_RESIDENCIA',   # código IBGE do município
+        'uf': 'SG_UF_RESIDENCIA',
+        'computador': 'Q024',   # A = não possui
+        'internet': 'Q025',     # A = não, B = sim
+        'dependencia': 'TP_DEPENDENCIA_ADM_ESC',
+        'ocupacao_pai': 'Q003',
+    },
+    2023: {
+        'municipio': 'NO_MUNICIPIO_PROVA',
+        'codigo': 'CO_MUNICIPIO_PROVA',
+        'uf': 'SG_UF_PROVA',
+        'computador': 'Q024',
+        'internet': 'Q025',
+        'dependencia': 'TP_DEPENDENCIA_ADM_ESC',
+        'ocupacao_pai': 'Q003',
+    },
+    2024: {
+        'municipio': 'NO_MUNICIPIO_PROVA',
+        'codigo': 'CO_MUNICIPIO_PROVA',
+        'uf': 'SG_UF_PROVA',
+        'computador': 'Q024',
+        'internet': 'Q025',
+        'dependencia': None,    # não divulgado no arquivo de resultados de 2024
+        'ocupacao_pai': 'Q003',
+    },
+}
+
+# TP_DEPENDENCIA_ADM_ESC: 1 Federal, 2 Estadual, 3 Municipal, 4 Privada
+ALTA_ESTRUTURA = (1, 4)
+BAIXA_ESTRUTURA = (2, 3)
+
+# Q003 (ocupação do pai; Q004, da mãe): grupos do questionário socioeconômico
+OCUPACOES = {
+    'A': 'Rural', 'B': 'Serviços Gerais', 'C': 'Indústria',
+    'D': 'Técnico/Autônomo', 'E': 'Especializado', 'F': 'Sem info',
+}
+
+# Colunas de soma do acumulador parcial
+SOMAS = (
+    ['Total_Alunos', 'Total_Inclusao_Digital', 'Internet', 'Computador',
+     'Baixa_Estrutura', 'Alta_Estrutura']
+    + [f'Soma_{nome}' for nome in NOTAS.values()]
+    + [f'Qtd_{nome}' for nome in NOTAS.values()]
+)
+
+
+def layout_do_ano(ano):
+    """Retorna o layout de colunas do microdado para o ano informado."""
+    if ano in LAYOUTS:
+        return LAYOUTS[ano]
+    return LAYOUTS[max(LAYOUTS)]
+
+
+def colunas_necessarias(layout):
+    """Lista das colunas do microdado lidas pela ingestão (usecols)."""
+    colunas = [layout['municipio'], layout['codigo'], layout['uf'], layout['computador'], layout['internet']]
+    if layout['dependencia']:
+        colunas.append(layout['dependencia'])
+    return colunas + list(NOTAS)
+
+
+class _FatiaArquivo:
+    """
+    Visão em texto de um arquivo binário limitada ao intervalo [inicio, fim).
+    O microdado é latin-1 (1 byte por caractere), então decodificar qualquer
+    pedaço de bytes é seguro.
+    """
+
+    def __init__(self, arquivo, inicio, fim):
+        self._arquivo = arquivo
+        self._arquivo.seek(inicio)
+        self._restante = fim - inicio
+
+    def read(self, n=-1):
+        if self._restante <= 0:
+            return ''
+        if n is None or n < 0 or n > self._restante:
+            n = self._restante
+        dados = self._arquivo.read(n)
+        self._restante -= len(dados)
+        return dados.decode('latin-1')
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        linha = self.readline()
+        if not linha:
+            raise StopIteration
+        return linha
+
+    def readline(self, n=-1):
+        if self._restante <= 0:
+            return ''
+        linha = self._arquivo.readline(self._restante)
+        self._restante -= len(linha)
+        return linha.decode('latin-1')
+
+
+def ler_cabecalho(caminho):
+    """Retorna (nomes das colunas, byte onde começam os dados)."""
+    with open(caminho, 'rb') as arquivo:
+        linha = arquivo.readline()
+    nomes = linha.decode('latin-1').strip().strip('\ufeff').split(';')
+    return [nome.strip('"') for nome in nomes], len(linha)
+
+
+def dividir_arquivo(caminho, n_fatias=None, tamanho_fatia=None):
+    """
+    Divide o microdado em até `n_fatias` intervalos de bytes, cada um começando
+    no início de uma linha. O cabeçalho fica fora de todas as fatias.
+    Com `tamanho_fatia` (bytes), os cortes ficam em posições fixas do arquivo:
+    a divisão não depende de quantos processos vão ler as fatias.
+    """
+    _, inicio_dados = ler_cabecalho(caminho)
+    tamanho = os.path.getsize(caminho)
+    if tamanho_fatia:
+        passo = max(tamanho_fatia, 1)
+        n_fatias = -(-(tamanho - inicio_dados) // passo)
+    else:
+        passo = max((tamanho - inicio_dados) // max(n_fatias, 1), 1)
+
+    cortes = [inicio_dados]
+    with open(caminho, 'rb') as arquivo:
+        for i in range(1, n_fatias):
+            posicao = inicio_dados + i * passo
+            if posicao <= cortes[-1] or posicao >= tamanho:
+                continue
+            arquivo.seek(posicao - 1)
+            arquivo.readline()   # avança até o fim da linha em curso
+            posicao = arquivo.tell()
+            if cortes[-1] < posicao < tamanho:
+                cortes.append(posicao)
+    cortes.append(tamanho)
+    return list(zip(cortes[:-1], cortes[1:]))
+
+
+def ler_em_chunks(caminho, layout, tamanho_chunk=TAMANHO_CHUNK, inicio=None, fim=None):
+    """
+    Iterador de DataFrames lendo só as colunas necessárias do microdado,
+    restrito ao intervalo de bytes [inicio, fim) quando informado.
+    """
+    nomes, inicio_dados = ler_cabecalho(caminho)
+    inicio = inicio_dados if inicio is None else inicio
+    fim = os.path.getsize(caminho) if fim is None else fim
+
+    tipos = {layout['municipio']: 'string', layout['uf']: 'string',
+             layout['computador']: 'string', layout['internet']: 'string'}
+    tipos.update({col: 'float64' for col in NOTAS})
+    colunas = colunas_necessarias(layout)
+    # o questionário só entra nos esboços de quantis; arquivos sem ele continuam válidos
+    if layout['ocupacao_pai'] in nomes:
+        colunas.append(layout['ocupacao_pai'])
+        tipos[layout['ocupacao_pai']] = 'string'
+
+    with open(caminho, 'rb') as arquivo:
+        yield from pd.read_csv(
+            _FatiaArquivo(arquivo, inicio, fim),
+            sep=';',
+            header=None,
+            names=nomes,
+            usecols=colunas,
+            dtype=tipos,
+            chunksize=tamanho_chunk,
+        )
+
+
+def agregar_chunk(chunk, layout, uf=UF_PADRAO):
+    """
+    Calcula somas e contagens por município para um pedaço do microdado.
+    O resultado é aditivo: dois parciais combinam com `combinar_parciais`.
+
+    As notas são somadas em décimos de ponto como inteiros, então a soma não
+    depende da ordem nem de como o arquivo foi dividido (saída reprodutível).
+    """
+    if uf != BRASIL:
+        chunk = chunk[chunk[layout['uf']] == uf]
+
+    # resposta em branco conta como sem acesso (sem fillna o NA não vira int64)
+    computador = chunk[layout['computador']].ne('A').fillna(False)
+    internet = chunk[layout['internet']].eq('B').fillna(False)
+
+    chaves = chunk[[layout['uf'], layout['municipio'], layout['codigo']]]
+    sem_municipio = chaves.isna().any(axis=1)
+    parcial = pd.DataFrame({
+        'UF': chaves.iloc[:, 0].mask(sem_municipio, SEM_MUNICIPIO[0]),
+        'MUNICIPIO': chaves.iloc[:, 1].mask(sem_municipio, SEM_MUNICIPIO[1]),
+        'CD_MUN': chaves.iloc[:, 2].mask(sem_municipio, SEM_MUNICIPIO[2]).astype('int64'),
+        'Total_Alunos': 1,
+        'Total_Inclusao_Digital': (computador & internet).astype('int64'),
+        'Internet': internet.astype('int64'),
+        'Computador': computador.astype('int64'),
+    })
+
+    if layout['dependencia']:
+        dependencia = chunk[layout['dependencia']]
+        parcial['Baixa_Estrutura'] = dependencia.isin(BAIXA_ESTRUTURA).astype('int64')
+        parcial['Alta_Estrutura'] = dependencia.isin(ALTA_ESTRUTURA).astype('int64')
+    else:
+        parcial['Baixa_Estrutura'] = 0
+        parcial['Alta_Estrutura'] = 0
+
+    for col, nome in NOTAS.items():
+        nota = chunk[col]
+        parcial[f'Soma_{nome}'] = (nota.fillna(0) * 10).round().astype('int64')
+        parcial[f'Qtd_{nome}'] = nota.notna().astype('int64')
+
+    return parcial.groupby(['UF', 'MUNICIPIO', 'CD_MUN'], sort=True)[SOMAS].sum()
+
+
+def esbocar_chunk(chunk, layout, uf=UF_PADRAO):
+    """
+    Esboço de quantis da nota média (as cinco provas; nula se faltar alguma)
+    dos alunos do chunk, por UF, estrutura da escola, ocupação do pai e acesso.
+    """
+    if uf != BRASIL:
+        chunk = chunk[chunk[layout['uf']] == uf]
+
+    if layout['dependencia']:
+        dependencia = chunk[layout['dependencia']]
+        estrutura = np.select(
+            [dependencia.isin(BAIXA_ESTRUTURA), dependencia.isin(ALTA_ESTRUTURA)],
+            quantis.ESTRUTURAS, quantis.SEM_ESTRUTURA,
+        )
+    else:
+        estrutura = quantis.SEM_ESTRUTURA
+    if layout['ocupacao_pai'] in chunk.columns:
+        ocupacao = chunk[layout['ocupacao_pai']].fillna(quantis.SEM_OCUPACAO).astype(str)
+    else:
+        ocupacao = quantis.SEM_OCUPACAO
+
+    grupos = pd.DataFrame({
+        'UF': chunk[layout['uf']].astype(str),
+        'ESTRUTURA': estrutura,
+        'OCUPACAO_PAI': ocupacao,
+        'COMPUTADOR': chunk[layout['computador']].ne('A').fillna(False).to_numpy(dtype=bool),
+        'INTERNET': chunk[layout['internet']].eq('B').fillna(False).to_numpy(dtype=bool),
+    })
+    nota = chunk[list(NOTAS)].mean(axis=1, skipna=False)
+    return quantis.esbocar(grupos, nota.to_numpy())
+
+
+def combinar_parciais(a, b):
+    """Soma dois acumuladores parciais (indexados por UF, município e código IBGE)."""
+    if a is None:
+        return b
+    return a.add(b, fill_value=0).astype('int64')
+
+
+def finalizar(acumulado, tem_dependencia=True):
+    """Converte somas e contagens no formato final dos indicadoresXX.csv."""
+    df = acumulado.sort_index()
+    total = df['Total_Alunos']
+
+    final = pd.DataFrame({
+        'UF': df.index.get_level_values('UF'),
+        'MUNICIPIO': df.index.get_level_values('MUNICIPIO'),
+        'CD_MUN': df.index.get_level_values('CD_MUN').astype('int64'),
+    })
+    final['Total_Alunos'] = total.to_numpy().astype('int64')
+    final['Total_Inclusao_Digital'] = df['Total_Inclusao_Digital'].to_numpy().astype('int64')
+    final['Taxa_Inclusao_Digital'] = (df['Total_Inclusao_Digital'] / total).to_numpy()
+    final['Internet'] = df['Internet'].to_numpy().astype('int64')
+    final['Taxa_Internet'] = (df['Internet'] / total).to_numpy()
+    final['Computador'] = df['Computador'].to_numpy().astype('int64')
+    final['Taxa_Computador'] = (df['Computador'] / total).to_numpy()
+
+    for nome in NOTAS.values():
+        final[nome] = (df[f'Soma_{nome}'] / df[f'Qtd_{nome}'] / 10).to_numpy()
+    final['Nota_Media_Geral'] = final[list(NOTAS.values())].mean(axis=1)
+
+    if tem_dependencia:
+        final['Baixa_Estrutura'] = df['Baixa_Estrutura'].to_numpy().astype('int64')
+        final['Alta_Estrutura'] = df['Alta_Estrutura'].to_numpy().astype('int64')
+
+    # participação do município no total de alunos da sua UF
+    final['Taxa_Alunos'] = final['Total_Alunos'] / final.groupby('UF')['Total_Alunos'].transform('sum')
+    return final
+
+
+def agregar_fatia(caminho, ano, inicio=None, fim=None, uf=UF_PADRAO, tamanho_chunk=TAMANHO_CHUNK):
+    """
+    Parcial de uma fatia de bytes do microdado: (acumulador de somas, esboço
+    de quantis), cada um None se a fatia não tiver linhas da UF.
+    """
+    layout = layout_do_ano(ano)
+    acumulado, esboco = None, None
+    for chunk in ler_em_chunks(caminho, layout, tamanho_chunk, inicio, fim):
+        acumulado = combinar_parciais(acumulado, agregar_chunk(chunk, layout, uf))
+        esboco = quantis.combinar(esboco, esbocar_chunk(chunk, layout, uf))
+    return acumulado, esboco
+
+
+def finalizar_ano(parciais, ano, origem=''):
+    """Combina os parciais (somas, esboço) de um ano e gera a tabela de indicadores."""
+    acumulado = None
+    for somas, _ in parciais:
+        if somas is not None:
+            acumulado = combinar_parciais(acumulado, somas)
+
+    if acumulado is None:
+        raise ValueError(f"Nenhuma linha lida de '{origem}'.")
+
+    if SEM_MUNICIPIO in acumulado.index:
+        descartados = int(acumulado.loc[SEM_MUNICIPIO, 'Total_Alunos'])
+        acumulado = acumulado.drop(SEM_MUNICIPIO)
+        print(f"{ano}: {descartados} aluno(s) sem UF, município ou código de município ignorado(s) em '{origem}'")
+        if acumulado.empty:
+            raise ValueError(f"Nenhum aluno com município identificado em '{origem}'.")
+
+    return finalizar(acumulado, tem_dependencia=bool(layout_do_ano(ano)['dependencia']))
+
+
+def esboco_do_ano(parciais):
+    """Combina os esboços de quantis dos parciais de um ano (None se não houver)."""
+    return quantis.combinar(*[esboco for _, esboco in parciais])
+
+
+def processar_ano(caminho, ano, uf=UF_PADRAO, tamanho_chunk=TAMANHO_CHUNK):
+    """Lê o microdado de um ano em chunks: (tabela de indicadores, esboço de quantis)."""
+    parcial = agregar_fatia(caminho, ano, uf=uf, tamanho_chunk=tamanho_chunk)
+    return finalizar_ano([parcial], ano, origem=caminho), esboco_do_ano([parcial])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera indicadoresXX.csv a partir dos MICRODADOS_ENEM.")
+    parser.add_argument('microdados', help="Caminho do MICRODADOS_ENEM_<ano>.csv")
+    parser.add_argument('--ano', type=int, required=True)
+    parser.add_argument('--saida', help="Arquivo de saída (padrão: indicadores<aa>.csv)")
+    parser.add_argument('--uf', default=UF_PADRAO, help=f"Sigla da UF ou {BRASIL} para todas")
+    parser.add_argument('--chunk', type=int, default=TAMANHO_CHUNK, help="Linhas por chunk")
+    args = parser.parse_args()
+
+    saida = args.saida or f'indicadores{args.ano % 100:02d}.csv'
+    df, esboco = processar_ano(args.microdados, args.ano, uf=args.uf, tamanho_chunk=args.chunk)
+    df.to_csv(saida)
+    print(f"{len(df)} municípios gravados em {saida}")
+    if esboco is not None and quantis.gravar(esboco, args.ano):
+        print(f"Esboço de quantis de {args.ano} gravado em {quantis.PASTA_QUANTIS}")
+
+
+if __name__ == '__main__':
+    main()
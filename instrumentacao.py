@@ -0,0 +1,233 @@
+"""
+Instrumentação do dashboard: tempo, cache e memória por seção.
+
+Cada seção (fragmento) e cada função em cache é registrada com o decorador
+`medido`: conta execuções e tempo de parede, e as consultas a caches feitas
+durante a execução (cache de figuras e funções `cacheada`) são atribuídas a
+todas as seções abertas na thread. A memória (via tracemalloc) só é medida
+quando ligada no painel de depuração, porque o rastreamento deixa tudo mais
+lento. Como o tracemalloc é do processo, com várias sessões simultâneas a
+memória atribuída a uma seção é aproximada.
+
+Os números são do processo (compartilhados entre sessões, como o cache de
+figuras) e podem ser exportados em JSON ou no formato texto do Prometheus.
+"""
+import functools
+import json
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+
+JANELA = 256    # últimas durações guardadas por seção (para mediana e p95)
+
+
+class _Estatistica:
+    def __init__(self):
+        self.execucoes = 0
+        self.tempo_total = 0.0
+        self.tempo_max = 0.0
+        self.duracoes = deque(maxlen=JANELA)
+        self.acertos = 0
+        self.falhas = 0
+        self.memoria_pico = None
+        self.memoria_liquida = None
+
+    def resumo(self):
+        duracoes = sorted(self.duracoes)
+        return {
+            'execucoes': self.execucoes,
+            'tempo_total': self.tempo_total,
+            'tempo_medio': self.tempo_total / self.execucoes if self.execucoes else 0.0,
+            'tempo_mediano': statistics.median(duracoes) if duracoes else 0.0,
+            'tempo_p95': duracoes[int(0.95 * (len(duracoes) - 1))] if duracoes else 0.0,
+            'tempo_max': self.tempo_max,
+            'cache_acertos': self.acertos,
+            'cache_falhas': self.falhas,
+            'memoria_pico': self.memoria_pico,
+            'memoria_liquida': self.memoria_liquida,
+        }
+
+
+class Instrumentacao:
+    """Registro de medições do processo, seguro entre threads."""
+
+    def __init__(self):
+        self._estatisticas = {}
+        self._trava = threading.Lock()
+        self._local = threading.local()
+
+    def _pilha(self):
+        if not hasattr(self._local, 'pilha'):
+            self._local.pilha = []
+        return self._local.pilha
+
+    def _estatistica(self, nome):
+        if nome not in self._estatisticas:
+            self._estatisticas[nome] = _Estatistica()
+        return self._estatisticas[nome]
+
+    # --- MEMÓRIA ---
+    @property
+    def memoria_ativa(self):
+        return tracemalloc.is_tracing()
+
+    def ativar_memoria(self, ativar=True):
+        if ativar and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not ativar and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    # --- MEDIÇÃO ---
+    def medir(self, nome):
+        """Context manager que mede um trecho com o nome `nome`."""
+        return _Trecho(self, nome)
+
+    def medido(self, func=None, *, nome=None):
+        """Decorador: mede cada chamada da função (nome padrão: o da função)."""
+        if func is None:
+            return functools.partial(self.medido, nome=nome)
+        rotulo = nome or func.__name__
+
+        @functools.wraps(func)
+        def envolvida(*args, **kwargs):
+            with self.medir(rotulo):
+                return func(*args, **kwargs)
+        return envolvida
+
+    def cacheada(self, decorador_cache, nome=None):
+        """
+        Aplica um decorador de cache do Streamlit (st.cache_data(...) ou
+        st.cache_resource(...)) contando acertos e falhas: a função só
+        executa o corpo na falha.
+        """
+        def aplicar(func):
+            rotulo = nome or func.__name__
+
+            @functools.wraps(func)
+            def corpo(*args, **kwargs):
+                self._falhou[rotulo] = True
+                return func(*args, **kwargs)
+            em_cache = decorador_cache(corpo)
+
+            @functools.wraps(func)
+            def chamada(*args, **kwargs):
+                self._falhou[rotulo] = False
+                with self.medir(rotulo):
+                    valor = em_cache(*args, **kwargs)
+                    self.registrar_cache(not self._falhou[rotulo])
+                return valor
+            chamada.clear = em_cache.clear
+            return chamada
+        return aplicar
+
+    @property
+    def _falhou(self):
+        if not hasattr(self._local, 'falhou'):
+            self._local.falhou = {}
+        return self._local.falhou
+
+    def registrar_cache(self, acerto):
+        """Conta um acerto/falha de cache para todas as seções abertas na thread."""
+        nomes = [trecho.nome for trecho in self._pilha()]
+        with self._trava:
+            for nome in set(nomes):
+                estatistica = self._estatistica(nome)
+                if acerto:
+                    estatistica.acertos += 1
+                else:
+                    estatistica.falhas += 1
+
+    def _registrar(self, nome, duracao, pico, liquida):
+        with self._trava:
+            estatistica = self._estatistica(nome)
+            estatistica.execucoes += 1
+            estatistica.tempo_total += duracao
+            estatistica.tempo_max = max(estatistica.tempo_max, duracao)
+            estatistica.duracoes.append(duracao)
+            if pico is not None:
+                estatistica.memoria_pico = max(estatistica.memoria_pico or 0, pico)
+                estatistica.memoria_liquida = liquida
+
+    def limpar(self):
+        with self._trava:
+            self._estatisticas.clear()
+
+    # --- EXPORTAÇÃO ---
+    def resumo(self):
+        """{nome: {execucoes, tempo_*, cache_acertos, cache_falhas, memoria_*}}"""
+        with self._trava:
+            return {nome: e.resumo() for nome, e in sorted(self._estatisticas.items())}
+
+    def como_json(self):
+        return json.dumps({'gerado_em': time.time(), 'secoes': self.resumo()}, indent=1)
+
+    def como_prometheus(self, prefixo='dashboard'):
+        """Texto no formato de exposição do Prometheus."""
+        series = [
+            ('secao_execucoes_total', 'counter', 'Execuções da seção', 'execucoes'),
+            ('secao_segundos_total', 'counter', 'Tempo de parede acumulado (s)', 'tempo_total'),
+            ('secao_segundos_p95', 'gauge', 'Percentil 95 do tempo de parede recente (s)', 'tempo_p95'),
+            ('secao_segundos_max', 'gauge', 'Maior tempo de parede observado (s)', 'tempo_max'),
+            ('secao_cache_acertos_total', 'counter', 'Acertos de cache durante a seção', 'cache_acertos'),
+            ('secao_cache_falhas_total', 'counter', 'Falhas de cache durante a seção', 'cache_falhas'),
+            ('secao_memoria_pico_bytes', 'gauge', 'Pico de memória alocada na seção (tracemalloc)', 'memoria_pico'),
+        ]
+        resumo = self.resumo()
+        linhas = []
+        for metrica, tipo, ajuda, campo in series:
+            nome = f'{prefixo}_{metrica}'
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} {tipo}')
+            for secao, valores in resumo.items():
+                if valores[campo] is not None:
+                    linhas.append(f'{nome}{{secao="{secao}"}} {valores[campo]}')
+        return '\n'.join(linhas) + '\n'
+
+
+class _Trecho:
+    def __init__(self, registro, nome):
+        self.registro = registro
+        self.nome = nome
+        self.pico = None
+
+    def __enter__(self):
+        pilha = self.registro._pilha()
+        if tracemalloc.is_tracing():
+            atual, pico = tracemalloc.get_traced_memory()
+            # o reset do pico abaixo apagaria o dos trechos externos; guarda antes
+            for trecho in pilha:
+                if trecho.pico is not None:
+                    trecho.pico = max(trecho.pico, pico)
+            tracemalloc.reset_peak()
+            self.memoria_inicio = atual
+            self.pico = atual
+        pilha.append(self)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duracao = time.perf_counter() - self.inicio
+        pilha = self.registro._pilha()
+        pilha.pop()
+        pico = liquida = None
+        if self.pico is not None and tracemalloc.is_tracing():
+            atual, pico_agora = tracemalloc.get_traced_memory()
+            self.pico = max(self.pico, pico_agora)
+            for trecho in pilha:
+                if trecho.pico is not None:
+                    trecho.pico = max(trecho.pico, self.pico)
+            pico = self.pico - self.memoria_inicio
+            liquida = atual - self.memoria_inicio
+        self.registro._registrar(self.nome, duracao, pico, liquida)
+        return False
+
+
+# Instância do processo, compartilhada entre sessões
+INSTRUMENTACAO = Instrumentacao()
+medir = INSTRUMENTACAO.medir
+medido = INSTRUMENTACAO.medido
+cacheada = INSTRUMENTACAO.cacheada
+registrar_cache = INSTRUMENTACAO.registrar_cache
@@ -0,0 +1,256 @@
+"""
+Mapas coropléticos dos indicadores por município.
+
+A malha municipal do IBGE (GeoJSON, ex.: API de malhas
+servicodados.ibge.gov.br/api/v3/malhas/estados/23?intrarregiao=municipio&formato=application/vnd.geo+json)
+é simplificada uma única vez preservando a topologia: as fronteiras são
+quebradas em arcos entre pontos de junção, cada arco é simplificado uma vez
+(Douglas-Peucker) e reaproveitado pelos dois municípios vizinhos, então não
+surgem buracos nem sobreposições entre eles. O resultado é gravado em Parquet
+(uma linha por município, geometria em GeoJSON compacto) e lido pelo
+dashboard sem reprocessar a malha original.
+
+Uso:
+    python mapas.py malha_ce.geojson
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import municipios
+
+
+CAMINHO_GEOMETRIA = municipios.CAMINHO_REFERENCIA
+TOLERANCIA = 0.002      # graus (~200 m)
+CASAS = 5               # casas decimais mantidas nas coordenadas
+
+# nomes de propriedade usados pelo IBGE (shapefile convertido ou API de malhas)
+PROPS_CODIGO = ('CD_MUN', 'codarea', 'CD_GEOCMU', 'id')
+PROPS_NOME = ('NM_MUN', 'NM_MUNICIP', 'nome', 'name')
+
+
+def _propriedade(props, nomes):
+    for nome in nomes:
+        if props.get(nome) not in (None, ''):
+            return props[nome]
+    return None
+
+
+def ler_geojson(caminho):
+    """Lista de (código IBGE, nome, lista de polígonos) a partir de um GeoJSON."""
+    with open(caminho, encoding='utf-8') as arquivo:
+        dados = json.load(arquivo)
+
+    feicoes = []
+    for feicao in dados['features']:
+        props = feicao.get('properties') or {}
+        codigo = _propriedade(props, PROPS_CODIGO) or feicao.get('id')
+        nome = _propriedade(props, PROPS_NOME)
+        geometria = feicao['geometry']
+        if geometria['type'] == 'Polygon':
+            poligonos = [geometria['coordinates']]
+        else:
+            poligonos = geometria['coordinates']
+        feicoes.append((int(codigo), nome, poligonos))
+    return feicoes
+
+
+# --- SIMPLIFICAÇÃO TOPOLÓGICA ---
+def _douglas_peucker(pontos, tolerancia):
+    """Máscara dos pontos mantidos; primeiro e último sempre ficam."""
+    n = len(pontos)
+    manter = np.zeros(n, dtype=bool)
+    manter[0] = manter[-1] = True
+    pilha = [(0, n - 1)]
+    while pilha:
+        i, j = pilha.pop()
+        if j <= i + 1:
+            continue
+        a, b = pontos[i], pontos[j]
+        meio = pontos[i + 1:j]
+        ab = b - a
+        comprimento = np.hypot(*ab)
+        if comprimento == 0:
+            dist = np.hypot(*(meio - a).T)
+        else:
+            dist = np.abs(ab[0] * (meio[:, 1] - a[1]) - ab[1] * (meio[:, 0] - a[0])) / comprimento
+        k = int(np.argmax(dist))
+        if dist[k] > tolerancia:
+            k += i + 1
+            manter[k] = True
+            pilha.append((i, k))
+            pilha.append((k, j))
+    return manter
+
+
+def _simplificar_arco(arco, tolerancia, cache):
+    """Simplifica um arco na orientação canônica, para que os dois lados da fronteira coincidam."""
+    invertido = (arco[-1], arco[-2]) < (arco[0], arco[1]) if len(arco) > 2 else arco[-1] < arco[0]
+    canonico = tuple(reversed(arco)) if invertido else tuple(arco)
+    if canonico not in cache:
+        pontos = np.array(canonico)
+        cache[canonico] = [canonico[i] for i in np.flatnonzero(_douglas_peucker(pontos, tolerancia))]
+    resultado = cache[canonico]
+    return resultado[::-1] if invertido else resultado
+
+
+def _simplificar_anel(anel, donos, tolerancia, cache):
+    m = len(anel)
+    juncao = [
+        donos[anel[i]] != donos[anel[i - 1]] or donos[anel[i]] != donos[anel[(i + 1) % m]]
+        for i in range(m)
+    ]
+
+    if not any(juncao):
+        # anel sem vizinhos diferentes: começa no menor vértice para ser canônico
+        inicio = anel.index(min(anel))
+        rodado = anel[inicio:] + anel[:inicio]
+        simplificado = _simplificar_arco(rodado + [rodado[0]], tolerancia, cache)[:-1]
+    else:
+        inicio = juncao.index(True)
+        rodado = anel[inicio:] + anel[:inicio]
+        marcas = juncao[inicio:] + juncao[:inicio]
+        cortes = [i for i, marca in enumerate(marcas) if marca] + [m]
+        rodado = rodado + [rodado[0]]
+        simplificado = []
+        for a, b in zip(cortes[:-1], cortes[1:]):
+            simplificado.extend(_simplificar_arco(rodado[a:b + 1], tolerancia, cache)[:-1])
+
+    if len(set(simplificado)) < 3:
+        simplificado = anel
+    return simplificado + [simplificado[0]]
+
+
+def simplificar(feicoes, tolerancia=TOLERANCIA, casas=CASAS):
+    """Simplifica todas as feições preservando as fronteiras compartilhadas."""
+    def quantizar(anel):
+        pontos = [(round(x, casas), round(y, casas)) for x, y in anel]
+        if pontos[0] == pontos[-1]:
+            pontos = pontos[:-1]
+        # remove vértices repetidos em sequência
+        return [p for i, p in enumerate(pontos) if p != pontos[i - 1]] or pontos
+
+    quantizadas = [
+        (codigo, nome, [[quantizar(anel) for anel in poligono] for poligono in poligonos])
+        for codigo, nome, poligonos in feicoes
+    ]
+
+    donos = {}
+    for codigo, _, poligonos in quantizadas:
+        for poligono in poligonos:
+            for anel in poligono:
+                for ponto in anel:
+                    donos.setdefault(ponto, set()).add(codigo)
+    donos = {ponto: frozenset(codigos) for ponto, codigos in donos.items()}
+
+    cache = {}
+    return [
+        (codigo, nome, [
+            [_simplificar_anel(anel, donos, tolerancia, cache) for anel in poligono]
+            for poligono in poligonos
+        ])
+        for codigo, nome, poligonos in quantizadas
+    ]
+
+
+# --- ARMAZENAMENTO ---
+def compilar(caminho_geojson, destino=CAMINHO_GEOMETRIA, tolerancia=TOLERANCIA):
+    """Lê a malha do IBGE, simplifica e grava a tabela de geometrias em Parquet."""
+    feicoes = simplificar(ler_geojson(caminho_geojson), tolerancia)
+    tabela = pd.DataFrame({
+        'CD_MUN': pd.array([codigo for codigo, _, _ in feicoes], dtype='int32'),
+        'NM_MUN': [nome for _, nome, _ in feicoes],
+        'geometria': [
+            json.dumps({'type': 'MultiPolygon', 'coordinates': poligonos}, separators=(',', ':'))
+            for _, _, poligonos in feicoes
+        ],
+    })
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(tabela, preserve_index=False), destino)
+    return destino
+
+
+def existe(caminho=CAMINHO_GEOMETRIA):
+    return os.path.exists(caminho)
+
+
+def carregar_geometria(caminho=CAMINHO_GEOMETRIA):
+    """
+    (tabela, geojson): a tabela tem CD_MUN e NM_MUN; o geojson é a
+    FeatureCollection com `id` = CD_MUN, pronta para o Plotly.
+    """
+    tabela = pq.read_table(caminho).to_pandas()
+    geojson = {
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'id': int(codigo), 'properties': {}, 'geometry': json.loads(geometria)}
+            for codigo, geometria in zip(tabela['CD_MUN'], tabela['geometria'])
+        ],
+    }
+    return tabela.drop(columns='geometria'), geojson
+
+
+def figura_mapa(df_ano, metrica, geojson, titulo='', rotulo=None, is_nota=False):
+    """
+    Coroplético Plotly da métrica por município. A junção com a malha é pelo
+    código CD_MUN do índice de municípios (registro.carregar_painel).
+    """
+    import plotly.express as px
+
+    dados = df_ano[['CD_MUN', 'MUNICIPIO', metrica]]
+
+    fig = px.choropleth(
+        dados,
+        geojson=geojson,
+        locations='CD_MUN',
+        color=metrica,
+        hover_name='MUNICIPIO',
+        color_continuous_scale='RdYlGn',
+        range_color=None if is_nota else (0, 1),
+        labels={metrica: rotulo or metrica},
+        title=titulo,
+    )
+    fig.update_geos(fitbounds='locations', visible=False)
+    fig.update_layout(margin=dict(l=0, r=0, t=40, b=0))
+    return fig
+
+
+
+# cores dos agrupamentos LISA (espacial.py), na convenção usual: quentes para
+# municípios altos, frias para baixos
+CORES_CLUSTERS = {
+    'Alto-Alto': '#d7191c', 'Alto-Baixo': '#fdae61', 'Baixo-Alto': '#abd9e9',
+    'Baixo-Baixo': '#2c7bb6', 'Não significativo': '#e0e0e0', 'Sem vizinhos': '#ffffff',
+}
+
+
+def figura_clusters(locais, geojson, titulo=''):
+    """Coroplético categórico dos agrupamentos LISA (tabela `locais` de espacial.moran)."""
+    import plotly.express as px
+
+    fig = px.choropleth(
+        locais,
+        geojson=geojson,
+        locations='CD_MUN',
+        color='cluster',
+        hover_name='MUNICIPIO',
+        hover_data={'CD_MUN': False, 'p_sim': ':.3f'},
+        color_discrete_map=CORES_CLUSTERS,
+        category_orders={'cluster': list(CORES_CLUSTERS)},
+        labels={'cluster': 'Agrupamento', 'p_sim': 'p'},
+        title=titulo,
+    )
+    fig.update_geos(fitbounds='locations', visible=False)
+    fig.update_layout(margin=dict(l=0, r=0, t=40, b=0))
+    return fig
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        raise SystemExit("Uso: python mapas.py <malha_municipios.geojson>")
+    print(f"Geometria gravada em {compilar(sys.argv[1])}")
@@ -0,0 +1,185 @@
+"""
+Índice canônico de municípios.
+
+Os indicadores de cada ano trazem o município como texto livre, e a grafia
+muda entre edições do ENEM (acentos, caixa, nomes antigos: 'Ereré' x 'Ererê').
+O índice associa cada nome normalizado (chave) a um código inteiro e a uma
+grafia canônica, montado uma vez a partir de todos os anos; a partir daí as
+junções entre anos são feitas pelo código (CD_MUN), com arrays alinhados,
+e os municípios sem par são listados em vez de descartados em silêncio.
+
+O código é o do IBGE quando alguma fonte o traz (indicadores gerados pela
+ingestão ou malha municipal compilada por mapas.py); sem fonte, usa-se um
+código provisório negativo derivado da chave, estável entre execuções.
+
+A chave inclui a UF, já que há nomes repetidos entre estados (Bom Jesus
+existe em cinco). Tabelas sem coluna UF são do Ceará (UF_PADRAO), como os
+indicadoresXX.csv originais.
+"""
+import os
+import unicodedata
+import zlib
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+
+# Tabela de referência do IBGE (CD_MUN, NM_MUN), gravada por mapas.py
+CAMINHO_REFERENCIA = os.path.join('dados', 'geometria', 'municipios.parquet')
+
+UF_PADRAO = 'CE'
+BRASIL = 'BR'       # escopo com todas as UFs
+
+# Sigla -> nome das unidades da federação
+UFS = {
+    'AC': 'Acre', 'AL': 'Alagoas', 'AM': 'Amazonas', 'AP': 'Amapá', 'BA': 'Bahia',
+    'CE': 'Ceará', 'DF': 'Distrito Federal', 'ES': 'Espírito Santo', 'GO': 'Goiás',
+    'MA': 'Maranhão', 'MG': 'Minas Gerais', 'MS': 'Mato Grosso do Sul', 'MT': 'Mato Grosso',
+    'PA': 'Pará', 'PB': 'Paraíba', 'PE': 'Pernambuco', 'PI': 'Piauí', 'PR': 'Paraná',
+    'RJ': 'Rio de Janeiro', 'RN': 'Rio Grande do Norte', 'RO': 'Rondônia', 'RR': 'Roraima',
+    'RS': 'Rio Grande do Sul', 'SC': 'Santa Catarina', 'SE': 'Sergipe', 'SP': 'São Paulo',
+    'TO': 'Tocantins',
+}
+
+# Dois primeiros dígitos do código IBGE do município -> UF
+CODIGOS_UF = {
+    11: 'RO', 12: 'AC', 13: 'AM', 14: 'RR', 15: 'PA', 16: 'AP', 17: 'TO',
+    21: 'MA', 22: 'PI', 23: 'CE', 24: 'RN', 25: 'PB', 26: 'PE', 27: 'AL', 28: 'SE', 29: 'BA',
+    31: 'MG', 32: 'ES', 33: 'RJ', 35: 'SP',
+    41: 'PR', 42: 'SC', 43: 'RS',
+    50: 'MS', 51: 'MT', 52: 'GO', 53: 'DF',
+}
+
+# Grafias históricas -> chave atual (as duas já normalizadas por chave_nome)
+ALIASES = {
+    'itapage': 'itapaje',
+}
+
+
+def chave_nome(nome):
+    """Nome normalizado (sem acento, minúsculo, sem hífen/apóstrofo nem espaços extras)."""
+    sem_acento = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode()
+    return ' '.join(sem_acento.lower().replace("'", ' ').replace('-', ' ').split())
+
+
+def chave(nome, uf=UF_PADRAO):
+    """Chave do município no índice ('CE:itapaje'), já resolvendo grafias históricas."""
+    normalizado = chave_nome(nome)
+    return f'{uf}:{ALIASES.get(normalizado, normalizado)}'
+
+
+def uf_da_tabela(df):
+    """Coluna UF da tabela; sem ela, todas as linhas são da UF_PADRAO."""
+    if 'UF' in df:
+        return df['UF'].astype(str).to_numpy()
+    return np.full(len(df), UF_PADRAO, dtype=object)
+
+
+def ufs_do_escopo(escopo):
+    """UFs lidas para um escopo: [escopo] para uma UF, None (todas) para BRASIL."""
+    return None if escopo == BRASIL else [escopo]
+
+
+def codigo_provisorio(chave_municipio):
+    """Código negativo estável para municípios sem código IBGE conhecido."""
+    return -zlib.crc32(chave_municipio.encode())
+
+
+def codigo_ibge(codigos):
+    """Se cada código é do IBGE: os provisórios são negativos e 0 é nome fora do índice."""
+    return np.asarray(codigos) > 0
+
+
+def referencia_ibge(caminho=CAMINHO_REFERENCIA):
+    """(CD_MUN, UF, MUNICIPIO) da malha do IBGE compilada, ou None se não houver."""
+    if not os.path.exists(caminho):
+        return None
+    tabela = pq.read_table(caminho, columns=['CD_MUN', 'NM_MUN']).to_pandas()
+    tabela['UF'] = (tabela['CD_MUN'] // 100_000).map(CODIGOS_UF)
+    return tabela.rename(columns={'NM_MUN': 'MUNICIPIO'}).dropna(subset=['MUNICIPIO', 'UF'])
+
+
+def construir_indice(fontes):
+    """
+    Índice (CHAVE -> CD_MUN, MUNICIPIO) a partir de tabelas com MUNICIPIO e,
+    opcionalmente, UF e CD_MUN. Fontes com código têm prioridade para o
+    código e a grafia; a ordem das fontes desempata.
+    """
+    partes = []
+    for fonte in fontes:
+        if fonte is None:
+            continue
+        parte = pd.DataFrame({
+            'MUNICIPIO': fonte['MUNICIPIO'].astype(str).to_numpy(),
+            'UF': uf_da_tabela(fonte),
+        })
+        parte['CD_MUN'] = fonte['CD_MUN'].to_numpy() if 'CD_MUN' in fonte else np.nan
+        partes.append(parte)
+
+    linhas = pd.concat(partes, ignore_index=True)
+    linhas['CHAVE'] = [chave(nome, uf) for nome, uf in zip(linhas['MUNICIPIO'], linhas['UF'])]
+    linhas['SEM_CODIGO'] = linhas['CD_MUN'].isna()
+    indice = (
+        linhas.sort_values('SEM_CODIGO', kind='stable')
+        .drop_duplicates('CHAVE')
+        .set_index('CHAVE')[['CD_MUN', 'MUNICIPIO']]
+        .sort_index()
+    )
+    provisorio = indice.index.map(codigo_provisorio).to_numpy()
+    indice['CD_MUN'] = np.where(indice['CD_MUN'].isna(), provisorio, indice['CD_MUN']).astype('int64')
+    return indice
+
+
+def resolver(nomes, indice, ufs=None):
+    """
+    Códigos e grafias canônicas para uma coluna de nomes (e UFs, padrão
+    UF_PADRAO). Retorna (codigos, canonicos, nao_encontrados); nomes fora do
+    índice recebem código 0 e mantêm a grafia original.
+    """
+    nomes = pd.Series(nomes, dtype=str).reset_index(drop=True)
+    ufs = np.full(len(nomes), UF_PADRAO, dtype=object) if ufs is None else np.asarray(ufs)
+    posicao = indice.index.get_indexer([chave(nome, uf) for nome, uf in zip(nomes, ufs)])
+    achado = posicao >= 0
+    codigos = np.where(achado, indice['CD_MUN'].to_numpy()[posicao], 0)
+    canonicos = np.where(achado, indice['MUNICIPIO'].to_numpy()[posicao], nomes.to_numpy())
+    return codigos, canonicos, sorted(nomes[~achado].unique())
+
+
+def parear(*codigos):
+    """
+    Posições dos municípios presentes em todas as listas de códigos, na
+    mesma ordem em cada uma: parear(a, b) -> [pos_a, pos_b].
+    Código 0 (nome fora do índice, ver `resolver`) não pareia; outro código
+    repetido numa lista é erro (ValueError).
+    """
+    codigos = [np.asarray(c) for c in codigos]
+    for c in codigos:
+        valores, contagem = np.unique(c[c != 0], return_counts=True)
+        if (contagem > 1).any():
+            raise ValueError(f"códigos de município repetidos: {valores[contagem > 1].tolist()}")
+    comuns = _comuns(codigos)
+    posicoes = []
+    for c in codigos:
+        ordem = np.argsort(c, kind='stable')
+        posicoes.append(ordem[np.searchsorted(c[ordem], comuns)])
+    return posicoes
+
+
+def _comuns(codigos):
+    """Códigos presentes em todas as listas, sem o 0 (município não identificado)."""
+    comuns = reduce(np.intersect1d, codigos)
+    return comuns[comuns != 0]
+
+
+def sem_par(fontes):
+    """
+    Municípios de cada fonte ausentes em alguma das outras.
+    `fontes` é {rótulo: tabela com MUNICIPIO e CD_MUN}; retorna {rótulo: [nomes]}.
+    """
+    comuns = _comuns([df['CD_MUN'].to_numpy() for df in fontes.values()])
+    return {
+        rotulo: sorted(df.loc[~df['CD_MUN'].isin(comuns), 'MUNICIPIO'].astype(str))
+        for rotulo, df in fontes.items()
+    }
@@ -0,0 +1,278 @@
+"""
+Pareamento por escore de propensão (PSM).
+
+A conclusão do dashboard sugere separar o efeito do acesso a computador dos
+fatores socioeconômicos; este módulo faz isso comparando tratados com
+controles parecidos:
+
+1. Escore de propensão: regressão logística do tratamento nas covariáveis,
+   ajustada por IRLS (Newton-Raphson) em numpy; cada iteração é um produto
+   X'WX de (covariáveis x covariáveis), então o custo é linear no número
+   de linhas.
+2. Pareamento: cada tratado recebe os k controles mais próximos no logit do
+   escore, dentro de um caliper (padrão: 0,2 desvio do logit, Austin 2011),
+   com reposição. Como a distância é unidimensional, a busca é uma árvore
+   ordenada (np.searchsorted sobre os controles ordenados): O(n log n) em
+   vez das n_tratados x n_controles distâncias de um pareamento ingênuo.
+3. Diagnóstico de balanço: diferença de médias padronizada (SMD) e razão de
+   variâncias de cada covariável antes e depois do pareamento (|SMD| < 0,1
+   é o critério usual), e o efeito médio nos tratados (ATT).
+
+Funciona com os indicadores municipais (tratamento = taxa acima de um
+limiar) e com os microdados do ENEM por aluno (tratamento = possui
+computador, covariáveis = renda e escolaridade dos pais, dependência da
+escola), lidos só nas colunas necessárias.
+
+Uso:
+    python pareamento.py --ano 2023                      # municípios: Taxa_Computador acima da mediana
+    python pareamento.py --ano 2023 --tratamento Taxa_Computador --limiar 0.3 --covariaveis Total_Alunos IDEB
+    python pareamento.py --microdados MICRODADOS_ENEM_2023.csv --ano 2023 --uf CE
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import ingestao
+import municipios
+import registro
+
+
+CALIPER = 0.2           # em desvios padrão do logit do escore
+LIMITE_SMD = 0.1
+ITERACOES = 50
+TOLERANCIA = 1e-8
+BLOCO_LINHAS = 1_000_000    # linhas por bloco no X'WX (limita a memória temporária)
+
+# Municípios: covariáveis padrão para o tratamento "taxa de computador alta"
+COVARIAVEIS_MUNICIPIO = ['Total_Alunos', 'IDEB', 'Taxa_Internet']
+
+# Microdados: questionário socioeconômico do ENEM, respostas em letras ordenadas
+# (Q001/Q002: escolaridade do pai/mãe, 'H' = não sei; Q006: faixa de renda)
+SOCIOECONOMICO = {
+    'Q001': ('escolaridade_pai', 'ABCDEFG'),
+    'Q002': ('escolaridade_mae', 'ABCDEFG'),
+    'Q006': ('renda', 'ABCDEFGHIJKLMNOPQ'),
+}
+
+
+# --- ESCORE DE PROPENSÃO ---
+def _padronizar(X):
+    media, desvio = X.mean(axis=0), X.std(axis=0)
+    desvio[desvio == 0] = 1.0
+    return np.column_stack([np.ones(len(X)), (X - media) / desvio])
+
+
+def ajustar_logistica(X, t, iteracoes=ITERACOES, tolerancia=TOLERANCIA):
+    """
+    Coeficientes (intercepto primeiro) da regressão logística de `t` (0/1)
+    em `X`, com as covariáveis padronizadas. Uma pequena penalidade ridge
+    mantém o ajuste estável sob separação quase perfeita.
+    """
+    Z = _padronizar(np.asarray(X, dtype='float64'))
+    t = np.asarray(t, dtype='float64')
+    beta = np.zeros(Z.shape[1])
+    penalidade = 1e-6 * np.eye(Z.shape[1])
+    penalidade[0, 0] = 0.0
+    for _ in range(iteracoes):
+        hessiana = penalidade.copy()
+        gradiente = -penalidade @ beta
+        for inicio in range(0, len(Z), BLOCO_LINHAS):
+            bloco = Z[inicio:inicio + BLOCO_LINHAS]
+            p = 1 / (1 + np.exp(-(bloco @ beta)))
+            hessiana += bloco.T @ (bloco * (p * (1 - p))[:, None])
+            gradiente += bloco.T @ (t[inicio:inicio + BLOCO_LINHAS] - p)
+        passo = np.linalg.solve(hessiana, gradiente)
+        beta += passo
+        if np.abs(passo).max() < tolerancia:
+            break
+    return beta
+
+
+def logit_propensao(X, t):
+    """Logit do escore de propensão de cada linha (o escore é 1 / (1 + e^-logit))."""
+    return _padronizar(np.asarray(X, dtype='float64')) @ ajustar_logistica(X, t)
+
+
+# --- PAREAMENTO ---
+def parear(logit_tratados, logit_controles, caliper, k=1, semente=0):
+    """
+    Para cada tratado, os até k controles mais próximos em |logit| <= caliper
+    (com reposição). Retorna (posição do tratado, posição do controle), um par
+    por linha; tratados sem controle dentro do caliper ficam de fora. Empates
+    (comuns com covariáveis categóricas) são desfeitos ao acaso, com `semente`.
+    """
+    ordem = np.argsort(logit_controles, kind='stable')
+    ordenados = logit_controles[ordem]
+    n = len(ordenados)
+    k = min(k, n)
+    # posição de inserção sorteada dentro do bloco de controles com o mesmo
+    # logit; sem isso, todos os tratados de um estrato usariam o mesmo controle
+    esquerda = np.searchsorted(ordenados, logit_tratados, side='left')
+    direita = np.searchsorted(ordenados, logit_tratados, side='right')
+    sorteio = np.random.default_rng(semente).random(len(logit_tratados))
+    posicao = esquerda + (sorteio * (direita - esquerda)).astype('int64')
+    # candidatos: os k controles de cada lado da posição de inserção
+    candidatos = posicao[:, None] + np.arange(-k, k)[None, :]
+    valido = (candidatos >= 0) & (candidatos < n)
+    candidatos = np.clip(candidatos, 0, n - 1)
+    distancia = np.where(valido, np.abs(ordenados[candidatos] - logit_tratados[:, None]), np.inf)
+
+    melhores = np.argsort(distancia, axis=1, kind='stable')[:, :k]
+    escolhidos = np.take_along_axis(candidatos, melhores, axis=1)
+    distancia = np.take_along_axis(distancia, melhores, axis=1)
+
+    dentro = distancia <= caliper
+    tratado = np.broadcast_to(np.arange(len(logit_tratados))[:, None], dentro.shape)[dentro]
+    return tratado, ordem[escolhidos[dentro]]
+
+
+def _media_var(valores, pesos=None):
+    media = np.average(valores, axis=0, weights=pesos)
+    variancia = np.average((valores - media) ** 2, axis=0, weights=pesos)
+    return media, variancia
+
+
+def balanco(X, t, pesos_pareados, covariaveis):
+    """
+    SMD e razão de variâncias por covariável, antes e depois do pareamento.
+    `pesos_pareados` é o peso de cada linha na amostra pareada (0 = fora).
+    O denominador da SMD é sempre o desvio da amostra original.
+    """
+    X = np.asarray(X, dtype='float64')
+    tratado = t == 1
+    media_t, var_t = _media_var(X[tratado])
+    media_c, var_c = _media_var(X[~tratado])
+    denominador = np.sqrt((var_t + var_c) / 2)
+    denominador[denominador == 0] = 1.0
+
+    media_tp, var_tp = _media_var(X[tratado], pesos_pareados[tratado])
+    media_cp, var_cp = _media_var(X[~tratado], pesos_pareados[~tratado])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            'smd_antes': (media_t - media_c) / denominador,
+            'smd_depois': (media_tp - media_cp) / denominador,
+            'razao_var_antes': var_t / var_c,
+            'razao_var_depois': var_tp / var_cp,
+        }, index=pd.Index(covariaveis, name='COVARIAVEL'))
+
+
+def estimar(df, tratamento, covariaveis, desfecho, caliper=CALIPER, k=1):
+    """
+    Pareamento completo sobre `df` (coluna 0/1 `tratamento`). Linhas com
+    valor faltante no tratamento, nas covariáveis ou no desfecho são
+    descartadas antes do ajuste. Retorna um dict com att, ingenuo (diferença
+    de médias sem pareamento), contagens, caliper e a tabela de balanço.
+    """
+    colunas = [tratamento] + list(covariaveis) + [desfecho]
+    dados = df[colunas].dropna()
+    X = dados[covariaveis].to_numpy(dtype='float64')
+    t = dados[tratamento].to_numpy(dtype='int8')
+    y = dados[desfecho].to_numpy(dtype='float64')
+    if t.min(initial=1) == t.max(initial=0):
+        raise ValueError("o tratamento precisa ter tratados e controles")
+
+    logit = logit_propensao(X, t)
+    caliper_logit = caliper * logit.std()
+    tratados, controles = np.flatnonzero(t == 1), np.flatnonzero(t == 0)
+    pos_t, pos_c = parear(logit[tratados], logit[controles], caliper_logit, k)
+
+    # pesos da amostra pareada: 1 por tratado pareado; cada controle recebe
+    # 1/(nº de controles do seu tratado), somado sobre os tratados que o usam
+    pares_por_tratado = np.bincount(pos_t, minlength=len(tratados))
+    pesos = np.zeros(len(dados))
+    pesos[tratados] = pares_por_tratado > 0
+    np.add.at(pesos, controles[pos_c], 1.0 / pares_por_tratado[pos_t])
+
+    media_tratados = np.average(y[tratados], weights=pesos[tratados]) if pesos[tratados].any() else np.nan
+    media_controles = np.average(y[controles], weights=pesos[controles]) if pesos[controles].any() else np.nan
+    return {
+        'att': media_tratados - media_controles,
+        'ingenuo': y[t == 1].mean() - y[t == 0].mean(),
+        'n': len(dados),
+        'tratados': len(tratados),
+        'controles': len(controles),
+        'tratados_pareados': int((pares_por_tratado > 0).sum()),
+        'controles_usados': int((pesos[controles] > 0).sum()),
+        'caliper_logit': caliper_logit,
+        'balanco': balanco(X, t, pesos, covariaveis),
+    }
+
+
+# --- FONTES ---
+def dados_municipais(painel, ano, tratamento='Taxa_Computador', limiar=None):
+    """Fatia do ano com TRATADO = taxa acima do limiar (padrão: a mediana do ano)."""
+    df = registro.fatia_ano(painel, ano)
+    limiar = df[tratamento].median() if limiar is None else limiar
+    return df.assign(TRATADO=np.where(df[tratamento].notna(), (df[tratamento] > limiar).astype('float64'), np.nan))
+
+
+def dados_alunos(caminho, ano, uf=municipios.UF_PADRAO, tamanho_chunk=ingestao.TAMANHO_CHUNK):
+    """
+    Microdado do ENEM por aluno com TRATADO (possui computador), as
+    covariáveis socioeconômicas codificadas como ordinais, ALTA_ESTRUTURA
+    (escola federal/privada, quando o ano divulga) e NOTA (média das provas).
+    Lê em blocos só as colunas usadas.
+    """
+    layout = ingestao.layout_do_ano(ano)
+    nomes, _ = ingestao.ler_cabecalho(caminho)
+    questoes = [q for q in SOCIOECONOMICO if q in nomes]
+    colunas = [layout['uf'], layout['computador']] + questoes + list(ingestao.NOTAS)
+    if layout['dependencia']:
+        colunas.append(layout['dependencia'])
+
+    partes = []
+    for chunk in pd.read_csv(caminho, sep=';', encoding='latin-1', usecols=colunas,
+                             dtype={c: 'string' for c in [layout['uf'], layout['computador']] + questoes},
+                             chunksize=tamanho_chunk):
+        if uf != municipios.BRASIL:
+            chunk = chunk[chunk[layout['uf']] == uf]
+        parte = pd.DataFrame({
+            'TRATADO': chunk[layout['computador']].ne('A').astype('float64').where(chunk[layout['computador']].notna()),
+            'NOTA': chunk[list(ingestao.NOTAS)].mean(axis=1, skipna=False),
+        })
+        for questao in questoes:
+            nome, ordem = SOCIOECONOMICO[questao]
+            parte[nome] = chunk[questao].map({letra: i for i, letra in enumerate(ordem)}).astype('float64')
+        if layout['dependencia']:
+            parte['ALTA_ESTRUTURA'] = chunk[layout['dependencia']].isin(ingestao.ALTA_ESTRUTURA).astype('float64')
+        partes.append(parte)
+    return pd.concat(partes, ignore_index=True)
+
+
+def _imprimir(resultado, desfecho):
+    print(f"Tratados: {resultado['tratados']:,}  controles: {resultado['controles']:,}  "
+          f"tratados pareados: {resultado['tratados_pareados']:,}  controles usados: {resultado['controles_usados']:,}")
+    print(f"{desfecho}: diferença ingênua {resultado['ingenuo']:.3f}  ATT pareado {resultado['att']:.3f}")
+    print("\nBalanço (|SMD| < 0,1 é considerado balanceado):")
+    print(resultado['balanco'].round(3).to_string())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pareamento por escore de propensão.")
+    parser.add_argument('--ano', type=int, required=True)
+    parser.add_argument('--microdados', help="MICRODADOS_ENEM_<ano>.csv (pareamento por aluno)")
+    parser.add_argument('--uf', default=municipios.UF_PADRAO, help=f"Sigla da UF ou {municipios.BRASIL} para todas")
+    parser.add_argument('--tratamento', default='Taxa_Computador', help="(municípios) taxa que define o tratamento")
+    parser.add_argument('--limiar', type=float, help="(municípios) limiar do tratamento (padrão: mediana)")
+    parser.add_argument('--covariaveis', nargs='+', help="(municípios) padrão: " + ' '.join(COVARIAVEIS_MUNICIPIO))
+    parser.add_argument('--desfecho', default='Nota_Media_Geral', help="(municípios) coluna de resultado")
+    parser.add_argument('--caliper', type=float, default=CALIPER)
+    parser.add_argument('--k', type=int, default=1, help="controles por tratado")
+    args = parser.parse_args()
+
+    if args.microdados:
+        df = dados_alunos(args.microdados, args.ano, args.uf)
+        covariaveis = [c for c in df.columns if c not in ('TRATADO', 'NOTA')]
+        desfecho = 'NOTA'
+    else:
+        painel = registro.carregar_painel(ufs=municipios.ufs_do_escopo(args.uf))
+        df = dados_municipais(painel, args.ano, args.tratamento, args.limiar)
+        covariaveis = args.covariaveis or [c for c in COVARIAVEIS_MUNICIPIO if c in df and df[c].notna().any()]
+        desfecho = args.desfecho
+
+    _imprimir(estimar(df, 'TRATADO', covariaveis, desfecho, args.caliper, args.k), desfecho)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Esboços de quantis (t-digest) das notas dos alunos, montados na ingestão.
+
+Os boxplots de ocupação do pai e de alta x baixa estrutura eram imagens
+geradas uma vez a partir do microdado inteiro: não acompanhavam a métrica
+da barra lateral nem um ano novo. Aqui a ingestão (ingestao.py /
+construir.py) guarda, para cada ano, um esboço da distribuição da nota
+média dos alunos por grupo (UF, ESTRUTURA da escola, OCUPACAO_PAI,
+COMPUTADOR, INTERNET), e o dashboard tira quartis, mediana e bigodes dele.
+
+Um esboço é uma tabela de centroides (média, peso, mínimo e máximo dos
+valores que cada um resume) por grupo. A compressão segue o t-digest com a
+função de escala k1 (Dunning e Ertl): centroides pequenos nas caudas e
+maiores perto da mediana; com COMPRESSAO = 200 cada grupo guarda no máximo
+~100 centroides, e mínimo, máximo, contagem e média continuam exatos.
+Combinar esboços é concatenar e recomprimir, então chunks, fatias do
+arquivo, UFs e anos se juntam da mesma forma, e os quantis de qualquer
+agrupamento mais grosso (só a ocupação, só a estrutura, o Brasil inteiro)
+saem da combinação dos esboços, sem reler o microdado.
+
+Os esboços ficam em dados/quantis/ANO=<ano>/quantis.parquet.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import armazem
+
+
+PASTA_QUANTIS = os.path.join('dados', 'quantis')
+NOME_ARQUIVO = 'quantis.parquet'
+COMPRESSAO = 200
+QUANTIS = (0.25, 0.5, 0.75)
+
+# Grupo mais fino guardado; agrupamentos mais grossos são combinações destes
+CHAVES = ['UF', 'ESTRUTURA', 'OCUPACAO_PAI', 'COMPUTADOR', 'INTERNET']
+CENTROIDES = ['media', 'peso', 'min', 'max']
+
+# ESTRUTURA: dependência da escola (ingestao.BAIXA_ESTRUTURA / ALTA_ESTRUTURA)
+ESTRUTURAS = ['Baixa Estrutura', 'Alta Estrutura']
+SEM_ESTRUTURA = 'Sem informação'    # sem escola informada, ou ano sem a coluna
+SEM_OCUPACAO = ''
+
+# Recorte de acesso que acompanha cada métrica da barra lateral
+ACESSO = {
+    'Taxa_Inclusao_Digital': ['COMPUTADOR', 'INTERNET'],
+    'Taxa_Computador': ['COMPUTADOR'],
+    'Taxa_Internet': ['INTERNET'],
+}
+
+
+# --- ESBOÇOS ---
+def _codigo_grupo(tabela, chaves):
+    """Código inteiro de cada linha, na ordem lexicográfica das `chaves` (factorize por coluna)."""
+    codigo = np.zeros(len(tabela), dtype='int64')
+    for chave in chaves:
+        codigos, valores = pd.factorize(tabela[chave], sort=True)
+        codigo = codigo * (len(valores) + 1) + codigos
+    return codigo
+
+
+def comprimir(tabela, chaves=CHAVES, compressao=COMPRESSAO):
+    """
+    Recomprime os centroides de `tabela` dentro de cada grupo `chaves`.
+    Em cada grupo os centroides são ordenados pela média e juntados enquanto
+    caem na mesma faixa unitária de k1(q) = compressao / 2π · asin(2q - 1),
+    com q a posição (peso acumulado) do centro do centroide no grupo.
+    """
+    if tabela.empty:
+        return tabela[chaves + CENTROIDES].reset_index(drop=True)
+
+    grupo = _codigo_grupo(tabela, chaves)
+    media = tabela['media'].to_numpy(dtype='float64')
+    ordem = np.lexsort((media, grupo))
+    grupo, media = grupo[ordem], media[ordem]
+    peso = tabela['peso'].to_numpy(dtype='float64')[ordem]
+
+    novo_grupo = np.r_[True, np.diff(grupo) != 0]
+    inicios = np.flatnonzero(novo_grupo)
+    linha_grupo = np.cumsum(novo_grupo) - 1
+    acumulado = np.cumsum(peso)
+    antes = (acumulado - peso)[inicios][linha_grupo]
+    total = np.add.reduceat(peso, inicios)[linha_grupo]
+    q = (acumulado - antes - peso / 2) / total
+    faixa = np.floor(compressao / (2 * np.pi) * np.arcsin(2 * q - 1))
+
+    cortes = np.flatnonzero(novo_grupo | np.r_[True, np.diff(faixa) != 0])
+    soma_peso = np.add.reduceat(peso, cortes)
+    resultado = tabela[chaves].iloc[ordem[cortes]].reset_index(drop=True)
+    resultado['media'] = np.add.reduceat(peso * media, cortes) / soma_peso
+    resultado['peso'] = soma_peso
+    resultado['min'] = np.minimum.reduceat(tabela['min'].to_numpy(dtype='float64')[ordem], cortes)
+    resultado['max'] = np.maximum.reduceat(tabela['max'].to_numpy(dtype='float64')[ordem], cortes)
+    return resultado
+
+
+def esbocar(grupos, valores, compressao=COMPRESSAO):
+    """Esboço de `valores` (um por linha de `grupos`, NaN ignorado) por grupo."""
+    valores = np.asarray(valores, dtype='float64')
+    presente = ~np.isnan(valores)
+    tabela = grupos[presente].reset_index(drop=True)
+    tabela['media'] = valores[presente]
+    tabela['peso'] = 1.0
+    tabela['min'] = tabela['max'] = tabela['media']
+    return comprimir(tabela, list(grupos.columns), compressao)
+
+
+def combinar(*esbocos, chaves=CHAVES):
+    """Combina esboços (None é ignorado); None se não houver nenhum."""
+    esbocos = [e for e in esbocos if e is not None]
+    if not esbocos:
+        return None
+    return comprimir(pd.concat(esbocos, ignore_index=True), chaves)
+
+
+def resumo(esboco, por):
+    """
+    Uma linha por grupo `por` com n, media, min, q1, mediana, q3, max e os
+    limites dos bigodes (lim_inf/lim_sup: 1,5 IQR, sem passar dos extremos).
+    Os quartis interpolam entre os centros dos centroides do grupo.
+    """
+    esboco = comprimir(esboco, por)
+    linhas = []
+    for chave, grupo in esboco.groupby(por, sort=False):
+        peso = grupo['peso'].to_numpy()
+        media = grupo['media'].to_numpy()
+        n = peso.sum()
+        minimo, maximo = grupo['min'].min(), grupo['max'].max()
+        centros = np.cumsum(peso) - peso / 2
+        q1, mediana, q3 = np.interp(np.array(QUANTIS) * n, np.r_[0, centros, n], np.r_[minimo, media, maximo])
+        iqr = q3 - q1
+        linhas.append({
+            **dict(zip(por, chave)), 'n': int(n), 'media': (peso * media).sum() / n,
+            'min': minimo, 'q1': q1, 'mediana': mediana, 'q3': q3, 'max': maximo,
+            'lim_inf': max(minimo, q1 - 1.5 * iqr), 'lim_sup': min(maximo, q3 + 1.5 * iqr),
+        })
+    return pd.DataFrame(linhas, columns=por + ['n', 'media', 'min', 'q1', 'mediana', 'q3', 'max', 'lim_inf', 'lim_sup'])
+
+
+def com_acesso(esboco, metrica):
+    """Acrescenta ACESSO: o aluno tem o recurso medido pela `metrica` (ver ACESSO)."""
+    return esboco.assign(ACESSO=esboco[ACESSO[metrica]].all(axis=1))
+
+
+# --- ARQUIVOS ---
+def _caminho_ano(ano, pasta=PASTA_QUANTIS):
+    return armazem.caminho_particao(pasta, ano, NOME_ARQUIVO)
+
+
+def gravar(esboco, ano, pasta=PASTA_QUANTIS):
+    """Grava o esboço do ano só se mudou (mantém a data do arquivo). Retorna True se gravou."""
+    destino = _caminho_ano(ano, pasta)
+    if os.path.exists(destino) and pd.read_parquet(destino).equals(esboco):
+        return False
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    esboco.to_parquet(destino, index=False, compression='zstd')
+    return True
+
+
+def anos_disponiveis(pasta=PASTA_QUANTIS):
+    return armazem.anos_particionados(pasta, NOME_ARQUIVO)
+
+
+def existe(pasta=PASTA_QUANTIS):
+    return bool(anos_disponiveis(pasta))
+
+
+def versao(pasta=PASTA_QUANTIS):
+    """(ano, data de modificação) de cada esboço gravado: chave de cache."""
+    return tuple((ano, os.path.getmtime(_caminho_ano(ano, pasta))) for ano in anos_disponiveis(pasta))
+
+
+def carregar(anos=None, ufs=None, pasta=PASTA_QUANTIS):
+    """Esboços gravados, com a coluna ANO, só dos `anos` e `ufs` pedidos (None: todos)."""
+    partes = []
+    for ano in anos_disponiveis(pasta) if anos is None else anos:
+        filtro = None if ufs is None else [('UF', 'in', list(ufs))]
+        parte = pd.read_parquet(_caminho_ano(ano, pasta), filters=filtro)
+        partes.append(parte.assign(ANO=ano))
+    if not partes:
+        return pd.DataFrame(columns=CHAVES + CENTROIDES + ['ANO'])
+    return pd.concat(partes, ignore_index=True)
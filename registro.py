@@ -0,0 +1,184 @@
+"""
+Registro dos anos de indicadores disponíveis.
+
+Descobre os anos (no armazém Parquet ou nos indicadoresXX.csv), normaliza
+cada um para o schema canônico uma única vez e empilha tudo numa tabela
+longa indexada por (ANO, MUNICIPIO). As comparações do dashboard são
+operações sobre essa tabela, valendo para qualquer quantidade de anos.
+
+Os nomes de município passam pelo índice canônico (municipios.py): cada
+linha ganha o código CD_MUN e a grafia canônica, e as comparações entre
+anos são pareadas pelo código.
+
+Cada linha traz a UF. Com `ufs`, só os municípios dessas UFs são lidos (no
+armazém, só os row groups delas); sem `ufs`, o painel cobre todas as UFs
+gravadas, e nomes repetidos entre estados continuam distintos pelo CD_MUN.
+"""
+import glob
+import os
+import re
+
+import pandas as pd
+
+import armazem
+import municipios
+
+
+def _arquivo_csv(ano, pasta='.'):
+    return os.path.join(pasta, f'indicadores{ano % 100:02d}.csv')
+
+
+def descobrir_anos(pasta='.'):
+    """Anos disponíveis, preferindo o armazém Parquet quando compilado."""
+    if armazem.existe():
+        return armazem.anos_disponiveis()
+    anos = []
+    for caminho in glob.glob(os.path.join(pasta, 'indicadores*.csv')):
+        achado = re.search(r'indicadores(\d{2})\.csv$', caminho)
+        if achado:
+            anos.append(2000 + int(achado.group(1)))
+    return sorted(anos)
+
+
+def impressoes(anos=None, pasta='.'):
+    """
+    Hash do conteúdo de cada ano ({ano: hash}), para invalidar caches só dos
+    anos que mudaram. Com o armazém, vem dos metadados da partição (sem ler os dados).
+    """
+    anos = anos or descobrir_anos(pasta)
+    if armazem.existe():
+        return {ano: armazem.impressao(ano) for ano in anos}
+    return {ano: armazem.hash_arquivo(_arquivo_csv(ano, pasta)) for ano in anos}
+
+
+def datas(anos=None, pasta='.'):
+    """
+    (ano, data de modificação, tamanho) do arquivo de cada ano, sem ler o
+    conteúdo: chave para não refazer `impressoes` enquanto nada mudou.
+    """
+    if armazem.existe():
+        return armazem.versao()
+    versoes = []
+    for ano in anos or descobrir_anos(pasta):
+        info = os.stat(_arquivo_csv(ano, pasta))
+        versoes.append((ano, info.st_mtime_ns, info.st_size))
+    return tuple(versoes)
+
+
+def ufs_disponiveis(anos=None, pasta='.'):
+    """UFs presentes em algum dos anos (do armazém, sem ler os dados)."""
+    anos = anos or descobrir_anos(pasta)
+    if armazem.existe():
+        return sorted({uf for ano in anos for uf in armazem.ufs_do_ano(ano)})
+    ufs = set()
+    for ano in anos:
+        caminho = _arquivo_csv(ano, pasta)
+        if 'UF' in pd.read_csv(caminho, nrows=0).columns:
+            ufs.update(pd.read_csv(caminho, usecols=['UF'])['UF'].unique())
+        else:
+            ufs.add(municipios.UF_PADRAO)
+    return sorted(ufs)
+
+
+def carregar_ano(ano, colunas=None, pasta='.', ufs=None):
+    """
+    Tabela de um ano já com nomes canônicos. `colunas` usa os nomes canônicos;
+    as que o ano não tiver são ignoradas. `ufs` restringe às UFs informadas.
+    """
+    if armazem.existe():
+        return armazem.ler_ano(ano, colunas, ufs=ufs)
+
+    df = armazem.tipar(pd.read_csv(_arquivo_csv(ano, pasta)))
+    if 'UF' not in df:
+        df.insert(0, 'UF', municipios.UF_PADRAO)
+    if ufs is not None:
+        df = df[df['UF'].isin(ufs)].reset_index(drop=True)
+    if colunas is not None:
+        df = df[[c for c in colunas if c in df.columns]]
+    return df
+
+
+def carregar_painel(colunas=None, anos=None, pasta='.', ufs=None):
+    """
+    Empilha os anos numa tabela longa indexada por (ANO, MUNICIPIO), com a
+    UF como coluna. Colunas ausentes em algum ano ficam como NaN nas linhas
+    desse ano. `ufs` restringe às UFs informadas (None: todas).
+    """
+    anos = anos or descobrir_anos(pasta)
+    if not anos:
+        raise FileNotFoundError("Nenhum indicadoresXX.csv ou armazém Parquet encontrado.")
+
+    if colunas is not None:
+        colunas = list(colunas) + [c for c in ('UF', 'CD_MUN') if c not in colunas]
+    tabelas = [carregar_ano(ano, colunas, pasta, ufs) for ano in anos]
+
+    # índice único para todos os anos; a referência do IBGE define códigos e grafias
+    referencia = municipios.referencia_ibge()
+    if referencia is not None and ufs is not None:
+        referencia = referencia[referencia['UF'].isin(ufs)]
+    indice = municipios.construir_indice([referencia] + tabelas)
+
+    partes = []
+    for ano, df in zip(anos, tabelas):
+        codigos, canonicos, _ = municipios.resolver(df['MUNICIPIO'], indice, municipios.uf_da_tabela(df))
+        df['MUNICIPIO'] = canonicos
+        df['CD_MUN'] = codigos
+        partes.append(df.assign(ANO=ano))
+
+    painel = pd.concat(partes, ignore_index=True)
+    return painel.set_index(['ANO', 'MUNICIPIO']).sort_index()
+
+
+def anos_do_painel(painel):
+    return painel.index.get_level_values('ANO').unique().tolist()
+
+
+def fatia_ano(painel, ano):
+    """Tabela de um ano com MUNICIPIO como coluna (formato dos antigos df19/df23/df24)."""
+    return painel.xs(ano, level='ANO').dropna(axis=1, how='all').reset_index()
+
+
+def medias_por_ano(painel, colunas):
+    """Média entre municípios de cada coluna, para todos os anos (ANO x coluna)."""
+    return painel[colunas].groupby(level='ANO').mean()
+
+
+def percentil_por_ano(painel, coluna, q):
+    """Percentil `q` (0-100) da coluna em cada ano; mesmo critério de np.percentile."""
+    return painel[coluna].groupby(level='ANO').quantile(q / 100)
+
+
+def correlacao_por_ano(painel, x, y):
+    """Correlação de Pearson entre `x` e `y` em cada ano (NaN onde faltar dado)."""
+    if x == y:
+        return painel[x].groupby(level='ANO').count().gt(1).map({True: 1.0, False: float('nan')})
+    matrizes = painel[[x, y]].groupby(level='ANO').corr()
+    return matrizes.xs(x, level=1)[y]
+
+
+def comparar(painel, colunas, anos):
+    """
+    Tabela larga por município (UF e MUNICIPIO) com `colunas` de cada ano
+    em `anos`, nomeadas com o sufixo do ano (ex.: Taxa_Internet_19). Mantém
+    só municípios presentes em todos os anos (ver `sem_par`), pareados pelo
+    código CD_MUN.
+    """
+    fatias = [painel.xs(ano, level='ANO') for ano in anos]
+    posicoes = municipios.parear(*[fatia['CD_MUN'] for fatia in fatias])
+
+    # a UF distingue homônimos de estados diferentes no escopo Brasil
+    largo = pd.DataFrame({
+        'UF': fatias[0]['UF'].to_numpy()[posicoes[0]],
+        'MUNICIPIO': fatias[0].index.to_numpy()[posicoes[0]],
+    })
+    for ano, fatia, posicao in zip(anos, fatias, posicoes):
+        for c in colunas:
+            largo[f'{c}_{ano % 100:02d}'] = fatia[c].to_numpy()[posicao]
+    return largo.sort_values(['MUNICIPIO', 'UF'], ignore_index=True)
+
+
+def sem_par(painel, anos):
+    """Municípios de cada ano que ficam fora de `comparar` por faltarem em outro ano."""
+    return municipios.sem_par({
+        ano: painel.xs(ano, level='ANO')['CD_MUN'].reset_index() for ano in anos
+    })
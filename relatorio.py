@@ -0,0 +1,498 @@
+"""
+Relatório estático do dashboard (HTML ou PDF), sem servidor Streamlit.
+
+Gera para um escopo (UF ou Brasil) o conteúdo completo do dashboard: a
+tabela resumo do grafico_comparativo, as estatísticas do cubo de todas as
+métricas e anos, as variações de cada par de anos, histogramas, dispersões,
+boxplots, mapas (com a malha compilada), o comparativo entre estados e a
+conclusão. As figuras são construídas em paralelo num pool de processos.
+
+O HTML é um arquivo único: as figuras Plotly vão como spec JSON (interativas,
+com o plotly.js carregado uma vez) e as do matplotlib como PNG embutido,
+então pode ser servido direto de um CDN. O PDF desenha todas as figuras
+com matplotlib (não depende de exportador de imagens do Plotly).
+
+Uso:
+    python relatorio.py                                    # relatorio.html (Ceará)
+    python relatorio.py --formato pdf --saida relatorio.pdf
+    python relatorio.py --uf BR --workers 8 --offline      # plotly.js embutido
+"""
+import argparse
+import base64
+import html
+import itertools
+import os
+import re
+import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import cache_figuras
+import cubo
+import func
+import mapas
+import municipios
+import registro
+import textos
+
+
+ANO_PRE, ANO_RECENTE = 2019, 2024     # anos da tabela resumo (grafico_comparativo)
+CORES = ('gray', 'blue', 'green', 'orange', 'purple')    # uma por ano, como no dashboard
+ESTATISTICAS = {
+    'media': 'Média', 'media_ponderada': 'Média ponderada', 'p25': 'P25', 'p75': 'P75',
+    'corr_nota': 'Corr. com a nota', 'corr_ideb': 'Corr. com o IDEB',
+}
+TOPO = 15       # municípios com maior alta e maior queda listados por par de anos
+DPI = 110
+PLOTLY_CDN = 'https://cdn.plot.ly/plotly-{versao}.min.js'
+
+
+# --- FIGURAS (executadas nos processos do pool) ---
+_CONTEXTO = {}
+
+
+def _iniciar(painel, estados, resumos, estatico):
+    """Inicializador dos processos: dados compartilhados por todas as figuras."""
+    import matplotlib
+    matplotlib.use('Agg')
+    geometria = mapas.carregar_geometria() if mapas.existe() else (None, None)
+    _CONTEXTO.update(painel=painel, estados=estados, resumos=resumos,
+                     estatico=estatico, geojson=geometria[1])
+
+
+def _fatia(ano):
+    return registro.fatia_ano(_CONTEXTO['painel'], ano)
+
+
+def _medias_estados(metrica, anos):
+    estados = _CONTEXTO['estados']
+    return pd.DataFrame({ano: estados['media'].xs((metrica, ano), level=['METRICA', 'ANO']) for ano in anos})
+
+
+def _cor(ano):
+    anos = registro.anos_do_painel(_CONTEXTO['painel'])
+    return CORES[anos.index(ano) % len(CORES)]
+
+
+def _interativa(tipo, args):
+    """Figura Plotly da tarefa, como no dashboard."""
+    import plotly.graph_objects as go
+
+    if tipo == 'comparativo':
+        return go.Figure(func.spec_comparativo.__wrapped__(_CONTEXTO['resumos'][args[0]]))
+    if tipo == 'histograma':
+        metrica, ano = args
+        return func.gerar_histograma(_fatia(ano), metrica, _cor(ano), f'{ano}: {cubo.ROTULOS[metrica]}',
+                                     cubo.ROTULOS[metrica], cubo.eh_nota(metrica))
+    if tipo == 'dispersao':
+        metrica, ano = args
+        return func.gerar_dispersao(_fatia(ano), metrica, 'Nota_Media_Geral', f'{ano}: Nota Média vs {metrica}',
+                                    {metrica: cubo.ROTULOS[metrica], 'Nota_Media_Geral': 'Nota Média'}, [_cor(ano)])
+    if tipo == 'mapa':
+        metrica, ano = args
+        return mapas.figura_mapa(_fatia(ano), metrica, _CONTEXTO['geojson'], f'{ano}: {cubo.ROTULOS[metrica]}',
+                                 cubo.ROTULOS[metrica], cubo.eh_nota(metrica))
+    if tipo == 'estados':
+        metrica, anos = args
+        return func.gerar_barras_estados(_medias_estados(metrica, anos), metrica, cubo.ROTULOS[metrica])
+    raise ValueError(f"Figura desconhecida: {tipo}")
+
+
+def _estatica(tipo, args):
+    """Figura matplotlib da tarefa (PDF e boxplots)."""
+    import matplotlib.pyplot as plt
+
+    if tipo == 'comparativo':
+        return func.figura_comparativo_estatica(_CONTEXTO['resumos'][args[0]])
+    if tipo == 'boxplot':
+        metrica, anos = args
+        grupos = [_CONTEXTO['painel'].xs(ano, level='ANO')[metrica].dropna() for ano in anos]
+        return func.gerar_boxplot(grupos, [str(ano) for ano in anos],
+                                  f'Comparação de {metrica}', cubo.ROTULOS[metrica])
+    if tipo == 'estados':
+        metrica, anos = args
+        medias = _medias_estados(metrica, anos)
+        medias = medias.loc[medias.sum(axis=1).sort_values(ascending=False).index]
+        fig, ax = plt.subplots(figsize=(10, 4))
+        largura = 0.8 / len(anos)
+        for i, ano in enumerate(anos):
+            ax.bar([x + i * largura for x in range(len(medias))], medias[ano], largura, label=str(ano), color=_cor(ano))
+        ax.set_xticks([x + largura * (len(anos) - 1) / 2 for x in range(len(medias))], medias.index)
+        ax.set_ylabel(cubo.ROTULOS[metrica])
+        ax.legend(title='Ano')
+        return fig
+
+    metrica, ano = args
+    dados = _fatia(ano)
+    fig, ax = plt.subplots(figsize=(7, 4))
+    ax.set_title(f'{ano}: {cubo.ROTULOS[metrica]}')
+    if tipo == 'histograma':
+        ax.hist(dados[metrica].dropna(), bins=20, color=_cor(ano))
+        ax.set_xlabel(cubo.ROTULOS[metrica])
+        ax.set_ylabel('Qtd. Municípios')
+        if not cubo.eh_nota(metrica):
+            ax.set_xlim(0, 1)
+    elif tipo == 'dispersao':
+        pares = dados[[metrica, 'Nota_Media_Geral']].dropna()
+        ax.scatter(pares[metrica], pares['Nota_Media_Geral'], s=10, color=_cor(ano))
+        ax.set_xlabel(cubo.ROTULOS[metrica])
+        ax.set_ylabel('Nota Média')
+    elif tipo == 'mapa':
+        _mapa_estatico(ax, dados, metrica, _CONTEXTO['geojson'], cubo.eh_nota(metrica))
+    else:
+        raise ValueError(f"Figura desconhecida: {tipo}")
+    return fig
+
+
+def _mapa_estatico(ax, dados, metrica, geojson, is_nota):
+    """Coroplético matplotlib: anéis externos de cada município coloridos pela métrica."""
+    from matplotlib.collections import PolyCollection
+
+    valores = dict(zip(dados['CD_MUN'], dados[metrica]))
+    poligonos, cores = [], []
+    for feicao in geojson['features']:
+        valor = valores.get(feicao['id'])
+        if valor is None or pd.isna(valor):
+            continue
+        for poligono in feicao['geometry']['coordinates']:
+            poligonos.append(poligono[0])
+            cores.append(valor)
+    colecao = PolyCollection(poligonos, array=cores, cmap='RdYlGn', edgecolor='white', linewidth=0.2)
+    if not is_nota:
+        colecao.set_clim(0, 1)
+    ax.add_collection(colecao)
+    ax.autoscale_view()
+    ax.set_aspect('equal')
+    ax.axis('off')
+    ax.figure.colorbar(colecao, ax=ax, shrink=0.7)
+
+
+def construir_figura(tarefa):
+    """(tarefa, 'plotly' | 'png', conteúdo): spec JSON ou bytes do PNG."""
+    tipo, args = tarefa
+    if _CONTEXTO['estatico'] or tipo == 'boxplot':
+        return tarefa, 'png', cache_figuras.figura_para_png(_estatica(tipo, args), DPI)
+    return tarefa, 'plotly', _interativa(tipo, args).to_json()
+
+
+def construir_figuras(tarefas, painel, estados, resumos, estatico, workers=None):
+    """{tarefa: (formato, conteúdo)} construindo as figuras em paralelo."""
+    contexto = (painel, estados, resumos, estatico)
+    if workers == 1:
+        _iniciar(*contexto)
+        return {tarefa: (formato, conteudo) for tarefa, formato, conteudo in map(construir_figura, tarefas)}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar, initargs=contexto) as pool:
+        return {
+            tarefa: (formato, conteudo)
+            for tarefa, formato, conteudo in pool.map(construir_figura, tarefas, chunksize=4)
+        }
+
+
+# --- CONTEÚDO ---
+def _tabela_estatisticas(cubo_comp, metrica):
+    resumo = cubo_comp['resumo'].xs(metrica, level='METRICA')
+    tabela = resumo[[c for c in ESTATISTICAS if c in resumo.columns]].rename(columns=ESTATISTICAS)
+    if metrica != 'Nota_Media_Geral':
+        ic = cubo_comp['correlacoes'].xs(('pearson', metrica, 'Nota_Media_Geral'), level=['METODO', 'X', 'Y'])
+        tabela['IC 95% (inf.)'] = ic['ic_inf']
+        tabela['IC 95% (sup.)'] = ic['ic_sup']
+    return cubo.arredondar(tabela, 2 if cubo.eh_nota(metrica) else 4).rename_axis('Ano').reset_index()
+
+
+def montar_blocos(painel, cubo_comp, resumos, escopo, impressoes, com_mapa):
+    """
+    Conteúdo do relatório como lista de blocos, na ordem de exibição:
+    ('titulo', nível, texto), ('texto', markdown), ('tabela', legenda, df)
+    e ('figura', tarefa). Retorna (blocos, tarefas de figura).
+    """
+    anos = cubo_comp['anos']
+    nome = municipios.UFS.get(escopo, 'Brasil')
+    blocos, tarefas = [], []
+
+    def figura(tipo, *args):
+        tarefas.append((tipo, args))
+        blocos.append(('figura', (tipo, args)))
+
+    blocos.append(('titulo', 1, f'Panorama da Educação Digital: {nome}'))
+    versoes = ', '.join(f'{ano} ({(h or "")[:8]})' for ano, h in sorted(impressoes.items()))
+    blocos.append(('texto', f'Gerado em {time.strftime("%d/%m/%Y %H:%M")}. Indicadores: {versoes}.'))
+
+    # tabela resumo do grafico_comparativo
+    blocos.append(('titulo', 2, f'Resumo {ANO_PRE} x {ANO_RECENTE}'))
+    for notas, legenda in ((False, 'Indicadores de acesso'), (True, 'Notas do ENEM')):
+        resumo = resumos[notas].sort_values(by=['Variação (%)'], ascending=False)
+        blocos.append(('tabela', legenda, cubo.arredondar(resumo, 2 if notas else 4)))
+        figura('comparativo', notas)
+
+    com_estados = len(cubo_comp['ufs']) > 1
+    for metrica in cubo_comp['metricas']:
+        blocos.append(('titulo', 2, cubo.ROTULOS[metrica]))
+        blocos.append(('tabela', 'Estatísticas por ano', _tabela_estatisticas(cubo_comp, metrica)))
+
+        for a, b in itertools.combinations(anos, 2):
+            comparacao = cubo.par(cubo_comp, metrica, a, b)
+            unidade = '%' if cubo.eh_nota(metrica) else ' p.p'
+            variacao = comparacao['delta_pct'] if cubo.eh_nota(metrica) else comparacao['delta'] * 100
+            blocos.append(('titulo', 3, f'{a} x {b}'))
+            blocos.append(('texto', f'Variação da média: **{variacao:+.2f}{unidade}**.'))
+            detalhe = comparacao['detalhe']
+            blocos.append(('tabela', f'Maiores altas ({TOPO} municípios)', detalhe.head(TOPO)))
+            blocos.append(('tabela', f'Maiores quedas ({TOPO} municípios)', detalhe.tail(TOPO).iloc[::-1]))
+            for ano, nomes in comparacao['sem_par'].items():
+                if nomes:
+                    blocos.append(('texto', f'Sem dados no outro ano ({ano}): {", ".join(nomes)}'))
+
+        blocos.append(('titulo', 3, 'Distribuição'))
+        for ano in anos:
+            figura('histograma', metrica, ano)
+        figura('boxplot', metrica, tuple(anos))
+        if metrica != 'Nota_Media_Geral':
+            blocos.append(('titulo', 3, 'Relação com a nota média'))
+            for ano in anos:
+                figura('dispersao', metrica, ano)
+        if com_mapa:
+            blocos.append(('titulo', 3, 'Mapa'))
+            for ano in anos:
+                figura('mapa', metrica, ano)
+        if com_estados:
+            blocos.append(('titulo', 3, 'Comparativo entre estados'))
+            figura('estados', metrica, tuple(anos))
+
+    blocos.append(('titulo', 2, 'Conclusão e Relatório Final'))
+    blocos.append(('texto', textos.CONCLUSAO))
+    return blocos, tarefas
+
+
+# --- HTML ---
+def _numero(valor):
+    # até 6 algarismos significativos: esconde resíduos de ponto flutuante (23.8100000002)
+    return f'{valor:.6g}'
+
+
+def _markdown_html(texto):
+    """Subconjunto de Markdown usado nos textos: títulos, listas, negrito e parágrafos."""
+    saida, lista, paragrafo = [], False, []
+
+    def inline(linha):
+        return re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html.escape(linha))
+
+    def fechar():
+        nonlocal lista
+        if paragrafo:
+            saida.append(f'<p>{inline(" ".join(paragrafo))}</p>')
+            paragrafo.clear()
+        if lista:
+            saida.append('</ul>')
+            lista = False
+
+    for linha in texto.splitlines():
+        linha = linha.strip()
+        titulo = re.match(r'(#{1,6})\s+(.*)', linha)
+        if titulo:
+            fechar()
+            nivel = min(len(titulo.group(1)) + 1, 6)
+            saida.append(f'<h{nivel}>{inline(titulo.group(2))}</h{nivel}>')
+        elif linha.startswith(('- ', '* ')):
+            if paragrafo:
+                fechar()
+            if not lista:
+                saida.append('<ul>')
+                lista = True
+            saida.append(f'<li>{inline(linha[2:])}</li>')
+        elif not linha:
+            fechar()
+        else:
+            paragrafo.append(linha)
+    fechar()
+    return '\n'.join(saida)
+
+
+_PAGINA = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{titulo}</title>
+{plotly}
+<style>
+body {{ font-family: system-ui, sans-serif; max-width: 1100px; margin: 2rem auto; padding: 0 1rem; color: #222; }}
+h2 {{ border-bottom: 1px solid #ddd; padding-bottom: .3rem; margin-top: 2.5rem; }}
+table {{ border-collapse: collapse; font-size: .85rem; margin: .5rem 0 1.2rem; }}
+th, td {{ padding: .25rem .6rem; border-bottom: 1px solid #eee; text-align: right; }}
+th:first-child, td:first-child {{ text-align: left; }}
+caption {{ text-align: left; font-weight: 600; padding: .3rem 0; }}
+.figura {{ margin: 1rem 0; }}
+.figura img {{ max-width: 100%; }}
+</style>
+</head>
+<body>
+{corpo}
+</body>
+</html>
+"""
+
+
+def gerar_html(blocos, figuras, offline=False):
+    """Página HTML autocontida a partir dos blocos e das figuras construídas."""
+    import plotly.offline
+
+    if offline:
+        plotly_js = f'<script>{plotly.offline.get_plotlyjs()}</script>'
+    else:
+        plotly_js = f'<script src="{PLOTLY_CDN.format(versao=plotly.offline.get_plotlyjs_version())}"></script>'
+
+    corpo, titulo = [], ''
+    for n, bloco in enumerate(blocos):
+        tipo = bloco[0]
+        if tipo == 'titulo':
+            _, nivel, texto = bloco
+            titulo = titulo or texto
+            corpo.append(f'<h{nivel}>{html.escape(texto)}</h{nivel}>')
+        elif tipo == 'texto':
+            corpo.append(_markdown_html(bloco[1]))
+        elif tipo == 'tabela':
+            _, legenda, df = bloco
+            tabela = df.to_html(index=False, na_rep='—', border=0, float_format=_numero)
+            corpo.append(tabela.replace('<thead>', f'<caption>{html.escape(legenda)}</caption>\n<thead>', 1))
+        else:
+            formato, conteudo = figuras[bloco[1]]
+            if formato == 'png':
+                dados = base64.b64encode(conteudo).decode()
+                corpo.append(f'<div class="figura"><img alt="" src="data:image/png;base64,{dados}"></div>')
+            else:
+                spec = conteudo.replace('</', '<\\/')
+                corpo.append(
+                    f'<div class="figura" id="fig{n}"></div>\n<script>(function () {{ var f = {spec}; '
+                    f'Plotly.newPlot("fig{n}", f.data, f.layout, {{responsive: true}}); }})();</script>'
+                )
+    return _PAGINA.format(titulo=html.escape(titulo), plotly=plotly_js, corpo='\n'.join(corpo))
+
+
+# --- PDF ---
+A4 = (8.27, 11.69)
+MARGEM = 0.06
+LINHA = 0.016           # altura de uma linha de texto (fração da página)
+ALTURA_FIGURA = 0.36
+LINHAS_TABELA = 32      # linhas por página antes de quebrar a tabela
+
+
+def _texto_simples(texto):
+    linhas = []
+    for linha in texto.splitlines():
+        linha = re.sub(r'\*\*(.+?)\*\*', r'\1', linha.strip()).lstrip('#').strip()
+        linhas.extend(textwrap.wrap(linha, 105) or [''])
+    return linhas
+
+
+def gerar_pdf(blocos, figuras, destino):
+    """PDF A4 com os blocos em fluxo: títulos, texto, tabelas e figuras (PNG)."""
+    import io
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    with PdfPages(destino) as pdf:
+        estado = {'fig': None, 'y': 0.0}
+
+        def garantir(altura):
+            """Abre nova página se `altura` não couber no que resta da atual."""
+            if estado['fig'] is None or estado['y'] - altura < MARGEM:
+                if estado['fig'] is not None:
+                    pdf.savefig(estado['fig'])
+                    plt.close(estado['fig'])
+                estado['fig'] = plt.figure(figsize=A4)
+                estado['y'] = 1 - MARGEM
+
+        def reservar(altura):
+            """Posição (topo) para um elemento de `altura`."""
+            garantir(altura)
+            topo = estado['y']
+            estado['y'] -= altura
+            return topo
+
+        def escrever(linhas, tamanho=8, peso='normal'):
+            for linha in linhas:
+                topo = reservar(LINHA * tamanho / 8)
+                estado['fig'].text(MARGEM, topo, linha, fontsize=tamanho, weight=peso, va='top')
+
+        for bloco in blocos:
+            tipo = bloco[0]
+            if tipo == 'titulo':
+                _, nivel, texto = bloco
+                reservar(LINHA * 0.5)
+                escrever([texto], tamanho={1: 16, 2: 13}.get(nivel, 10), peso='bold')
+            elif tipo == 'texto':
+                escrever(_texto_simples(bloco[1]))
+            elif tipo == 'tabela':
+                _, legenda, df = bloco
+                garantir(LINHA * (min(len(df), LINHAS_TABELA) + 2.5))     # legenda junto da tabela
+                escrever([legenda], peso='bold')
+                texto = df.map(lambda v: '—' if pd.isna(v) else _numero(v) if isinstance(v, float) else str(v))
+                for inicio in range(0, max(len(texto), 1), LINHAS_TABELA):
+                    parte = texto.iloc[inicio:inicio + LINHAS_TABELA]
+                    altura = LINHA * (len(parte) + 1.5)
+                    topo = reservar(altura)
+                    ax = estado['fig'].add_axes([MARGEM, topo - altura, 1 - 2 * MARGEM, altura])
+                    ax.axis('off')
+                    tabela = ax.table(cellText=parte.to_numpy(), colLabels=list(parte.columns),
+                                      loc='upper left', cellLoc='right')
+                    tabela.auto_set_font_size(False)
+                    tabela.set_fontsize(6)
+            else:
+                _, conteudo = figuras[bloco[1]]
+                imagem = plt.imread(io.BytesIO(conteudo), format='png')
+                topo = reservar(ALTURA_FIGURA)
+                ax = estado['fig'].add_axes([MARGEM, topo - ALTURA_FIGURA, 1 - 2 * MARGEM, ALTURA_FIGURA])
+                ax.imshow(imagem)
+                ax.axis('off')
+
+        if estado['fig'] is not None:
+            pdf.savefig(estado['fig'])
+            plt.close(estado['fig'])
+    return destino
+
+
+# --- EXECUÇÃO ---
+def gerar_relatorio(destino, formato='html', escopo=municipios.UF_PADRAO, workers=None, offline=False):
+    """Monta o relatório do escopo e grava em `destino`. Retorna (destino, nº de figuras)."""
+    painel = registro.carregar_painel(cubo.COLUNAS, ufs=municipios.ufs_do_escopo(escopo))
+    cubo_comp = cubo.carregar_cubo(escopo=escopo)
+    df_pre, df_recente = registro.fatia_ano(painel, ANO_PRE), registro.fatia_ano(painel, ANO_RECENTE)
+    resumo = func.resumo_comparativo.__wrapped__
+    resumos = {notas: resumo(df_pre, df_recente, notas=notas) for notas in (False, True)}
+
+    blocos, tarefas = montar_blocos(painel, cubo_comp, resumos, escopo, registro.impressoes(), mapas.existe())
+    estatico = formato == 'pdf'
+    figuras = construir_figuras(tarefas, painel, cubo_comp['estados'], resumos, estatico, workers)
+
+    os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+    if estatico:
+        gerar_pdf(blocos, figuras, destino)
+    else:
+        with open(destino, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(gerar_html(blocos, figuras, offline))
+    return destino, len(figuras)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o relatório completo do dashboard em HTML ou PDF.")
+    parser.add_argument('--formato', choices=('html', 'pdf'), default='html')
+    parser.add_argument('--saida', help="Arquivo de saída (padrão: relatorio.<formato>)")
+    parser.add_argument('--uf', default=municipios.UF_PADRAO, help=f"Sigla da UF ou {municipios.BRASIL} para todas")
+    parser.add_argument('--workers', type=int, default=None, help="Processos para as figuras (1: sem pool)")
+    parser.add_argument('--offline', action='store_true', help="Embute o plotly.js no HTML em vez de usar o CDN")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    destino, n_figuras = gerar_relatorio(
+        args.saida or f'relatorio.{args.formato}', args.formato, args.uf, args.workers, args.offline
+    )
+    print(f"{n_figuras} figuras; relatório gravado em {destino} ({time.perf_counter() - inicio:.1f} s)")
+
+
+if __name__ == '__main__':
+    main()
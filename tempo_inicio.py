@@ -0,0 +1,103 @@
+"""
+Orçamento de tempo de inicialização do dashboard.
+
+Mede, num interpretador novo (como num contêiner que acabou de subir), o
+tempo das etapas executadas antes do primeiro envio à página: importar o
+Streamlit e os módulos que o app.py importa no topo, carregar o painel e o
+cubo. Também confere
+que os backends de visualização (plotly.express, matplotlib, seaborn) ainda
+não foram carregados nesse ponto; eles só devem subir quando a primeira
+figura for construída. (O Streamlit já traz o pacote base do plotly.)
+
+Sem dados/cubo.pkl gravado (python cubo.py), a etapa do cubo inclui montar
+o cubo inteiro e estoura o orçamento.
+
+Uso:
+    python tempo_inicio.py                  # orçamento padrão
+    python tempo_inicio.py --orcamento 2.5  # segundos
+    python tempo_inicio.py --repeticoes 5   # mediana de 5 partidas a frio
+"""
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+
+
+ORCAMENTO_PADRAO = 3.0   # segundos até o primeiro envio
+BACKENDS = ('plotly.express', 'matplotlib', 'seaborn')
+APP = 'app.py'
+
+# Executado num processo filho para medir a partida a frio
+_MEDICAO = r'''
+import json, sys, time
+tempos = {}
+inicio = time.perf_counter()
+
+def etapa(nome, acao):
+    t = time.perf_counter()
+    acao()
+    tempos[nome] = time.perf_counter() - t
+
+etapa('import streamlit', lambda: __import__('streamlit'))
+etapa('import módulos do app', lambda: [__import__(m) for m in json.loads(sys.argv[2])])
+import registro, cubo
+painel = {}
+etapa('carregar painel', lambda: painel.setdefault('p', registro.carregar_painel()))
+etapa('carregar cubo', lambda: cubo.carregar_cubo(painel=painel['p']))
+tempos['total'] = time.perf_counter() - inicio
+
+carregados = sorted(set(sys.modules) & set(json.loads(sys.argv[1])))
+print(json.dumps({'tempos': tempos, 'backends': carregados}))
+'''
+
+
+def modulos_do_app(caminho=APP):
+    """
+    Módulos importados no nível de topo do app (fora das funções), lidos do
+    próprio app.py: a lista medida acompanha o que o app carrega de fato.
+    """
+    with open(caminho, encoding='utf-8') as arquivo:
+        arvore = ast.parse(arquivo.read(), caminho)
+    modulos = []
+    for no in arvore.body:
+        if isinstance(no, ast.Import):
+            modulos += [alias.name for alias in no.names]
+        elif isinstance(no, ast.ImportFrom) and no.module and not no.level:
+            modulos.append(no.module)
+    return [m for m in dict.fromkeys(modulos) if m.split('.')[0] != 'streamlit']
+
+
+def medir():
+    """Uma partida a frio: {'tempos': {etapa: s}, 'backends': [carregados]}."""
+    saida = subprocess.run(
+        [sys.executable, '-c', _MEDICAO, json.dumps(BACKENDS), json.dumps(modulos_do_app())],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a inicialização do dashboard contra um orçamento.")
+    parser.add_argument('--orcamento', type=float, default=ORCAMENTO_PADRAO, help="Segundos")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    medicoes = [medir() for _ in range(args.repeticoes)]
+    etapas = list(medicoes[0]['tempos'])
+    for etapa in etapas:
+        mediana = statistics.median(m['tempos'][etapa] for m in medicoes)
+        print(f"{etapa:<25} {mediana:6.3f} s")
+
+    total = statistics.median(m['tempos']['total'] for m in medicoes)
+    backends = sorted({b for m in medicoes for b in m['backends']})
+    ok = total <= args.orcamento and not backends
+    if backends:
+        print(f"Backends carregados antes do primeiro envio: {', '.join(backends)}")
+    print(f"Total {total:.3f} s / orçamento {args.orcamento:.1f} s: {'OK' if ok else 'ESTOURADO'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
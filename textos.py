@@ -0,0 +1,39 @@
+"""
+Textos do relatório exibidos no dashboard e no relatório estático (relatorio.py).
+"""
+
+
+CONCLUSAO = """\
+### Panorama Geral da Educação Digital no Ceará (2019 vs 2023)
+
+Este dashboard analisou a evolução da inclusão digital educacional no Ceará, comparando dados agregados por município do ENEM de 2019 (pré-pandemia) e 2024 (pós-pandemia). Os indicadores principais — Taxa de Inclusão Digital Plena (computador + internet), Taxa de Posse de Computador e Taxa de Acesso à Internet — revelam transformações significativas no acesso a tecnologias, com impactos diretos no desempenho acadêmico medido pela Nota Média Geral do ENEM.
+
+### Principais Descobertas
+
+#### 1. **Evolução das Taxas de Acesso Tecnológico**
+- **Taxa de Suporte Digital**: Caiu de aproximadamente ~9 pontos percentuais, indicando uma geração "Mobile-Only" — alunos com acesso à internet via celular, mas sem computadores adequados para estudos avançados.
+- **Posse de Computador**: Diminuiu drasticamente (queda de ~10 pontos percentuais), evidenciando o "Paradoxo da Conectividade": mais alunos, mas menos equipamentos de produtividade.
+- **Acesso à Internet**: Universalizou-se, com aumento significativo (~20-30 pontos percentuais), tornando-se uma commodity essencial. A pandemia acelerou a infraestrutura de telecomunicações, rompendo barreiras de sinal em municípios remotos.
+
+#### 2. **Impacto no Desempenho Acadêmico (Nota Média do ENEM)**
+- A nota média estadual subiu (~3%), apesar da queda na inclusão digital plena. Isso sugere que fatores exógenos, além do aumento da conectividade compensaram a falta de hardware tradicional.
+- Correlação com Suporte Digital: Forte em 2019 (~0.70), com um bom aumento em 2023 (~0.81), indicando que ter computador deixou de ser um diferencial competitivo.
+- Correlação com Internet: Caiu drasticamente (de ~0.47 para ~0.16), pois o acesso se tornou ubíquo, não diferenciando mais alunos de alto desempenho.
+- Correlação com Computador: Manteve-se robusta (~0.65-0.70), bem similar a correlação com a taxa de suporte digital, confirmando que equipamentos de produtividade ainda são cruciais para habilidades técnicas avançadas.
+
+
+#### 3. **Hipótese da IA Generativa e Tecnologias Emergentes**
+- A subida das notas, apesar da queda em computadores, aponta para o papel compensatório de IA generativa, celulares inteligentes e ferramentas online. Alunos de baixa renda podem estar usando esses recursos para nivelar o campo de jogo.
+- Recomendação: Políticas públicas devem focar em hardware (computadores/notebooks) para alunos de baixa renda, enquanto incentivam o uso ético de IA em redação e estudos.
+
+### Recomendações Estratégicas
+- **Para Governos e Escolas**: Investir em distribuição de equipamentos, não apenas conectividade. Programas para fornecimento de dispositivos adequados ao estudo devem ser priorizados.
+- **Para Educadores**: Adaptar currículos para incluir habilidades digitais móveis, mas sem negligenciar o treinamento em ferramentas avançadas (ex.: programação, análise de dados).
+- **Para Pesquisa Futura**: Investigar o impacto causal de IA generativa via inferência causal (ex.: propensity score matching), considerando confundidores socioeconômicos.
+
+### Limitações da Análise
+- Dados agregados por município limitam correlações individuais; análises com MICRODADOS revelariam padrões mais granulares.
+- Fatores externos (ex.: mudanças curriculares, motivação pós-pandemia) não foram controlados.
+
+Este relatório destaca a necessidade urgente de equilibrar conectividade universal com acesso a ferramentas produtivas, garantindo que a transformação digital beneficie todos os alunos cearenses de forma equitativa.
+"""